@@ -30,4 +30,91 @@ LATE_TIME_LIMIT = "09:00:00" # Kechikish boshlanadigan vaqt (Kelish chegarasi)
 
 # Tushlik vaqti chegaralari (1 soat hisoblanmaydi)
 LUNCH_START = "13:00:00"
-LUNCH_END = "14:00:00"
\ No newline at end of file
+LUNCH_END = "14:00:00"
+
+# --- SQLITE ULANISH SOZLAMALARI ---
+DB_READER_POOL_SIZE = 4  # O'qish uchun doimiy ulanishlar soni
+DB_BUSY_TIMEOUT_MS = 5000  # Baza band bo'lsa kutish vaqti (millisekund)
+DB_CACHE_SIZE_KB = 16384  # Har bir ulanish uchun sahifa keshi (KiB)
+DB_MMAP_SIZE = 64 * 1024 * 1024  # Memory-mapped I/O hajmi (bayt)
+
+# Guruhli commit: parallel skanlar bitta tranzaksiyaga yig'iladi
+WRITE_BATCH_SIZE = 64  # Bitta tranzaksiyadagi eng ko'p amallar soni
+WRITE_BATCH_DELAY = 0.002  # Birinchi amaldan keyin qo'shimchalarni kutish (soniya, 0 = kutmaslik)
+
+# Foydalanuvchilar keshi (telegram_id bo'yicha, LRU). Ro'yxat shundan katta bo'lsa eskilari chiqariladi
+USER_CACHE_SIZE = 10000
+# Boshqa jarayon qo'shgan/o'chirgan ishchilarni aniqlash uchun meta.users_version shu oraliqda (soniya) bir marta o'qiladi
+USER_CACHE_CHECK_INTERVAL = 1.0
+
+# Excel hisobot bazadan shuncha qatorlik bo'laklarda o'qiladi
+REPORT_CHUNK_SIZE = 2000
+# Bo'laklangan (oy / ishchi bo'yicha varaqlar) hisobot shuncha jarayonda yig'iladi
+# (0 = CPU yadrolari soni, lekin REPORT_PROCESSES_MAX dan ko'p emas). Jarayonlar birinchi shunday hisobotda ochiladi
+REPORT_PROCESSES = int(os.getenv("REPORT_PROCESSES", "0"))
+REPORT_PROCESSES_MAX = 4
+# Bo'laklangan hisobot fayli chegarasi: Telegram bot 50 MB dan katta faylni yubora olmaydi
+REPORT_MAX_BYTES = 50 * 1024 * 1024
+# Tayyor hisobot fayllari keshi: (parametrlar, ma'lumotlar versiyasi) bo'yicha, hajmi cheklangan LRU
+REPORT_CACHE_DIR = "report_cache"
+REPORT_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Ishchilar ro'yxati sahifalab ko'rsatiladi (keyset pagination)
+ROSTER_PAGE_SIZE = 20
+ROSTER_PREFIX_MAX = 10  # Qidiruv prefiksi, UTF-8 baytlarda (eng uzun ID lar bilan ham callback_data 64 baytga sig'adi)
+
+# Ishchilarni CSV/XLSX fayldan ommaviy yuklash
+IMPORT_MAX_BYTES = 5 * 1024 * 1024  # Fayl hajmi chegarasi
+IMPORT_MAX_ROWS = 5000  # Bitta fayldagi qatorlar chegarasi
+IMPORT_NAME_MAX = 100  # Ism uzunligi chegarasi
+
+# --- ADMIN XABARNOMALARI (fon navbati) ---
+NOTIFY_WORKERS = 4  # Bir vaqtda yuboruvchi vazifalar soni
+NOTIFY_GLOBAL_RATE = 25  # Umumiy chegara: soniyasiga xabarlar (Telegram ~30/s)
+NOTIFY_PER_CHAT_INTERVAL = 1.0  # Bitta chatga ketma-ket xabarlar orasidagi minimal vaqt (soniya)
+NOTIFY_MAX_RETRIES = 5  # 429/tarmoq xatolarida qayta urinishlar soni
+NOTIFY_QUEUE_SIZE = 10000  # Navbat sig'imi; to'lsa yangi xabarlar tashlab yuboriladi
+NOTIFY_DRAIN_TIMEOUT = 10.0  # To'xtashda navbatni bo'shatish uchun kutish (soniya)
+
+# Oldindan chizilgan QR kodlar zaxirasi (har bir amal uchun). 0 — o'chirilgan, QR har safar chiziladi
+QR_POOL_SIZE = 5
+
+# QR token amal qilish muddati (soniya). Muddati o'tgan tokenlar bazaga murojaatsiz rad etiladi
+QR_TOKEN_TTL = 24 * 3600
+
+# --- QR TARIXI VA BAZA PARVARISHI ---
+QR_HISTORY_RETENTION_DAYS = 30  # qr_history yozuvlari shuncha kun saqlanadi (kamida QR_TOKEN_TTL)
+QR_HISTORY_PRUNE_BATCH = 500  # Bitta tranzaksiyada o'chiriladigan qatorlar soni
+INCREMENTAL_VACUUM_PAGES = 1000  # Bitta qadamda faylga qaytariladigan bo'sh sahifalar soni
+MAINTENANCE_INTERVAL = 3600  # Parvarish vazifasi oralig'i (soniya)
+
+# --- OYLIK ARXIV ---
+ARCHIVE_DIR = "archive"  # Yopilgan oylar shu papkaga YYYY-MM.db fayllari sifatida ko'chiriladi
+ARCHIVE_HOT_MONTHS = 2  # Asosiy bazada qoladigan oylar soni (joriy oy bilan birga)
+ARCHIVE_BATCH_SIZE = 1000  # Bitta tranzaksiyada ko'chiriladigan davomat qatorlari soni
+
+# --- ISHGA TUSHIRISH REJIMI ---
+BOT_MODE = os.getenv("BOT_MODE", "polling")  # "polling" yoki "webhook"
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "")  # Masalan https://bot.example.uz (bo'sh bo'lsa setWebhook chaqirilmaydi)
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")  # X-Telegram-Bot-Api-Secret-Token bilan solishtiriladi; webhook rejimida majburiy
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_MAX_CONNECTIONS = 40  # Telegram bir vaqtda ochadigan ulanishlar (parallel updatelar) soni
+WEBHOOK_SHUTDOWN_TIMEOUT = 30.0  # To'xtashda bajarilayotgan updatelarni kutish (soniya)
+
+# --- FSM (admin dialoglari) ---
+FSM_TTL = 24 * 3600  # Tugallanmagan dialog holati shuncha soniyadan keyin o'chadi
+FSM_CACHE_SIZE = 1000  # Xotiradagi holatlar keshi (kalitlar soni)
+FSM_CACHE_CHECK_INTERVAL = 1.0  # Boshqa jarayonlar FSM ga yozganini (meta.fsm_version) tekshirish oralig'i, soniya
+
+# --- METRIKALAR ---
+METRICS_PATH = "/metrics"  # Prometheus text formatidagi metrikalar (webhook serverida)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # Polling rejimida alohida /metrics serveri (0 = o'chiq)
+LOOP_LAG_INTERVAL = 0.5  # Event loop kechikishini o'lchash oralig'i (soniya)
+
+# --- ISHGA TUSHISH ---
+# Og'ir modullar (QR rasm, Excel, NumPy) ishga tushganda yuklanmaydi; bot ishga tushgach
+# shuncha soniyadan keyin fonda (ishchi oqimda) oldindan yuklanadi. Bo'sh ro'yxat = o'chiq
+WARMUP_MODULES = ("qr", "reports", "numpy")
+WARMUP_DELAY = 5.0
@@ -1,10 +1,441 @@
+import asyncio
+import os
+import re
+import time
 import aiosqlite
-from config import DB_NAME
-from datetime import datetime
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import NamedTuple, Optional
+from config import (DB_NAME, DB_READER_POOL_SIZE, DB_BUSY_TIMEOUT_MS, DB_CACHE_SIZE_KB,
+                    DB_MMAP_SIZE, USER_CACHE_SIZE, USER_CACHE_CHECK_INTERVAL, REPORT_CHUNK_SIZE, QR_TOKEN_TTL, QR_HISTORY_RETENTION_DAYS,
+                    QR_HISTORY_PRUNE_BATCH, INCREMENTAL_VACUUM_PAGES, ARCHIVE_DIR, ARCHIVE_HOT_MONTHS,
+                    ARCHIVE_BATCH_SIZE, WRITE_BATCH_SIZE, WRITE_BATCH_DELAY, ROSTER_PAGE_SIZE)
+from datetime import datetime, date, timedelta
+import metrics
+import payroll
+from tokens import token_expires_at
+
+
+# --- ULANISHLAR BOSHQARUVCHISI ---
+
+class ConnectionManager:
+    """Bitta doimiy yozuvchi va bir nechta o'quvchi ulanishni boshqaradi.
+
+    Yozuvchi ulanish asyncio.Lock bilan himoyalangan (SQLite bir vaqtda faqat
+    bitta yozuvchiga ruxsat beradi), o'quvchilar esa navbatdan olinadi.
+    """
+
+    def __init__(self, path=DB_NAME, readers=DB_READER_POOL_SIZE):
+        self.path = path
+        self.reader_count = max(1, readers)
+        self._writer = None
+        self._write_lock = asyncio.Lock()
+        # Yozuvchiga ATTACH qilingan arxiv bilan ishlash (arxivlash, maoshni qayta hisoblash) navbat bilan:
+        # alias bitta, ikki vazifa bir vaqtda ulasa "database archive is already in use" bo'ladi
+        self._attach_lock = asyncio.Lock()
+        self._readers = asyncio.Queue()
+        self._all_readers = []
+
+    async def _connect(self, read_only=False):
+        db = await aiosqlite.connect(self.path)
+        pragmas = [
+            f"PRAGMA busy_timeout = {int(DB_BUSY_TIMEOUT_MS)}",
+            "PRAGMA synchronous = NORMAL",
+            f"PRAGMA cache_size = -{int(DB_CACHE_SIZE_KB)}",
+            f"PRAGMA mmap_size = {int(DB_MMAP_SIZE)}",
+            "PRAGMA temp_store = MEMORY",
+        ]
+        if read_only:
+            pragmas.append("PRAGMA query_only = ON")
+        else:
+            # WAL rejimi fayl darajasida saqlanadi, shuning uchun yozuvchida bir marta yoqiladi
+            pragmas.insert(0, "PRAGMA journal_mode = WAL")
+        for pragma in pragmas:
+            # Kursor darhol yopiladi, aks holda ochiq statement qulfni ushlab turadi
+            async with db.execute(pragma):
+                pass
+        return db
+
+    async def open(self):
+        self._writer = await self._connect()
+        for _ in range(self.reader_count):
+            db = await self._connect(read_only=True)
+            self._all_readers.append(db)
+            self._readers.put_nowait(db)
+
+    async def close(self):
+        for db in self._all_readers:
+            await db.close()
+        self._all_readers.clear()
+        self._readers = asyncio.Queue()
+        if self._writer is not None:
+            await self._writer.close()
+            self._writer = None
+
+    @asynccontextmanager
+    async def reader(self):
+        db = await self._readers.get()
+        try:
+            yield db
+        finally:
+            self._readers.put_nowait(db)
+
+    async def vacuum(self, auto_vacuum=None):
+        """VACUUM tranzaksiyadan tashqarida bajarilishi kerak.
+
+        auto_vacuum berilsa (masalan "INCREMENTAL"), rejim shu VACUUM bilan birga o'zgaradi.
+        """
+        async with self._write_lock:
+            if auto_vacuum is not None:
+                async with self._writer.execute(f"PRAGMA auto_vacuum = {auto_vacuum}"):
+                    pass
+            async with self._writer.execute("VACUUM"):
+                pass
+
+    async def incremental_vacuum(self, pages):
+        """Bo'sh sahifalardan ko'pi bilan pages tasini faylga qaytaradi. Qolgan bo'sh sahifalar sonini qaytaradi."""
+        async with self._write_lock:
+            async with self._writer.execute(f"PRAGMA incremental_vacuum({int(pages)})") as cursor:
+                await cursor.fetchall()
+            async with self._writer.execute("PRAGMA freelist_count") as cursor:
+                return (await cursor.fetchone())[0]
+
+    async def attach(self, path, alias):
+        """Yozuvchi ulanishga qo'shimcha baza faylini ulaydi (tranzaksiyadan tashqarida)."""
+        async with self._write_lock:
+            async with self._writer.execute(f"ATTACH DATABASE ? AS {alias}", (path,)):
+                pass
+
+    async def detach(self, alias):
+        async with self._write_lock:
+            async with self._writer.execute(f"DETACH DATABASE {alias}"):
+                pass
+
+    @asynccontextmanager
+    async def attached_writer(self, path, alias):
+        """Yozuvchi ulanishga path bazasini alias nomi bilan ulaydi; bunday vazifalar ketma-ket bajariladi."""
+        async with self._attach_lock:
+            await self.attach(path, alias)
+            try:
+                yield
+            finally:
+                await self.detach(alias)
+
+    @asynccontextmanager
+    async def attached_reader(self, path, alias):
+        """O'quvchi ulanish, unga vaqtincha path bazasi alias nomi bilan ulangan."""
+        async with self.reader() as db:
+            async with db.execute(f"ATTACH DATABASE ? AS {alias}", (path,)):
+                pass
+            try:
+                yield db
+            finally:
+                async with db.execute(f"DETACH DATABASE {alias}"):
+                    pass
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Yozuvchi ulanishda BEGIN IMMEDIATE ... COMMIT tranzaksiyasi."""
+        async with self._write_lock:
+            db = self._writer
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                await db.rollback()
+                raise
+            else:
+                await db.commit()
+
+
+_manager = None
+
+
+async def init_db(path=DB_NAME):
+    """Ulanishlarni ochadi. main() ichida bot ishga tushishidan oldin chaqiriladi."""
+    global _manager
+    if _manager is not None:
+        return _manager
+    manager = ConnectionManager(path)
+    await manager.open()
+    _manager = manager
+    return manager
+
+
+async def close_db():
+    """Barcha ulanishlarni yopadi (bot to'xtaganda)."""
+    global _manager
+    if _manager is not None:
+        await _manager.close()
+        _manager = None
+
+
+def get_manager():
+    if _manager is None:
+        raise RuntimeError("Baza ulanishi ochilmagan: avval init_db() chaqiring.")
+    return _manager
+
+
+# --- GURUHLI COMMIT (WRITE COALESCER) ---
+
+class WriteCoalescer:
+    """Parallel handlerlardan kelgan yozish amallarini bitta tranzaksiyaga yig'adi.
+
+    Amal — async funksiya(db), ochiq tranzaksiya ichida bajariladi va natija qaytaradi.
+    Har bir amal o'z SAVEPOINT ida: xato bergan amal (masalan _ScanAborted) faqat
+    o'zini bekor qiladi, qolganlari bitta COMMIT bilan yoziladi. Partiya birinchi
+    amaldan max_delay soniya o'tgach yoki max_batch ta amal yig'ilganda yoziladi.
+    Natija (yoki xato) chaqiruvchiga future orqali qaytadi; on_commit esa faqat
+    COMMIT muvaffaqiyatli bo'lgandan keyin chaqiriladi (xotiradagi keshlar uchun).
+    Ishga tushirilmagan bo'lsa, har bir amal o'z tranzaksiyasida bajariladi.
+    """
+
+    def __init__(self, max_batch=WRITE_BATCH_SIZE, max_delay=WRITE_BATCH_DELAY):
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+        self.batches = 0
+        self.operations = 0
+        self._queue = None
+        self._batch_full = None
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._batch_full = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Navbatdagi amallarni yozib bo'lib to'xtaydi; keyingi amallar to'g'ridan-to'g'ri bajariladi."""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        self._queue.put_nowait(None)
+        self._batch_full.set()
+        await task
+
+    async def submit(self, operation, on_commit=None):
+        if self._task is None:
+            async with get_manager().transaction() as db:
+                result = await operation(db)
+            if on_commit is not None:
+                on_commit(result)
+            return result
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((operation, on_commit, future))
+        if self._queue.qsize() >= self.max_batch:
+            self._batch_full.set()
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            if batch[0] is not None and self.max_delay > 0 and self._queue.qsize() < self.max_batch - 1:
+                self._batch_full.clear()
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            while len(batch) < self.max_batch and not self._queue.empty() and batch[-1] is not None:
+                batch.append(self._queue.get_nowait())
+
+            stopping = batch[-1] is None
+            operations = [item for item in batch if item is not None]
+            if operations:
+                await self._flush(operations)
+            if stopping:
+                return
+
+    async def _flush(self, batch):
+        outcomes = []
+        try:
+            async with get_manager().transaction() as db:
+                for operation, _, future in batch:
+                    if future.done():  # chaqiruvchi bekor qilingan — amal bajarilmaydi
+                        outcomes.append(None)
+                        continue
+                    # RELEASE shart emas: savepointlar COMMIT bilan birga yakunlanadi,
+                    # ROLLBACK TO esa eng oxirgi shu nomli savepointga qaytaradi
+                    async with db.execute("SAVEPOINT coalesced"):
+                        pass
+                    try:
+                        outcomes.append((True, await operation(db)))
+                    except Exception as e:
+                        async with db.execute("ROLLBACK TO coalesced"):
+                            pass
+                        outcomes.append((False, e))
+        except Exception as e:
+            # COMMIT (yoki tranzaksiyaning o'zi) muvaffaqiyatsiz: partiyadagi hech narsa yozilmadi
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.operations += len(batch)
+        metrics.increment("write_batches")
+        metrics.increment("write_batch_operations", len(batch))
+        for (_, on_commit, future), outcome in zip(batch, outcomes):
+            if outcome is None:
+                continue
+            ok, value = outcome
+            if ok and on_commit is not None:
+                on_commit(value)
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+write_coalescer = WriteCoalescer()
+
+
+# --- SXEMA MIGRATSIYALARI ---
+# Har bir migratsiya (versiya, [SQL yoki async funksiya(db), ...]) ko'rinishida. Joriy versiya
+# PRAGMA user_version da saqlanadi; faqat undan kattalari ketma-ket bajariladi.
+# Yangi o'zgarish kerak bo'lsa, ro'yxat oxiriga keyingi versiya qo'shiladi.
+
+MIGRATIONS = [
+    (1, [
+        # Bir kunga takroriy yozuvlarni birlashtirish (eng erta Keldi, eng kech Ketdi)
+        """
+        UPDATE attendance SET
+            check_in = (SELECT MIN(a2.check_in) FROM attendance a2
+                        WHERE a2.user_id = attendance.user_id AND a2.date = attendance.date),
+            check_out = (SELECT MAX(a2.check_out) FROM attendance a2
+                         WHERE a2.user_id = attendance.user_id AND a2.date = attendance.date)
+        WHERE id IN (SELECT MIN(id) FROM attendance GROUP BY user_id, date HAVING COUNT(*) > 1)
+        """,
+        "DELETE FROM attendance WHERE id NOT IN (SELECT MIN(id) FROM attendance GROUP BY user_id, date)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_user_date ON attendance(user_id, date)",
+        "CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance(date)",
+        "CREATE INDEX IF NOT EXISTS idx_qr_history_date ON qr_history(date)",
+    ]),
+    (2, [
+        # Ixcham davomat sxemasi: kun raqami va soniyalar (INTEGER), ism users dan olinadi.
+        # Avval o'chirilgan ishchilarning ismlari yo'qolmasligi uchun ular users ga 'deleted' sifatida qaytariladi.
+        """
+        INSERT INTO users (user_id, full_name, telegram_id, role)
+        SELECT a.user_id, MAX(a.full_name), NULL, 'deleted' FROM attendance a
+        LEFT JOIN users u ON u.user_id = a.user_id
+        WHERE u.user_id IS NULL AND a.user_id IS NOT NULL
+        GROUP BY a.user_id
+        """,
+        """
+        CREATE TABLE attendance_compact (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            check_in INTEGER,
+            check_out INTEGER,
+            FOREIGN KEY(user_id) REFERENCES users(user_id)
+        )
+        """,
+        """
+        INSERT INTO attendance_compact (id, user_id, day, check_in, check_out)
+        SELECT id, user_id,
+               CAST(strftime('%s', date) AS INTEGER) / 86400,
+               CAST(strftime('%s', '1970-01-01 ' || NULLIF(check_in, '')) AS INTEGER),
+               CAST(strftime('%s', '1970-01-01 ' || NULLIF(check_out, '')) AS INTEGER)
+        FROM attendance
+        WHERE user_id IS NOT NULL AND strftime('%s', date) IS NOT NULL
+        """,
+        "DROP TABLE attendance",
+        "ALTER TABLE attendance_compact RENAME TO attendance",
+        "CREATE UNIQUE INDEX idx_attendance_user_day ON attendance(user_id, day)",
+        "CREATE INDEX idx_attendance_day ON attendance(day)",
+    ]),
+    (3, [
+        # Kunlik va oylik maosh jadvallari: skan paytida yangilanadi, hisobotlar ulardan o'qiydi
+        """
+        CREATE TABLE daily_payroll (
+            user_id INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            worked_seconds INTEGER NOT NULL DEFAULT 0,
+            is_late INTEGER NOT NULL DEFAULT 0,
+            salary REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, day)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX idx_daily_payroll_day ON daily_payroll(day)",
+        """
+        CREATE TABLE monthly_payroll (
+            user_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            worked_seconds INTEGER NOT NULL DEFAULT 0,
+            worked_days INTEGER NOT NULL DEFAULT 0,
+            late_days INTEGER NOT NULL DEFAULT 0,
+            salary REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, month)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX idx_monthly_payroll_month ON monthly_payroll(month)",
+        # Mavjud davomat tarixidan to'ldirish
+        lambda db: _rebuild_payroll_months(db),
+    ]),
+    (4, [
+        # aiogram FSM holatlari (admin dialoglari qayta ishga tushirishda yo'qolmasligi uchun)
+        """
+        CREATE TABLE fsm (
+            key TEXT PRIMARY KEY,
+            state TEXT,
+            data TEXT NOT NULL DEFAULT '{}',
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX idx_fsm_expires ON fsm(expires_at)",
+    ]),
+    (5, [
+        # Ishchilar ro'yxati sahifalari: role = 'worker' bo'yicha (full_name, telegram_id) tartibida
+        "CREATE INDEX idx_users_roster ON users(role, full_name, telegram_id)",
+    ]),
+    (6, [
+        # Davomat o'zgarishlari hisoblagichi: hisobot keshi kaliti (report_cache) shunga bog'liq
+        "CREATE TABLE meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL) WITHOUT ROWID",
+        "INSERT INTO meta (key, value) VALUES ('data_version', 0)",
+    ]),
+    (7, [
+        # Foydalanuvchilar o'zgarishlari hisoblagichi: boshqa jarayonlar user_directory ni shu bilan tekshiradi
+        "INSERT INTO meta (key, value) VALUES ('users_version', 0)",
+    ]),
+    (8, [
+        # FSM yozuvlari hisoblagichi: fsm_storage keshi boshqa jarayonlar yozganini shu bilan aniqlaydi
+        "INSERT INTO meta (key, value) VALUES ('fsm_version', 0)",
+    ]),
+]
+
+# Shu versiyagacha bo'lgan bazada jadval qayta quriladi; keyin bo'shagan joy VACUUM bilan qaytariladi
+COMPACT_ATTENDANCE_VERSION = 2
+
+# PRAGMA auto_vacuum qiymati: 2 = INCREMENTAL (o'chirilgan qatorlar joyi bosqichma-bosqich qaytariladi)
+AUTO_VACUUM_INCREMENTAL = 2
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+async def _run_migrations(db):
+    """Ochiq tranzaksiya ichida yetishmayotgan migratsiyalarni bajaradi. Oldingi versiyani qaytaradi."""
+    async with db.execute("PRAGMA user_version") as cursor:
+        previous = current = (await cursor.fetchone())[0]
+
+    for version, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        for step in statements:
+            if callable(step):
+                await step(db)
+            else:
+                await db.execute(step)
+        await db.execute(f"PRAGMA user_version = {int(version)}")
+        current = version
+    return previous
 
 
 async def create_tables():
-    async with aiosqlite.connect(DB_NAME) as db:
+    async with get_manager().transaction() as db:
         # 1. Foydalanuvchilar jadvali
         await db.execute("""
             CREATE TABLE IF NOT EXISTS users (
@@ -15,7 +446,7 @@ async def create_tables():
             )
         """)
 
-        # 2. Davomat jadvali
+        # 2. Davomat jadvali (boshlang'ich sxema; ixcham ko'rinishga MIGRATIONS o'tkazadi)
         await db.execute("""
             CREATE TABLE IF NOT EXISTS attendance (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -39,120 +470,1086 @@ async def create_tables():
                 timestamp TEXT
             )
         """)
-        await db.commit()
+
+        # 4. Indekslar va boshqa sxema o'zgarishlari (mavjud bazalar ham yangilanadi)
+        previous_version = await _run_migrations(db)
+
+        async with db.execute("PRAGMA auto_vacuum") as cursor:
+            auto_vacuum = (await cursor.fetchone())[0]
+
+    # auto_vacuum rejimini mavjud bazada faqat to'liq VACUUM bilan o'zgartirish mumkin (bir marta)
+    if previous_version < COMPACT_ATTENDANCE_VERSION or auto_vacuum != AUTO_VACUUM_INCREMENTAL:
+        await get_manager().vacuum(auto_vacuum="INCREMENTAL")
 
 
 # --- QR MANTIQI FUNKSIYALARI ---
 
+class UsedTokenStore:
+    """Ishlatilgan, lekin muddati hali o'tmagan tokenlar (token -> muddat, unix soniya).
+
+    Muddati o'tgan token verify_token da bazasiz rad etiladi, shuning uchun
+    xotirada faqat amal qilish muddati ichidagi tokenlar saqlanadi va to'plam
+    hajmi QR_TOKEN_TTL oralig'idagi skanlar soni bilan cheklanadi. Asosiy
+    kafolat baribir qr_history dagi PRIMARY KEY: bu to'plam takroriy skanlarni
+    yozuvchi qulfiga yetib bormasdan qaytaradi.
+    """
+
+    def __init__(self):
+        self._tokens = {}
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def __contains__(self, token):
+        return token in self._tokens
+
+    def add(self, token):
+        expires = token_expires_at(token)
+        if expires > time.time():
+            self._tokens[token] = expires
+
+    def load(self, tokens):
+        self._tokens.clear()
+        for token in tokens:
+            self.add(token)
+
+    def clear(self):
+        self._tokens.clear()
+
+    def prune(self, now=None):
+        """Muddati o'tganlarini chiqaradi. Nechta chiqarilganini qaytaradi."""
+        now = time.time() if now is None else now
+        expired = [token for token, expires in self._tokens.items() if expires <= now]
+        for token in expired:
+            del self._tokens[token]
+        return len(expired)
+
+
+used_tokens = UsedTokenStore()
+
+
+def _qr_history_cutoff(retention_days=QR_HISTORY_RETENTION_DAYS):
+    """Shu sanadan oldingi qr_history yozuvlari kerak emas ('YYYY-MM-DD').
+
+    Saqlash muddati token amal qilish muddatidan qisqa bo'lmaydi, aks holda
+    hali yaroqli token qayta ishlatilishi mumkin bo'lardi.
+    """
+    ttl_days = -(-QR_TOKEN_TTL // 86400) + 1
+    return (date.today() - timedelta(days=max(retention_days, ttl_days))).isoformat()
+
+
+@metrics.db_timed
+async def load_used_tokens():
+    """Muddati o'tmagan ishlatilgan tokenlarni bazadan xotiraga yuklaydi (ishga tushganda)."""
+    since = (date.today() - timedelta(days=-(-QR_TOKEN_TTL // 86400) + 1)).isoformat()
+    async with get_manager().reader() as db:
+        async with db.execute("SELECT token FROM qr_history WHERE date >= ?", (since,)) as cursor:
+            used_tokens.load(row[0] for row in await cursor.fetchall())
+    return len(used_tokens)
+
+
+@metrics.db_timed
 async def check_token_used(token):
     """Tokenning avval ishlatilgan yoki ishlatilmaganligini tekshiradi."""
-    async with aiosqlite.connect(DB_NAME) as db:
+    if token in used_tokens:
+        return True
+    async with get_manager().reader() as db:
         async with db.execute("SELECT 1 FROM qr_history WHERE token = ?", (token,)) as cursor:
             return await cursor.fetchone() is not None
 
 
+@metrics.db_timed
 async def mark_token_used(token, action_type, user_id, full_name):
     """Tokenni ishlatilgan deb bazaga yozadi."""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     date_now = datetime.now().strftime("%Y-%m-%d")
 
-    async with aiosqlite.connect(DB_NAME) as db:
+    async def insert(db):
         await db.execute(
             "INSERT INTO qr_history (token, action_type, date, used_by_id, used_by_name, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
             (token, action_type, date_now, user_id, full_name, timestamp))
-        await db.commit()
+
+    await write_coalescer.submit(insert, on_commit=lambda _: used_tokens.add(token))
+
+
+@metrics.db_timed
+async def prune_qr_history(retention_days=QR_HISTORY_RETENTION_DAYS, batch_size=QR_HISTORY_PRUNE_BATCH):
+    """Eski qr_history yozuvlarini kichik bo'laklarda o'chiradi.
+
+    Har bir bo'lak alohida qisqa tranzaksiya, orada event loop bo'shatiladi,
+    shuning uchun skanlar yozuvchi qulfini uzoq kutmaydi. O'chirilganlar sonini qaytaradi.
+    """
+    cutoff = _qr_history_cutoff(retention_days)
+    deleted = 0
+    while True:
+        async with get_manager().transaction() as db:
+            cursor = await db.execute(
+                "DELETE FROM qr_history WHERE rowid IN "
+                "(SELECT rowid FROM qr_history WHERE date < ? LIMIT ?)", (cutoff, batch_size))
+            count = cursor.rowcount
+            await cursor.close()
+        deleted += count
+        if count < batch_size:
+            break
+        await asyncio.sleep(0)
+    used_tokens.prune()
+    return deleted
+
+
+async def reclaim_free_pages(pages_per_step=INCREMENTAL_VACUUM_PAGES):
+    """Bo'sh sahifalarni incremental_vacuum bilan bosqichma-bosqich faylga qaytaradi."""
+    while await get_manager().incremental_vacuum(pages_per_step) > 0:
+        await asyncio.sleep(0)
+
+
+# --- FOYDALANUVCHILAR KESHI (USER DIRECTORY) ---
+
+class UserDirectory:
+    """telegram_id -> users qatori xotiradagi LRU keshi.
+
+    Ishga tushganda to'liq yuklanadi va add_user/delete_worker orqali
+    write-through yangilanadi. Agar butun ro'yxat sig'sa (complete=True),
+    keshda yo'q foydalanuvchi bazaga murojaatsiz "ro'yxatda yo'q" deb hisoblanadi.
+    version — kesh mos keladigan meta.users_version: bir bazada bir nechta jarayon
+    ishlasa, boshqasi qo'shgan yoki o'chirgan ishchi get_user da shu orqali aniqlanadi.
+    Versiya USER_CACHE_CHECK_INTERVAL da bir martadan ko'p o'qilmaydi: keshdan topilgan
+    foydalanuvchi uchun skan bazaga murojaat qilmaydi.
+    """
+
+    def __init__(self, max_size=USER_CACHE_SIZE):
+        self.max_size = max(1, max_size)
+        self.complete = False
+        self.version = None
+        self.checked_at = float("-inf")  # versiya oxirgi marta tekshirilgan payt (time.monotonic)
+        self.hits = 0
+        self.misses = 0
+        self._users = OrderedDict()
+
+    def __len__(self):
+        return len(self._users)
+
+    def load(self, rows, version=None):
+        self._users.clear()
+        for row in rows:
+            self.put(row)
+        self.complete = len(rows) <= self.max_size
+        self.version = version
+        self.checked_at = time.monotonic()
+
+    def advance(self):
+        """Shu jarayonning tranzaksiyasi users_version ni bittaga oshirdi (keshga o'zi yozdi)."""
+        if self.version is not None:
+            self.version += 1
+
+    def lookup(self, telegram_id):
+        """(topildi, qator) qaytaradi. topildi=False bo'lsa bazadan o'qish kerak."""
+        row = self._users.get(telegram_id)
+        if row is not None:
+            self._users.move_to_end(telegram_id)
+            self.hits += 1
+            return True, row
+        if self.complete:
+            self.hits += 1
+            return True, None
+        self.misses += 1
+        return False, None
+
+    def put(self, row):
+        telegram_id = row[2]
+        self._users[telegram_id] = row
+        self._users.move_to_end(telegram_id)
+        if len(self._users) > self.max_size:
+            self._users.popitem(last=False)
+            # Endi keshda yo'qligi "bazada yo'q" degani emas
+            self.complete = False
+
+    def remove(self, telegram_id):
+        self._users.pop(telegram_id, None)
+
+    def workers(self):
+        """Keshdagi ishchilar: {user_id: full_name}. complete=False bo'lsa ro'yxat to'liq emas."""
+        return {row[0]: row[1] for row in self._users.values() if row[3] == 'worker'}
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._users),
+            "max_size": self.max_size,
+            "complete": self.complete,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+user_directory = UserDirectory()
+
+
+# --- BUGUNGI HOLAT (PRESENCE) ---
+
+class PresenceIndex:
+    """Bir kunlik davomat holati xotirada: kim keldi, kim ketdi, kim kechikdi.
+
+    Ishga tushganda (yoki kun almashganda) bitta indekslangan so'rov bilan
+    to'ldiriladi, so'ng har bir muvaffaqiyatli Keldi/Ketdi COMMIT dan keyin
+    yangilanadi. /now buyrug'i bazaga murojaat qilmasdan shu yerdan o'qiydi.
+    version — indeks mos keladigan meta.data_version: har bir muvaffaqiyatli skan
+    uni aynan bittaga oshiradi. Bazadagi qiymat boshqacha bo'lsa, davomatni boshqa
+    jarayon (yoki tozalash/arxivlash) o'zgartirgan va /now indeksni qayta yuklaydi.
+    """
+
+    def __init__(self):
+        self.day = None
+        self.version = None
+        self.names = {}  # user_id -> full_name
+        self.check_in = {}  # user_id -> soniya
+        self.check_out = {}
+        self.late = set()
+
+    def load(self, day, rows, version=None):
+        """rows: (user_id, full_name, check_in, check_out) — kunning barcha davomat qatorlari."""
+        self.day = day
+        self.version = version
+        self.names.clear()
+        self.check_in.clear()
+        self.check_out.clear()
+        self.late.clear()
+        for user_id, full_name, check_in, check_out in rows:
+            self.names[user_id] = full_name
+            if check_in is not None:
+                self._set_in(user_id, check_in)
+            if check_out is not None:
+                self.check_out[user_id] = check_out
+
+    def _set_in(self, user_id, seconds):
+        self.check_in[user_id] = seconds
+        if seconds > payroll.LATE_LIMIT_SECONDS:
+            self.late.add(user_id)
+
+    def record(self, user, action_type, now):
+        """Muvaffaqiyatli skan: user — users qatori, now — skan vaqti."""
+        if self.day is None:
+            return  # Hali yuklanmagan: /now birinchi chaqiruvda bazadan yuklaydi
+        day = payroll.date_to_day(now.date())
+        version = None if self.version is None else self.version + 1
+        if day != self.day:
+            # Kun almashdi: boshqa jarayon yozgan bo'lsa, versiya farqi /now da qayta yuklatadi
+            self.load(day, [])
+        self.version = version
+        user_id = user[0]
+        seconds = now.hour * 3600 + now.minute * 60 + now.second
+        self.names[user_id] = user[1]
+        if action_type == 'in':
+            self._set_in(user_id, seconds)
+        elif action_type == 'out':
+            self.check_out[user_id] = seconds
+
+    def clear(self):
+        self.load(None, [])
+
+    def is_current(self, day, version):
+        return self.day == day and self.version == version
+
+    def snapshot(self, workers):
+        """workers: {user_id: full_name} — ro'yxatdagi ishchilar. Kelmaganlar to'plamlar ayirmasi bilan topiladi."""
+        present = self.check_in.keys() - self.check_out.keys()
+        return {
+            "present": sorted((self.names[uid], self.check_in[uid]) for uid in present),
+            "left": sorted((self.names[uid], self.check_in[uid], self.check_out[uid])
+                           for uid in self.check_out.keys() & self.check_in.keys()),
+            "late": sorted((self.names[uid], self.check_in[uid]) for uid in self.late),
+            "absent": sorted(workers[uid] for uid in workers.keys() - self.check_in.keys()),
+        }
+
+
+presence = PresenceIndex()
+
+
+@metrics.db_timed
+async def load_presence(day=None):
+    """Kunning davomatini (idx_attendance_day bo'yicha) presence indeksiga yuklaydi."""
+    day = payroll.date_to_day(date.today()) if day is None else day
+    async with get_manager().reader() as db:
+        # Versiya qatorlardan oldin o'qiladi: oraliqda yozuv tushsa, keyingi /now qayta yuklaydi
+        version = await _read_meta(db, 'data_version')
+        async with db.execute(
+                "SELECT a.user_id, u.full_name, a.check_in, a.check_out "
+                "FROM attendance a JOIN users u ON u.user_id = a.user_id WHERE a.day = ?", (day,)) as cursor:
+            rows = await cursor.fetchall()
+    presence.load(day, rows, version)
+    return len(rows)
+
+
+@metrics.db_timed
+async def load_user_directory():
+    """Foydalanuvchilar keshini bazadan to'liq yuklaydi (ishga tushganda)."""
+    async with get_manager().reader() as db:
+        await _load_users(db, await _read_meta(db, 'users_version'))
+    return len(user_directory)
+
+
+async def _check_user_directory():
+    """Boshqa jarayon ishchi qo'shgan/o'chirgan bo'lsa (users_version o'zgargan), kesh bazadan qayta yuklanadi."""
+    # Bir vaqtda kelgan skanlar versiyani qayta-qayta o'qimasin
+    user_directory.checked_at = time.monotonic()
+    async with get_manager().reader() as db:
+        version = await _read_meta(db, 'users_version')
+        if version != user_directory.version:
+            await _load_users(db, version)
+
+
+async def _load_users(db, version):
+    # O'chirilgan ishchilarda telegram_id NULL: ular keshda bitta None kalitiga tushib, joy egallardi
+    async with db.execute("SELECT * FROM users WHERE telegram_id IS NOT NULL ORDER BY user_id DESC LIMIT ?",
+                          (user_directory.max_size + 1,)) as cursor:
+        rows = await cursor.fetchall()
+    # Eng yangilari oxirida bo'lsin (LRU da oxirgi bo'lib chiqariladi)
+    user_directory.load(rows[::-1], version)
 
 
 # --- ASOSIY DAVOMAT VA USER FUNKSIYALARI ---
 
+@metrics.db_timed
 async def add_user(full_name, telegram_id):
-    async with aiosqlite.connect(DB_NAME) as db:
-        try:
-            await db.execute("INSERT INTO users (full_name, telegram_id) VALUES (?, ?)",
-                             (full_name, telegram_id))
-            await db.commit()
-            return True
-        except Exception:
-            return False
+    try:
+        async with get_manager().transaction() as db:
+            cursor = await db.execute("INSERT INTO users (full_name, telegram_id) VALUES (?, ?)",
+                                      (full_name, telegram_id))
+            user_db_id = cursor.lastrowid
+            await cursor.close()
+            await _bump_users_version(db)
+    except Exception:
+        return False
+    user_directory.put((user_db_id, full_name, telegram_id, 'worker'))
+    user_directory.advance()
+    return True
+
+
+@metrics.db_timed
+async def add_users_bulk(rows):
+    """[(full_name, telegram_id), ...] ni bitta tranzaksiyada executemany bilan qo'shadi.
+
+    Bazada bor telegram_id lar ON CONFLICT DO NOTHING bilan o'tkazib yuboriladi.
+    Yozuvchi qulfi ostida yangi qatorlar user_id bo'yicha avvalgi maksimumdan
+    keyin keladi, shuning uchun ular bitta so'rov bilan qayta o'qilib keshga qo'shiladi.
+    (qo'shilganlar, takroriylar) sonini qaytaradi.
+    """
+    if not rows:
+        return 0, 0
+    async with get_manager().transaction() as db:
+        async with db.execute("SELECT COALESCE(MAX(user_id), 0) FROM users") as cursor:
+            last_id = (await cursor.fetchone())[0]
+        await db.executemany(
+            "INSERT INTO users (full_name, telegram_id) VALUES (?, ?) ON CONFLICT(telegram_id) DO NOTHING", rows)
+        async with db.execute("SELECT * FROM users WHERE user_id > ? ORDER BY user_id", (last_id,)) as cursor:
+            inserted = await cursor.fetchall()
+        await _bump_users_version(db)
+    for row in inserted:
+        user_directory.put(row)
+    user_directory.advance()
+    return len(inserted), len(rows) - len(inserted)
+
+
+async def _fetch_user(db, telegram_id):
+    async with db.execute("SELECT * FROM users WHERE telegram_id = ?", (telegram_id,)) as cursor:
+        return await cursor.fetchone()
 
 
+@metrics.db_timed
 async def get_user(telegram_id):
-    async with aiosqlite.connect(DB_NAME) as db:
-        async with db.execute("SELECT * FROM users WHERE telegram_id = ?", (telegram_id,)) as cursor:
-            return await cursor.fetchone()
+    if time.monotonic() - user_directory.checked_at >= USER_CACHE_CHECK_INTERVAL:
+        await _check_user_directory()
+    found, user = user_directory.lookup(telegram_id)
+    if found:
+        return user
+    async with get_manager().reader() as db:
+        user = await _fetch_user(db, telegram_id)
+    if user:
+        user_directory.put(user)
+    return user
 
 
+@metrics.db_timed
 async def get_all_workers():
-    async with aiosqlite.connect(DB_NAME) as db:
+    async with get_manager().reader() as db:
         async with db.execute(
                 "SELECT full_name, telegram_id FROM users WHERE role='worker' ORDER BY full_name") as cursor:
             return await cursor.fetchall()
 
 
-async def delete_worker(telegram_id):
-    async with aiosqlite.connect(DB_NAME) as db:
-        await db.execute("DELETE FROM users WHERE telegram_id = ?", (telegram_id,))
-        await db.commit()
+@metrics.db_timed
+async def get_workers_page(after=None, before=None, prefix=None, limit=ROSTER_PAGE_SIZE):
+    """Ishchilar ro'yxatining bitta sahifasi (keyset pagination, idx_users_roster bo'yicha).
 
+    Kursor — (user_id, telegram_id): user_id bo'yicha ism olinadi va (full_name, telegram_id)
+    juftligi shu qatordan keyin (after) yoki oldin (before) keladiganlar o'qiladi.
+    prefix berilsa, faqat ismi shu bilan boshlanadiganlar. Sahifa hajmi ro'yxat
+    kattaligiga bog'liq emas. ([(user_id, full_name, telegram_id), ...], oldingi_bor, keyingi_bor) qaytaradi.
+    """
+    conditions, params = ["role = 'worker'"], []
+    if prefix:
+        conditions.append("full_name >= ? AND full_name < ?")
+        params += [prefix, prefix + "\U0010ffff"]
+    cursor_row = after or before
+    if cursor_row:
+        op = "<" if before else ">"
+        conditions.append(f"(full_name, telegram_id) {op} ((SELECT full_name FROM users WHERE user_id = ?), ?)")
+        params += list(cursor_row)
+    order = "DESC" if before else "ASC"
+    sql = (f"SELECT user_id, full_name, telegram_id FROM users WHERE {' AND '.join(conditions)} "
+           f"ORDER BY full_name {order}, telegram_id {order} LIMIT ?")
+
+    async with get_manager().reader() as db:
+        async with db.execute(sql, params + [limit + 1]) as cursor:
+            rows = await cursor.fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if before:
+        rows.reverse()
+        return rows, more, True
+    return rows, bool(after), more
 
-async def mark_attendance(telegram_id, action_type):
-    date_today = datetime.now().strftime("%Y-%m-%d")
-    time_now = datetime.now().strftime("%H:%M:%S")
 
-    async with aiosqlite.connect(DB_NAME) as db:
-        user = await get_user(telegram_id)
-        if not user: return "Siz bazada yo'qsiz!", None
-        user_db_id, full_name = user[0], user[1]
+@metrics.db_timed
+async def delete_worker(telegram_id):
+    # Davomat tarixida ism users dan olinadi, shuning uchun qator o'chirilmaydi:
+    # faqat telegram_id bo'shatiladi va rol 'deleted' ga o'zgaradi.
+    async with get_manager().transaction() as db:
+        await db.execute("UPDATE users SET telegram_id = NULL, role = 'deleted' WHERE telegram_id = ?",
+                         (telegram_id,))
+        await _bump_users_version(db)
+    user_directory.remove(telegram_id)
+    user_directory.advance()
 
-        async with db.execute("SELECT id, check_in, check_out FROM attendance WHERE user_id = ? AND date = ?",
-                              (user_db_id, date_today)) as cursor:
-            record = await cursor.fetchone()
 
-        admin_report_text = None
+async def _apply_attendance(db, user, action_type, now):
+    """Davomatni ochiq tranzaksiya ichida yozadi. (status_text, admin_report_text) qaytaradi.
 
-        if action_type == 'in':
-            if record and record[1]:
-                return "⚠️ **Siz bugun allaqachon kelishni qayd etgansiz!**", None
+    Sana kun raqami, vaqt esa yarim tundan beri soniyalar sifatida saqlanadi.
+    (user_id, day) UNIQUE indeksi tufayli oddiy holatda bitta indekslangan
+    so'rov yetarli; qo'shimcha SELECT faqat rad etilganda xabar tanlash uchun.
+    """
+    user_db_id, full_name = user[0], user[1]
+    day = payroll.date_to_day(now.date())
+    seconds = now.hour * 3600 + now.minute * 60 + now.second
+    date_today = now.strftime("%Y-%m-%d")
+    time_now = now.strftime("%H:%M:%S")
 
-            if record and not record[1]:
-                await db.execute("UPDATE attendance SET check_in = ? WHERE id = ?", (time_now, record[0]))
-            else:
-                await db.execute("INSERT INTO attendance (user_id, full_name, date, check_in) VALUES (?, ?, ?, ?)",
-                                 (user_db_id, full_name, date_today, time_now))
-            await db.commit()
+    if action_type == 'in':
+        cursor = await db.execute(
+            "INSERT INTO attendance (user_id, day, check_in) VALUES (?, ?, ?) "
+            "ON CONFLICT(user_id, day) DO UPDATE SET check_in = excluded.check_in "
+            "WHERE attendance.check_in IS NULL",
+            (user_db_id, day, seconds))
+        written = cursor.rowcount == 1
+        await cursor.close()
+        if not written:
+            return "⚠️ **Siz bugun allaqachon kelishni qayd etgansiz!**", None
 
-            # Admin uchun xabar tayyorlash (Kelish)
-            admin_report_text = f"🟢 **{full_name} Ishga Keldi!**\n👤 Ishchi: **{full_name}**\n🕒 Vaqt: **{time_now}**\n📅 Sana: {date_today}"
-            return f"✅ Keldingiz: **{time_now}**", admin_report_text
+        await _payroll_check_in(db, user_db_id, day, seconds)
+        await _bump_data_version(db)
 
-        elif action_type == 'out':
-            if not record or not record[1]:
+        # Admin uchun xabar tayyorlash (Kelish)
+        admin_report_text = f"🟢 **{full_name} Ishga Keldi!**\n👤 Ishchi: **{full_name}**\n🕒 Vaqt: **{time_now}**\n📅 Sana: {date_today}"
+        return f"✅ Keldingiz: **{time_now}**", admin_report_text
+
+    elif action_type == 'out':
+        async with db.execute(
+                "UPDATE attendance SET check_out = ? "
+                "WHERE user_id = ? AND day = ? AND check_in IS NOT NULL AND check_out IS NULL "
+                "RETURNING check_in",
+                (seconds, user_db_id, day)) as cursor:
+            updated = await cursor.fetchone()
+        if not updated:
+            async with db.execute("SELECT check_in FROM attendance WHERE user_id = ? AND day = ?",
+                                  (user_db_id, day)) as cursor:
+                record = await cursor.fetchone()
+            if not record or record[0] is None:
                 return "⚠ Xatolik! Siz bugun hali **Keldi** qilmagansiz.", None
-            if record[2]:
-                return "⚠ Siz allaqachon **Ketdi** qilgansiz!", None
+            return "⚠ Siz allaqachon **Ketdi** qilgansiz!", None
+
+        await _payroll_check_out(db, user_db_id, day, updated[0], seconds)
+        await _bump_data_version(db)
+
+        # Admin uchun xabar tayyorlash (Ketish)
+        admin_report_text = f"🔴 **{full_name} Ketdi!**\n👤 Ishchi: **{full_name}**\n🕒 Vaqt: **{time_now}**\n📅 Sana: {date_today}"
+        return f"✅ Ketdingiz: **{time_now}**", admin_report_text
+
+    return "Xatolik yuz berdi.", None
+
+
+# --- KUNLIK / OYLIK MAOSH JADVALLARI ---
+# daily_payroll har bir kun uchun bir marta (Ketdi paytida) hisoblanadi va
+# monthly_payroll ga qo'shib boriladi; Keldi paytida faqat kechikish yoziladi.
+# HOURLY_RATE yoki tushlik/kechikish sozlamalari o'zgarsa, rebuild_payroll() chaqiriladi.
+
+async def _payroll_check_in(db, user_db_id, day, check_in):
+    is_late = int(check_in > payroll.LATE_LIMIT_SECONDS)
+    await db.execute(
+        "INSERT INTO daily_payroll (user_id, day, is_late) VALUES (?, ?, ?) "
+        "ON CONFLICT(user_id, day) DO UPDATE SET is_late = excluded.is_late",
+        (user_db_id, day, is_late))
+    await db.execute(
+        "INSERT INTO monthly_payroll (user_id, month, late_days) VALUES (?, ?, ?) "
+        "ON CONFLICT(user_id, month) DO UPDATE SET late_days = late_days + excluded.late_days",
+        (user_db_id, payroll.day_month(day), is_late))
 
-            await db.execute("UPDATE attendance SET check_out = ? WHERE id = ?", (time_now, record[0]))
-            await db.commit()
 
-            # Admin uchun xabar tayyorlash (Ketish)
-            admin_report_text = f"🔴 **{full_name} Ketdi!**\n👤 Ishchi: **{full_name}**\n🕒 Vaqt: **{time_now}**\n📅 Sana: {date_today}"
-            return f"✅ Ketdingiz: **{time_now}**", admin_report_text
+async def _payroll_check_out(db, user_db_id, day, check_in, check_out):
+    is_late, worked_seconds = payroll.work_day(check_in, check_out)
+    salary, _ = payroll.day_salary(worked_seconds, payroll.day_weekday(day) == payroll.SUNDAY)
+    await db.execute(
+        "INSERT INTO daily_payroll (user_id, day, worked_seconds, is_late, salary) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(user_id, day) DO UPDATE SET worked_seconds = excluded.worked_seconds, "
+        "is_late = excluded.is_late, salary = excluded.salary",
+        (user_db_id, day, worked_seconds, int(is_late), salary))
+    await db.execute(
+        "INSERT INTO monthly_payroll (user_id, month, worked_seconds, worked_days, salary) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(user_id, month) DO UPDATE SET worked_seconds = worked_seconds + excluded.worked_seconds, "
+        "worked_days = worked_days + excluded.worked_days, salary = salary + excluded.salary",
+        (user_db_id, payroll.day_month(day), worked_seconds, int(worked_seconds > 0), salary))
 
-        return "Xatolik yuz berdi.", None
 
+async def _rebuild_payroll_month(db, month, schema="main"):
+    """Bitta oy uchun daily_payroll va monthly_payroll ni davomatdan qaytadan hisoblaydi.
 
-async def get_attendance_data():
-    async with aiosqlite.connect(DB_NAME) as db:
+    Arxivlangan oy uchun schema="archive" (davomat va daily_payroll arxiv faylida,
+    monthly_payroll esa doim asosiy bazada).
+    """
+    first_day, last_day = payroll.month_day_range(month)
+    await db.execute(f"DELETE FROM {schema}.daily_payroll WHERE day BETWEEN ? AND ?", (first_day, last_day))
+    await db.execute("DELETE FROM main.monthly_payroll WHERE month = ?", (month,))
+
+    async with db.execute(f"SELECT user_id, day, check_in, check_out FROM {schema}.attendance "
+                          "WHERE day BETWEEN ? AND ?", (first_day, last_day)) as cursor:
+        rows = await cursor.fetchall()
+    if not rows:
+        return 0
+
+    user_ids, days, check_ins, check_outs = zip(*rows)
+    batch = payroll.compute_days(check_ins, check_outs, days)
+    await db.executemany(
+        f"INSERT INTO {schema}.daily_payroll (user_id, day, worked_seconds, is_late, salary) VALUES (?, ?, ?, ?, ?)",
+        zip(user_ids, days, batch.worked_seconds.astype(int).tolist(), batch.is_late.astype(int).tolist(),
+            batch.salary_per_day.tolist()))
+    await db.execute(
+        "INSERT INTO main.monthly_payroll (user_id, month, worked_seconds, worked_days, late_days, salary) "
+        "SELECT user_id, ?, SUM(worked_seconds), SUM(worked_seconds > 0), SUM(is_late), SUM(salary) "
+        f"FROM {schema}.daily_payroll WHERE day BETWEEN ? AND ? GROUP BY user_id",
+        (month, first_day, last_day))
+    return len(rows)
+
+
+async def _attendance_months(db):
+    async with db.execute("SELECT MIN(day), MAX(day) FROM attendance") as cursor:
+        first_day, last_day = await cursor.fetchone()
+    if first_day is None:
+        return []
+    months = []
+    day = first_day
+    while day <= last_day:
+        month = payroll.day_month(day)
+        months.append(month)
+        day = payroll.month_day_range(month)[1] + 1
+    return months
+
+
+async def _rebuild_payroll_months(db):
+    total = 0
+    for month in await _attendance_months(db):
+        total += await _rebuild_payroll_month(db, month)
+    return total
+
+
+@metrics.db_timed
+async def rebuild_payroll(months=None):
+    """Maosh jadvallarini qaytadan hisoblaydi (backfill yoki sozlamalar o'zgarganda).
+
+    Har bir oy alohida tranzaksiyada bajariladi, shuning uchun yozuvchi qulfi
+    uzoq band bo'lmaydi va skanlar oylar orasida o'tib ketaveradi. Arxivlangan
+    oylar o'z arxiv fayli orqali qayta hisoblanadi.
+    """
+    if months is None:
+        async with get_manager().reader() as db:
+            months = await _attendance_months(db)
+        months = sorted(set(months) | set(archived_months()))
+
+    manager = get_manager()
+    total = 0
+    for month in months:
+        path = archive_path(month)
+        if not os.path.exists(path):
+            async with manager.transaction() as db:
+                total += await _rebuild_payroll_month(db, month)
+            continue
+        async with manager.attached_writer(path, "archive"):
+            async with manager.transaction() as db:
+                total += await _rebuild_payroll_month(db, month, schema="archive")
+    return total
+
+
+@metrics.db_timed
+async def get_monthly_payroll(month):
+    """Oy bo'yicha har bir ishchining jami: (full_name, worked_seconds, worked_days, late_days, salary)."""
+    async with get_manager().reader() as db:
         async with db.execute(
-                "SELECT full_name, date, check_in, check_out FROM attendance ORDER BY date DESC, full_name") as cursor:
+                "SELECT u.full_name, m.worked_seconds, m.worked_days, m.late_days, m.salary "
+                "FROM monthly_payroll m JOIN users u ON u.user_id = m.user_id "
+                "WHERE m.month = ? ORDER BY u.full_name", (month,)) as cursor:
             return await cursor.fetchall()
 
 
+@metrics.db_timed
+async def mark_attendance(telegram_id, action_type):
+    now = datetime.now()
+
+    # Foydalanuvchi keshdan olinadi (ikkinchi ulanish ochilmaydi)
+    user = await get_user(telegram_id)
+    if not user: return "Siz bazada yo'qsiz!", None
+
+    def on_commit(result):
+        if result[0].startswith("✅"):
+            presence.record(user, action_type, now)
+
+    return await write_coalescer.submit(lambda db: _apply_attendance(db, user, action_type, now), on_commit)
+
+
+# --- BIR MARTALIK SKAN (QR TOKEN + DAVOMAT BITTA TRANZAKSIYADA) ---
+
+SCAN_OK = "ok"
+SCAN_NOT_REGISTERED = "not_registered"
+SCAN_TOKEN_USED = "token_used"
+SCAN_REJECTED = "rejected"
+
+
+class ScanResult(NamedTuple):
+    status: str
+    full_name: Optional[str]
+    status_text: str
+    admin_report_text: Optional[str]
+
+
+class _ScanAborted(Exception):
+    """Tranzaksiyani bekor qilib, tayyor natijani qaytarish uchun ichki signal."""
+
+    def __init__(self, result):
+        super().__init__(result.status)
+        self.result = result
+
+
+@metrics.db_timed
+async def record_scan(token, telegram_id, action_type):
+    """QR skanini bitta BEGIN IMMEDIATE tranzaksiyasida qayd etadi.
+
+    Token INSERT ... ON CONFLICT DO NOTHING orqali egallanadi, so'ng davomat
+    yoziladi. Davomat rad etilsa (masalan, allaqachon Keldi qilingan) butun
+    tranzaksiya (guruhli commitda — shu skanning SAVEPOINT i) bekor qilinadi va
+    token yonib ketmaydi. Parallel skanlar write_coalescer orqali bitta commitga yig'iladi.
+    """
+    now = datetime.now()
+    date_today = now.strftime("%Y-%m-%d")
+    timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+
+    user = await get_user(telegram_id)
+    if not user:
+        return ScanResult(SCAN_NOT_REGISTERED, None, "Siz bazada yo'qsiz!", None)
+    full_name = user[1]
+
+    # Yaqinda ishlatilgan token bo'lsa, yozuvchi qulfiga umuman murojaat qilinmaydi
+    if token in used_tokens:
+        return ScanResult(SCAN_TOKEN_USED, full_name, "Bu QR kod allaqachon ishlatilgan!", None)
+
+    async def claim_and_apply(db):
+        cursor = await db.execute(
+            "INSERT INTO qr_history (token, action_type, date, used_by_id, used_by_name, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(token) DO NOTHING",
+            (token, action_type, date_today, telegram_id, full_name, timestamp))
+        claimed = cursor.rowcount == 1
+        await cursor.close()
+        if not claimed:
+            return ScanResult(SCAN_TOKEN_USED, full_name, "Bu QR kod allaqachon ishlatilgan!", None)
+        status_text, admin_report_text = await _apply_attendance(db, user, action_type, now)
+        if not status_text.startswith("✅"):
+            raise _ScanAborted(ScanResult(SCAN_REJECTED, full_name, status_text, None))
+        return ScanResult(SCAN_OK, full_name, status_text, admin_report_text)
+
+    # Commit muvaffaqiyatli bo'lgandan keyingina xotiradagi token to'plami va presence yangilanadi
+    def on_commit(result):
+        used_tokens.add(token)
+        if result.status == SCAN_OK:
+            presence.record(user, action_type, now)
+
+    try:
+        return await write_coalescer.submit(claim_and_apply, on_commit=on_commit)
+    except _ScanAborted as aborted:
+        return aborted.result
+
+
+def _attendance_filter(date_from=None, date_to=None, user_db_id=None):
+    """Hisobot filtri uchun WHERE qismi va parametrlar (indekslangan ustunlar bo'yicha).
+
+    date_from/date_to 'YYYY-MM-DD' ko'rinishida beriladi va kun raqamiga aylantiriladi.
+    """
+    conditions, params = [], []
+    if date_from:
+        conditions.append("a.day >= ?")
+        params.append(payroll.date_to_day(date_from))
+    if date_to:
+        conditions.append("a.day <= ?")
+        params.append(payroll.date_to_day(date_to))
+    if user_db_id is not None:
+        conditions.append("a.user_id = ?")
+        params.append(user_db_id)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return where, params
+
+
+# Hisobot qatori: (full_name, day, check_in, check_out) — kun raqami va soniyalar (None = qayd etilmagan).
+# schema: "main" yoki ulangan arxiv ("archive"); ismlar doim asosiy bazadagi users dan olinadi.
+_REPORT_SQL = ("SELECT u.full_name, a.day, a.check_in, a.check_out "
+               "FROM {schema}.attendance a JOIN main.users u ON u.user_id = a.user_id{where} "
+               "ORDER BY a.day DESC, u.full_name")
+
+
+def _report_archives(date_from=None, date_to=None):
+    """Sana oralig'iga tushadigan arxiv oylari, yangisidan eskisiga (hisobot tartibi bilan bir xil)."""
+    first = date_from[:7] if date_from else None
+    last = date_to[:7] if date_to else None
+    return [month for month in reversed(archived_months())
+            if (first is None or month >= first) and (last is None or month <= last)]
+
+
+@metrics.db_timed
+async def get_attendance_data(date_from=None, date_to=None, user_db_id=None):
+    rows = []
+    async for chunk in iter_attendance_data(date_from, date_to, user_db_id):
+        rows.extend(chunk)
+    return rows
+
+
+@metrics.db_timed
+async def has_attendance_data(date_from=None, date_to=None, user_db_id=None):
+    where, params = _attendance_filter(date_from, date_to, user_db_id)
+    async with get_manager().reader() as db:
+        async with db.execute(f"SELECT 1 FROM attendance a{where} LIMIT 1", params) as cursor:
+            if await cursor.fetchone() is not None:
+                return True
+    for month in _report_archives(date_from, date_to):
+        async with get_manager().attached_reader(archive_path(month), "archive") as db:
+            async with db.execute(f"SELECT 1 FROM archive.attendance a{where} LIMIT 1", params) as cursor:
+                if await cursor.fetchone() is not None:
+                    return True
+    return False
+
+
+async def _iter_report_rows(db, schema, where, params, chunk_size):
+    async with db.execute(_REPORT_SQL.format(schema=schema, where=where), params) as cursor:
+        while True:
+            rows = await cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+
+
+async def iter_attendance_data(date_from=None, date_to=None, user_db_id=None, chunk_size=REPORT_CHUNK_SIZE):
+    """Hisobot qatorlarini fetchmany orqali bo'laklab qaytaradi (hammasi xotiraga yuklanmaydi).
+
+    Sana oralig'i va ishchi filtri SQL darajasida qo'llanadi, shuning uchun
+    hisobot narxi butun tarixga emas, tanlangan davrga bog'liq. Avval asosiy
+    baza, so'ng oraliqqa tushadigan arxiv oylari (har biri vaqtincha ATTACH qilinib) o'qiladi.
+    """
+    where, params = _attendance_filter(date_from, date_to, user_db_id)
+    async with get_manager().reader() as db:
+        async for rows in _iter_report_rows(db, "main", where, params, chunk_size):
+            yield rows
+    for month in _report_archives(date_from, date_to):
+        async with get_manager().attached_reader(archive_path(month), "archive") as db:
+            async for rows in _iter_report_rows(db, "archive", where, params, chunk_size):
+                yield rows
+
+
+class ReportPartition(NamedTuple):
+    """Bo'laklangan hisobotning bitta varag'i: alohida jarayon bazani o'zi o'qiydi.
+
+    sources: [(arxiv fayli yoki None, SQL, parametrlar)] — None asosiy baza, aks holda
+    fayl "archive" nomi bilan ATTACH qilinadi (iter_attendance_data bilan bir xil tartib).
+    """
+    title: str
+    sources: list
+
+
+def _report_sources(where, params, months):
+    sources = [(None, _REPORT_SQL.format(schema="main", where=where), params)]
+    for month in months:
+        sources.append((os.path.abspath(archive_path(month)), _REPORT_SQL.format(schema="archive", where=where),
+                        params))
+    return sources
+
+
+def _month_span(date_from, date_to):
+    """date_from..date_to oralig'idagi oylar ('YYYY-MM'), yangisidan eskisiga."""
+    months = []
+    year, month = int(date_to[:4]), int(date_to[5:7])
+    while f"{year:04d}-{month:02d}" >= date_from[:7]:
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return months
+
+
+@metrics.db_timed
+async def plan_report_partitions(date_from, date_to, split):
+    """Hisobotni varaqlarga bo'lish: split="month" — har oy, split="worker" — har bir ishchi.
+
+    Faqat ma'lumoti bor bo'laklar qaytariladi. Qatorlarning o'zi bu yerda o'qilmaydi.
+    """
+    archived = set(archived_months())
+    partitions = []
+    if split == "month":
+        for month in _month_span(date_from, date_to):
+            first, last = (payroll.day_to_date(day).isoformat() for day in payroll.month_day_range(month))
+            month_from, month_to = max(first, date_from), min(last, date_to)
+            if not await has_attendance_data(month_from, month_to):
+                continue
+            where, params = _attendance_filter(month_from, month_to)
+            partitions.append(ReportPartition(month, _report_sources(where, params,
+                                                                     [month] if month in archived else [])))
+        return partitions
+
+    where, params = _attendance_filter(date_from, date_to)
+    workers = {}
+    sql = "SELECT DISTINCT a.user_id, u.full_name FROM {schema}.attendance a JOIN main.users u ON u.user_id = a.user_id{where}"
+    async with get_manager().reader() as db:
+        async with db.execute(sql.format(schema="main", where=where), params) as cursor:
+            workers.update(await cursor.fetchall())
+    months = _report_archives(date_from, date_to)
+    for month in months:
+        async with get_manager().attached_reader(archive_path(month), "archive") as db:
+            async with db.execute(sql.format(schema="archive", where=where), params) as cursor:
+                workers.update(await cursor.fetchall())
+    for user_db_id, full_name in sorted(workers.items(), key=lambda item: (item[1] or "", item[0])):
+        where, params = _attendance_filter(date_from, date_to, user_db_id)
+        partitions.append(ReportPartition(full_name or str(user_db_id), _report_sources(where, params, months)))
+    return partitions
+
+
+# --- OYLIK ARXIV (ROTATSIYA) ---
+# Yopilgan oylarning davomati va daily_payroll qatorlari archive/YYYY-MM.db fayllariga
+# ko'chiriladi. monthly_payroll (kichik jadval) asosiy bazada qoladi, shuning uchun
+# /maosh arxivlangan oylar uchun ham ishlaydi. Ko'chirish bo'laklarda: har bir bo'lak
+# avval arxivga (INSERT OR IGNORE) yoziladi va commit qilinadi, keyin asosiy bazadan
+# o'chiriladi. Jarayon to'xtab qolsa, qayta ishga tushirish xavfsiz.
+
+_ARCHIVE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS archive.attendance (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        check_in INTEGER,
+        check_out INTEGER
+    )
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS archive.idx_attendance_user_day ON attendance(user_id, day)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_attendance_day ON attendance(day)",
+    """
+    CREATE TABLE IF NOT EXISTS archive.daily_payroll (
+        user_id INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        worked_seconds INTEGER NOT NULL DEFAULT 0,
+        is_late INTEGER NOT NULL DEFAULT 0,
+        salary REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, day)
+    ) WITHOUT ROWID
+    """,
+]
+
+
+_ARCHIVE_FILE = re.compile(r"\d{4}-\d{2}\.db")
+
+
+def archive_path(month):
+    return os.path.join(ARCHIVE_DIR, f"{month}.db")
+
+
+def archived_months():
+    """Arxiv fayli mavjud oylar ('YYYY-MM'), o'sish tartibida."""
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    return sorted(name[:-3] for name in os.listdir(ARCHIVE_DIR) if _ARCHIVE_FILE.fullmatch(name))
+
+
+async def _move_batch(manager, copy_sql, delete_sql, params):
+    async with manager.transaction() as db:
+        await db.execute(copy_sql, params)
+    async with manager.transaction() as db:
+        await db.execute(delete_sql, params)
+        await _bump_data_version(db)
+
+
+@metrics.db_timed
+async def archive_month(month, batch_size=ARCHIVE_BATCH_SIZE):
+    """Bitta oyni asosiy bazadan archive/YYYY-MM.db ga ko'chiradi. Ko'chirilgan davomat qatorlari sonini qaytaradi."""
+    manager = get_manager()
+    first_day, last_day = payroll.month_day_range(month)
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+
+    async with manager.attached_writer(archive_path(month), "archive"):
+        async with manager.transaction() as db:
+            for statement in _ARCHIVE_SCHEMA:
+                await db.execute(statement)
+
+        moved = 0
+        while True:
+            async with manager.reader() as db:
+                async with db.execute(
+                        "SELECT MAX(id), COUNT(*) FROM (SELECT id FROM attendance WHERE day BETWEEN ? AND ? "
+                        "ORDER BY id LIMIT ?)", (first_day, last_day, batch_size)) as cursor:
+                    max_id, count = await cursor.fetchone()
+            if not count:
+                break
+            await _move_batch(
+                manager,
+                "INSERT OR IGNORE INTO archive.attendance (id, user_id, day, check_in, check_out) "
+                "SELECT id, user_id, day, check_in, check_out FROM main.attendance "
+                "WHERE day BETWEEN ? AND ? AND id <= ?",
+                "DELETE FROM main.attendance WHERE day BETWEEN ? AND ? AND id <= ?",
+                (first_day, last_day, max_id))
+            moved += count
+            await asyncio.sleep(0)
+
+        # daily_payroll: kunma-kun (bir kunda ishchilar sonicha qator)
+        for day in range(first_day, last_day + 1):
+            await _move_batch(
+                manager,
+                "INSERT OR IGNORE INTO archive.daily_payroll SELECT * FROM main.daily_payroll WHERE day = ?",
+                "DELETE FROM main.daily_payroll WHERE day = ?",
+                (day,))
+    return moved
+
+
+def _closed_month_cutoff(hot_months=ARCHIVE_HOT_MONTHS, today=None):
+    """Shu oydan oldingi oylar arxivlanadi ('YYYY-MM'). Joriy oy doim asosiy bazada qoladi."""
+    today = today or date.today()
+    month_index = today.year * 12 + (today.month - 1) - (max(hot_months, 1) - 1)
+    return f"{month_index // 12:04d}-{month_index % 12 + 1:02d}"
+
+
+@metrics.db_timed
+async def rotate_archives(hot_months=ARCHIVE_HOT_MONTHS):
+    """Yopilgan barcha oylarni arxivga ko'chiradi. {oy: ko'chirilgan qatorlar} qaytaradi."""
+    cutoff_day = payroll.month_day_range(_closed_month_cutoff(hot_months))[0]
+    async with get_manager().reader() as db:
+        async with db.execute("SELECT DISTINCT day FROM attendance WHERE day < ?", (cutoff_day,)) as cursor:
+            months = sorted({payroll.day_month(row[0]) for row in await cursor.fetchall()})
+
+    rotated = {}
+    for month in months:
+        rotated[month] = await archive_month(month)
+    if rotated:
+        await reclaim_free_pages()
+    return rotated
+
+
+# --- MA'LUMOTLAR VERSIYASI ---
+# Davomatni o'zgartiradigan har bir tranzaksiya (skan, tozalash, arxivlash) meta.data_version
+# ni oshiradi. Hisobot natijasi (parametrlar, versiya) juftligi bilan keshlanadi: versiya
+# o'zgarmagan bo'lsa, hisobot fayli ham o'zgarmaydi. Trigger ishlatilmaydi — u har bir
+# qatorda ishlaydi va "DELETE FROM attendance" ni qatorma-qator o'chirishga majbur qiladi.
+
+async def _bump_data_version(db):
+    await db.execute("UPDATE meta SET value = value + 1 WHERE key = 'data_version'")
+
+
+async def _bump_users_version(db):
+    await db.execute("UPDATE meta SET value = value + 1 WHERE key = 'users_version'")
+
+
+async def _bump_fsm_version(db):
+    await db.execute("UPDATE meta SET value = value + 1 WHERE key = 'fsm_version'")
+    return await _read_meta(db, 'fsm_version')
+
+
+async def _read_meta(db, key):
+    async with db.execute("SELECT value FROM meta WHERE key = ?", (key,)) as cursor:
+        row = await cursor.fetchone()
+    return row[0] if row else 0
+
+
+@metrics.db_timed
+async def get_data_version():
+    async with get_manager().reader() as db:
+        return await _read_meta(db, 'data_version')
+
+
+# --- FSM HOLATLARI (fsm_storage.SQLiteStorage uchun) ---
+# data JSON matn ko'rinishida saqlanadi. Holat ham, ma'lumot ham bo'sh bo'lsa qator o'chiriladi.
+# Muddati o'tgan qatorga yozilganda ikkinchi ustun tozalanadi: aks holda expires_at
+# yangilanib, eskirgan holat/ma'lumot qaytib kelardi. Har bir yozish meta.fsm_version ni
+# oshiradi va yangi qiymatni qaytaradi (fsm_storage keshi shunga tayanadi).
+
+@metrics.db_timed
+async def fsm_get(key):
+    """(state, data_json, expires_at) yoki None."""
+    async with get_manager().reader() as db:
+        async with db.execute("SELECT state, data, expires_at FROM fsm WHERE key = ?", (key,)) as cursor:
+            return await cursor.fetchone()
+
+
+async def get_fsm_version():
+    async with get_manager().reader() as db:
+        return await _read_meta(db, 'fsm_version')
+
+
+@metrics.db_timed
+async def fsm_set_state(key, state, expires_at):
+    async with get_manager().transaction() as db:
+        await db.execute(
+            "INSERT INTO fsm (key, state, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET state = excluded.state, expires_at = excluded.expires_at, "
+            "data = CASE WHEN fsm.expires_at < ? THEN '{}' ELSE fsm.data END",
+            (key, state, expires_at, time.time()))
+        await db.execute("DELETE FROM fsm WHERE key = ? AND state IS NULL AND data = '{}'", (key,))
+        return await _bump_fsm_version(db)
+
+
+@metrics.db_timed
+async def fsm_set_data(key, data_json, expires_at):
+    async with get_manager().transaction() as db:
+        await db.execute(
+            "INSERT INTO fsm (key, data, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at, "
+            "state = CASE WHEN fsm.expires_at < ? THEN NULL ELSE fsm.state END",
+            (key, data_json, expires_at, time.time()))
+        await db.execute("DELETE FROM fsm WHERE key = ? AND state IS NULL AND data = '{}'", (key,))
+        return await _bump_fsm_version(db)
+
+
+@metrics.db_timed
+async def prune_fsm(now=None):
+    """Muddati o'tgan FSM yozuvlarini o'chiradi. O'chirilganlar sonini qaytaradi."""
+    async with get_manager().transaction() as db:
+        cursor = await db.execute("DELETE FROM fsm WHERE expires_at < ?", (time.time() if now is None else now,))
+        deleted = cursor.rowcount
+        await cursor.close()
+    return deleted
+
+
 # --- BAZANI TOZALASH FUNKSIYASI ---
 
+@metrics.db_timed
 async def clear_all_attendance_data():
-    """Davomat va QR history jadvallarini to'liq tozlaydi."""
-    async with aiosqlite.connect(DB_NAME) as db:
+    """Davomat va QR history jadvallarini to'liq tozlaydi.
+
+    Arxiv fayllariga tegilmaydi: arxivlangan oylarning davomati hisobotda qolgani uchun
+    ularning monthly_payroll qatorlari ham saqlanadi (aks holda /maosh bo'sh chiqadi).
+    """
+    archived = archived_months()
+    async with get_manager().transaction() as db:
         await db.execute("DELETE FROM attendance")
         await db.execute("DELETE FROM qr_history")
-        await db.commit()
\ No newline at end of file
+        await db.execute("DELETE FROM daily_payroll")
+        await db.execute(f"DELETE FROM monthly_payroll WHERE month NOT IN ({', '.join('?' * len(archived))})",
+                         archived)
+        await _bump_data_version(db)
+    used_tokens.clear()
+    presence.clear()
\ No newline at end of file
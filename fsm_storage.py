@@ -0,0 +1,109 @@
+"""aiogram FSM holatlarini bot bazasidagi fsm jadvalida saqlash.
+
+Admin dialoglari (ishchi qo'shish, hisobot oralig'i) qayta ishga tushirishda
+yo'qolmaydi va bir nechta jarayon (webhook ortidagi workerlar) bitta holatni
+ko'radi. Har bir yozuv FSM_TTL soniyadan keyin eskiradi (har yozishda yangilanadi).
+
+aiogram har bir update uchun holatni o'qiydi, ko'pchilik updatelar (skanlar)
+uchun esa holat yo'q. Shuning uchun o'qishlar kichik LRU kesh orqali o'tadi va
+"holat yo'q" javobi ham keshlanadi. Keshdagi yozuv meta.fsm_version o'zgarmaguncha
+ishonchli: versiya FSM_CACHE_CHECK_INTERVAL da bir martadan ko'p o'qilmaydi, boshqa
+jarayon yozgan bo'lsa kesh tozalanadi. Shu jarayonning yozishi kalitni keshdan chiqaradi.
+"""
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Mapping, NamedTuple, Optional
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+from config import FSM_TTL, FSM_CACHE_SIZE, FSM_CACHE_CHECK_INTERVAL
+from database import fsm_get, fsm_set_state, fsm_set_data, get_fsm_version
+
+
+class _Record(NamedTuple):
+    state: Optional[str]
+    data: dict
+    expires_at: float  # time.time() bo'yicha; bo'sh yozuv uchun inf
+
+
+_EMPTY = _Record(None, {}, float("inf"))
+
+
+class SQLiteStorage(BaseStorage):
+    def __init__(self, key_builder: Optional[KeyBuilder] = None, ttl=FSM_TTL, cache_size=FSM_CACHE_SIZE,
+                 check_interval=FSM_CACHE_CHECK_INTERVAL):
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self.ttl = ttl
+        self.cache_size = max(0, cache_size)
+        self.check_interval = check_interval
+        self.version = None  # kesh mos keladigan meta.fsm_version
+        self.checked_at = float("-inf")
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, key, record):
+        if not self.cache_size:
+            return
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _advance(self, version):
+        """Shu jarayon yozdi va fsm_version endi `version`. Oraliqda boshqa jarayon ham yozgan bo'lsa kesh tozalanadi."""
+        if self.version is None or version != self.version + 1:
+            self._cache.clear()
+        self.version = version
+
+    async def _check_version(self):
+        if time.monotonic() - self.checked_at < self.check_interval:
+            return
+        # Bir vaqtda kelgan updatelar versiyani qayta-qayta o'qimasin
+        self.checked_at = time.monotonic()
+        version = await get_fsm_version()
+        if version != self.version:
+            self._cache.clear()
+            self.version = version
+
+    async def _load(self, key) -> _Record:
+        await self._check_version()
+        record = self._cache.get(key)
+        if record is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return record if record.expires_at >= time.time() else _EMPTY
+
+        self.misses += 1
+        version = self.version
+        row = await fsm_get(key)
+        record = _EMPTY if row is None or row[2] < time.time() else _Record(row[0], json.loads(row[1]), row[2])
+        # O'qish paytida versiya o'zgargan bo'lsa (yozish yoki boshqa jarayon), qator eskirgan bo'lishi mumkin
+        if self.version == version:
+            self._remember(key, record)
+        return record
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self.key_builder.build(key)
+        state = state.state if isinstance(state, State) else state
+        self._cache.pop(storage_key, None)
+        self._advance(await fsm_set_state(storage_key, state, time.time() + self.ttl))
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._load(self.key_builder.build(key))).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(f"Data must be a dict or dict-like object, got {type(data).__name__}")
+        storage_key = self.key_builder.build(key)
+        self._cache.pop(storage_key, None)
+        self._advance(await fsm_set_data(storage_key, json.dumps(data, ensure_ascii=False), time.time() + self.ttl))
+
+    async def get_data(self, key: StorageKey) -> dict:
+        return dict((await self._load(self.key_builder.build(key))).data)
+
+    async def close(self) -> None:
+        self._cache.clear()
@@ -1,26 +1,74 @@
 import os
-from aiogram import Router, F, Bot
-from aiogram.types import Message, FSInputFile, ReplyKeyboardMarkup, KeyboardButton
-from aiogram.filters import Command
+from datetime import date, datetime
+from typing import Optional
+from aiogram import Router, F
+from aiogram.types import (Message, CallbackQuery, FSInputFile, BufferedInputFile, ReplyKeyboardMarkup,
+                           KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton)
+from aiogram.filters import Command, CommandObject
+from aiogram.filters.callback_data import CallbackData
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 
-from config import SUPER_ADMIN_ID
-from states import AdminStates
-from database import add_user, get_all_workers, delete_worker, get_attendance_data, clear_all_attendance_data
-from utils import generate_qr_image, export_to_excel
+import metrics
+import payroll
+from config import SUPER_ADMIN_ID, ROSTER_PREFIX_MAX, IMPORT_MAX_BYTES, LATE_TIME_LIMIT
+from states import AdminStates, ReportStates, RosterStates
+from database import (add_user, add_users_bulk, get_user, get_workers_page, delete_worker, has_attendance_data,
+                      iter_attendance_data, plan_report_partitions, clear_all_attendance_data, get_monthly_payroll,
+                      rebuild_payroll, rotate_archives, archived_months, user_directory, used_tokens,
+                      write_coalescer, presence, load_presence, get_manager, get_data_version)
+from utils import month_period, parse_date_range, load_module
+from qr_pool import QRPool
+from notifications import NotificationDispatcher
+from fsm_storage import SQLiteStorage
+from report_cache import report_cache
 
 router = Router()
 
 admin_kb = ReplyKeyboardMarkup(
     keyboard=[
         [KeyboardButton(text="📥 Keldi QR"), KeyboardButton(text="📤 Ketdi QR")],
-        [KeyboardButton(text="➕ Ishchi qo'shish"), KeyboardButton(text="🗑 Ishchini o'chirish")],
+        [KeyboardButton(text="➕ Ishchi qo'shish"), KeyboardButton(text="📂 Ishchilarni yuklash"),
+         KeyboardButton(text="🗑 Ishchini o'chirish")],
         [KeyboardButton(text="📃 Ishchilar ro'yxati"), KeyboardButton(text="📊 Excel Hisobot")],
-        [KeyboardButton(text="🧹 Bazani Tozalash")]
+        [KeyboardButton(text="🗄 Arxivlash"), KeyboardButton(text="🧹 Bazani Tozalash")]
     ], resize_keyboard=True
 )
 
 
+class ReportPeriod(CallbackData, prefix="report_period"):
+    kind: str  # current / previous / custom
+
+
+class ReportWorker(CallbackData, prefix="report_worker"):
+    scope: str  # all / month / worker / zip (oxirgi uchtasi — bo'laklangan, ko'p varaqli hisobot)
+
+
+class RosterPage(CallbackData, prefix="roster"):
+    direction: str  # first / next / prev
+    user_id: int = 0  # kursor qatori (sahifaning birinchi yoki oxirgi ishchisi)
+    telegram_id: int = 0
+    q: str = ""  # ism prefiksi bo'yicha qidiruv
+
+
+class RosterSearch(CallbackData, prefix="roster_search"):
+    pass
+
+
+report_period_kb = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="📅 Joriy oy", callback_data=ReportPeriod(kind="current").pack()),
+     InlineKeyboardButton(text="📅 O'tgan oy", callback_data=ReportPeriod(kind="previous").pack())],
+    [InlineKeyboardButton(text="🗓 Boshqa oraliq", callback_data=ReportPeriod(kind="custom").pack())],
+])
+
+report_worker_kb = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="👥 Barcha ishchilar", callback_data=ReportWorker(scope="all").pack())],
+    [InlineKeyboardButton(text="🗂 Oylar bo'yicha varaqlar", callback_data=ReportWorker(scope="month").pack()),
+     InlineKeyboardButton(text="🗂 Ishchilar bo'yicha varaqlar", callback_data=ReportWorker(scope="worker").pack())],
+    [InlineKeyboardButton(text="🗜 Ishchilar bo'yicha (zip)", callback_data=ReportWorker(scope="zip").pack())],
+])
+
+
 def is_super_admin(message: Message):  # Bosh Adminni tekshirish
     return message.from_user.id == SUPER_ADMIN_ID
 
@@ -31,19 +79,21 @@ async def admin_panel(message: Message):
 
 
 @router.message(F.text.in_({"📥 Keldi QR", "📤 Ketdi QR"}), lambda msg: is_super_admin(msg))
-async def send_qr(message: Message, bot: Bot):
+async def send_qr(message: Message, bot_username: str, qr_pool: Optional[QRPool]):
     action = "in" if "Keldi" in message.text else "out"
-    bot_info = await bot.get_me()
-    path = generate_qr_image(bot_info.username, action)
+    if qr_pool is not None:
+        token, png = await qr_pool.get(action)
+    else:
+        qr = await load_module("qr")
+        token, png = await qr.render_qr_image(bot_username, action)
 
     action_text = "KELISH" if action == "in" else "KETISH"
 
     await message.answer_photo(
-        FSInputFile(path),
+        BufferedInputFile(png, filename=f"qr_{action}.png"),
         caption=f"📅 **YANGI {action_text} QR kodi**.\n*(Bu QR kod faqat **bir marta** ishlatiladi)*",
         parse_mode="Markdown"
     )
-    os.remove(path)
 
 
 @router.message(F.text == "➕ Ishchi qo'shish", lambda msg: is_super_admin(msg))
@@ -77,18 +127,135 @@ async def get_id(message: Message, state: FSMContext):
     await state.clear()
 
 
+@router.message(F.text == "📂 Ishchilarni yuklash", lambda msg: is_super_admin(msg))
+async def start_import_workers(message: Message, state: FSMContext):
+    await message.answer(
+        "📂 Ishchilar ro'yxatini **.csv** yoki **.xlsx** fayl sifatida yuboring.\n"
+        "Har bir qatorda ism-familiya va Telegram ID bo'lsin (ustunlar tartibi muhim emas, "
+        "sarlavha qatori bo'lishi mumkin).", parse_mode="Markdown")
+    await state.set_state(AdminStates.waiting_for_import_file)
+
+
+@router.message(AdminStates.waiting_for_import_file, F.document)
+async def import_workers(message: Message, state: FSMContext):
+    document = message.document
+    filename = document.file_name or ""
+    if not filename.lower().endswith((".csv", ".xlsx")):
+        await message.answer("❌ Faqat .csv yoki .xlsx fayl qabul qilinadi. Boshqa fayl yuboring.")
+        return
+    if document.file_size and document.file_size > IMPORT_MAX_BYTES:
+        await message.answer(f"❌ Fayl juda katta (chegara {IMPORT_MAX_BYTES // (1024 * 1024)} MB).")
+        return
+    await state.clear()
+
+    await message.answer("⏳ Fayl o'qilmoqda...")
+    buffer = await message.bot.download(document)
+    reports = await load_module("reports")
+    try:
+        rows, file_duplicates, invalid = await reports.parse_worker_import(buffer, filename)
+    except Exception:
+        await message.answer("❌ Faylni o'qib bo'lmadi. Fayl buzilmaganini va formatini tekshiring.")
+        return
+    try:
+        inserted, existing = await add_users_bulk(rows)
+    except Exception as e:
+        await message.answer(f"❌ Ishchilarni bazaga yozishda xatolik yuz berdi: {e}")
+        return
+
+    lines = ["📂 **Import natijasi:**",
+             f"✅ Qo'shildi: {inserted}",
+             f"♻️ Takroriy (bazada bor yoki faylda qayta): {existing + file_duplicates}",
+             f"⚠️ Xato qatorlar: {len(invalid)}"]
+    for line_no, reason in invalid[:20]:
+        lines.append(f"• {line_no}-qator: {reason}")
+    if len(invalid) > 20:
+        lines.append(f"... va yana {len(invalid) - 20} ta")
+    await answer_long(message, lines, parse_mode="Markdown")
+
+
+@router.message(AdminStates.waiting_for_import_file)
+async def import_workers_cancel(message: Message, state: FSMContext):
+    await state.clear()
+    await message.answer("Import bekor qilindi.")
+
+
+def _roster_prefix(text):
+    """Qidiruv prefiksi: callback_data va Markdown ni buzadigan belgilar olib tashlanadi, bosh harf katta.
+
+    Uzunlik UTF-8 baytlarda kesiladi (callback_data chegarasi baytlarda), harf o'rtasidan kesilmaydi.
+    """
+    prefix = "".join(ch for ch in (text or "") if ch not in ":*_`[").strip()
+    prefix = prefix[:1].upper() + prefix[1:]
+    return prefix.encode()[:ROSTER_PREFIX_MAX].decode(errors="ignore").strip()
+
+
+async def _render_roster(prefix="", after=None, before=None):
+    """Ro'yxatning bitta sahifasi: (matn, inline klaviatura). Har doim bitta chegaralangan so'rov."""
+    rows, has_prev, has_next = await get_workers_page(after=after, before=before, prefix=prefix or None)
+    if not rows and (after or before):
+        # Kursordagi ishchi o'chirilgan yoki undan keyingilar qolmagan: birinchi sahifa ko'rsatiladi
+        rows, has_prev, has_next = await get_workers_page(prefix=prefix or None)
+    title = f"📜 **Ishchilar Ro'yxati** (🔍 {prefix}...):" if prefix else "📜 **Ishchilar Ro'yxati:**"
+    lines = [title]
+    if not rows:
+        lines.append("Hech kim topilmadi." if prefix else "Ishchilar ro'yxati bo'sh.")
+    for _, name, tg_id in rows:
+        lines.append(f"• **{name}** — ID: `{tg_id}`")
+
+    navigation = []
+    if rows and has_prev:
+        navigation.append(InlineKeyboardButton(text="⬅️ Oldingi", callback_data=RosterPage(
+            direction="prev", user_id=rows[0][0], telegram_id=rows[0][2], q=prefix).pack()))
+    if rows and has_next:
+        navigation.append(InlineKeyboardButton(text="Keyingi ➡️", callback_data=RosterPage(
+            direction="next", user_id=rows[-1][0], telegram_id=rows[-1][2], q=prefix).pack()))
+    keyboard = [navigation] if navigation else []
+    keyboard.append([InlineKeyboardButton(text="🔍 Ism bo'yicha qidirish", callback_data=RosterSearch().pack())])
+    if prefix:
+        keyboard.append([InlineKeyboardButton(text="✖️ Qidiruvni bekor qilish",
+                                              callback_data=RosterPage(direction="first").pack())])
+    return "\n".join(lines), InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+
 @router.message(F.text == "📃 Ishchilar ro'yxati", lambda msg: is_super_admin(msg))
 async def show_workers(message: Message):
-    workers = await get_all_workers()
-    if not workers:
-        await message.answer("Ishchilar ro'yxati bo'sh.")
-        return
+    text, keyboard = await _render_roster()
+    await message.answer(text, reply_markup=keyboard, parse_mode="Markdown")
+
+
+@router.message(Command("ishchilar"), lambda msg: is_super_admin(msg))
+async def search_workers_cmd(message: Message, command: CommandObject):
+    """/ishchilar [ism boshi] — ro'yxat (yoki ismi shu bilan boshlanadigan ishchilar)."""
+    text, keyboard = await _render_roster(_roster_prefix(command.args))
+    await message.answer(text, reply_markup=keyboard, parse_mode="Markdown")
 
-    text = "📜 **Ishchilar Ro'yxati:**\n"
-    for idx, (name, tg_id) in enumerate(workers, 1):
-        text += f"{idx}. **{name}** — ID: `{tg_id}`\n"
 
-    await message.answer(text, parse_mode="Markdown")
+@router.callback_query(RosterPage.filter(), lambda query: is_super_admin(query))
+async def roster_page(query: CallbackQuery, callback_data: RosterPage):
+    cursor = (callback_data.user_id, callback_data.telegram_id)
+    text, keyboard = await _render_roster(
+        callback_data.q,
+        after=cursor if callback_data.direction == "next" else None,
+        before=cursor if callback_data.direction == "prev" else None)
+    try:
+        await query.message.edit_text(text, reply_markup=keyboard, parse_mode="Markdown")
+    except TelegramBadRequest:
+        pass  # Sahifa o'zgarmagan (message is not modified)
+    await query.answer()
+
+
+@router.callback_query(RosterSearch.filter(), lambda query: is_super_admin(query))
+async def roster_search_prompt(query: CallbackQuery, state: FSMContext):
+    await state.set_state(RosterStates.waiting_for_prefix)
+    await query.message.answer("🔍 Ishchi ismining boshlanishini yuboring (masalan: `Ali`):", parse_mode="Markdown")
+    await query.answer()
+
+
+@router.message(RosterStates.waiting_for_prefix)
+async def roster_search(message: Message, state: FSMContext):
+    await state.clear()
+    text, keyboard = await _render_roster(_roster_prefix(message.text))
+    await message.answer(text, reply_markup=keyboard, parse_mode="Markdown")
 
 
 @router.message(F.text == "🗑 Ishchini o'chirish", lambda msg: is_super_admin(msg))
@@ -109,21 +276,162 @@ async def delete_worker_func(message: Message, command: Command):
                          parse_mode="Markdown")
 
 
-@router.message(F.text == "📊 Excel Hisobot", lambda msg: is_super_admin(msg))
-async def send_report(message: Message):
-    data = await get_attendance_data()
-    if not data:
-        await message.answer("Hisobot yaratish uchun ma'lumotlar bazasida yozuvlar yo'q.")
+MESSAGE_LIMIT = 4000  # Telegram xabar chegarasi 4096 belgi
+
+
+async def answer_long(message: Message, lines, **kwargs):
+    """Uzun matnni Telegram chegarasidan oshmaydigan bo'laklarga bo'lib yuboradi."""
+    chunk = ""
+    for line in lines:
+        if chunk and len(chunk) + len(line) + 1 > MESSAGE_LIMIT:
+            await message.answer(chunk, **kwargs)
+            chunk = ""
+        chunk += line + "\n"
+    if chunk:
+        await message.answer(chunk, **kwargs)
+
+
+@router.message(Command("maosh"), lambda msg: is_super_admin(msg))
+async def monthly_salary(message: Message, command: CommandObject):
+    """/maosh [YYYY-MM] — oylik maosh va kechikishlar (monthly_payroll dan, qayta hisoblanmaydi)."""
+    month = (command.args or "").strip() or date.today().strftime("%Y-%m")
+    try:
+        datetime.strptime(month, "%Y-%m")
+    except ValueError:
+        await message.answer("Xato format. Misol: `/maosh 2026-09`", parse_mode="Markdown")
         return
 
-    await message.answer("⏳ **Excel Hisobot** tayyorlanmoqda. Iltimos, kuting...")
+    rows = await get_monthly_payroll(month)
+    if not rows:
+        await message.answer(f"{month} oyi uchun maosh ma'lumotlari yo'q.")
+        return
 
+    lines = [f"💰 **{month} oyi bo'yicha maosh:**"]
+    total = 0
+    for name, worked_seconds, worked_days, late_days, salary in rows:
+        total += salary
+        late = f", ⏰ kechikish: {late_days}" if late_days else ""
+        lines.append(f"• **{name}** — {salary:,.0f} so'm ({worked_days} kun, {worked_seconds / 3600:.1f} soat{late})")
+    lines.append(f"\nJami: **{total:,.0f} so'm**")
+    await answer_long(message, lines, parse_mode="Markdown")
+
+
+def _names_block(lines, title, items, limit=50):
+    lines.append(title)
+    for text in items[:limit]:
+        lines.append(f"• {text}")
+    if len(items) > limit:
+        lines.append(f"... va yana {len(items) - limit} ta")
+
+
+@router.message(Command("now"), lambda msg: is_super_admin(msg))
+async def presence_now(message: Message):
+    """/now — hozir kim ishda, kim ketdi, kim kechikdi va kim kelmadi (xotiradagi indeksdan)."""
+    now = datetime.now()
+    # Kun almashgan yoki davomatni boshqa jarayon o'zgartirgan bo'lsa indeks qayta yuklanadi
+    if not presence.is_current(payroll.date_to_day(now.date()), await get_data_version()):
+        await load_presence()
+
+    snapshot = presence.snapshot(user_directory.workers())
+    seconds = now.hour * 3600 + now.minute * 60 + now.second
+    past_late_limit = seconds > payroll.LATE_LIMIT_SECONDS
+    fmt = payroll.seconds_to_time
+
+    lines = [f"🕒 **Hozirgi holat** ({now.strftime('%H:%M')}):",
+             f"🟢 Ishda: {len(snapshot['present'])}   🔴 Ketgan: {len(snapshot['left'])}   "
+             f"⏰ Kechikkan: {len(snapshot['late'])}   ⚪️ Kelmagan: {len(snapshot['absent'])}"]
+    if snapshot["present"]:
+        _names_block(lines, "\n🟢 **Ishda:**", [f"{name} — {fmt(t)}" for name, t in snapshot["present"]])
+    if snapshot["late"]:
+        _names_block(lines, "\n⏰ **Kechikkanlar:**", [f"{name} — {fmt(t)}" for name, t in snapshot["late"]])
+    if snapshot["absent"] and past_late_limit:
+        _names_block(lines, f"\n⚪️ **{LATE_TIME_LIMIT[:5]} dan keyin ham kelmaganlar:**", snapshot["absent"])
+    if not user_directory.complete:
+        lines.append("\nℹ️ Ishchilar keshi to'liq emas: kelmaganlar ro'yxati qisman bo'lishi mumkin.")
+    await answer_long(message, lines, parse_mode="Markdown")
+
+
+@router.message(Command("rebuild_payroll"), lambda msg: is_super_admin(msg))
+async def rebuild_payroll_cmd(message: Message):
+    await message.answer("⏳ Maosh jadvallari qaytadan hisoblanmoqda...")
     try:
-        file_path = export_to_excel(data)
-        await message.answer_document(FSInputFile(file_path), caption="📅 Davomat bo'yicha to'liq Excel hisoboti")
-        os.remove(file_path)
+        rows = await rebuild_payroll()
     except Exception as e:
-        await message.answer(f"❌ Hisobotni yaratishda xatolik yuz berdi: {e}")
+        await message.answer(f"❌ Maoshni qayta hisoblashda xatolik yuz berdi: {e}")
+        return
+    await message.answer(f"✅ Maosh jadvallari yangilandi ({rows} ta davomat yozuvi qayta hisoblandi).")
+
+
+def _hit_rate(hits, misses):
+    total = hits + misses
+    return f"{hits / total:.0%} ({hits}/{total})" if total else "—"
+
+
+@router.message(Command("stats"), lambda msg: is_super_admin(msg))
+async def show_stats(message: Message, notifier: NotificationDispatcher, qr_pool: Optional[QRPool],
+                     fsm_cache: SQLiteStorage):
+    """/stats — handlerlar kechikishi, baza ulushi, kesh samaradorligi va event loop kechikishi."""
+    lines = ["📊 **Handlerlar** (soni, p50/p99 ms, baza ulushi):"]
+    handlers = metrics.histograms("handler")
+    for name, hist in sorted(handlers.items(), key=lambda item: item[1].total, reverse=True):
+        snap = hist.snapshot()
+        db_share = metrics.counter(f"handler_db_seconds:{name}") / hist.total if hist.total else 0.0
+        errors = metrics.counter(f"handler_errors:{name}")
+        error_text = f", ❌ {errors}" if errors else ""
+        lines.append(f"• `{name}` — {snap['count']}, {snap['p50_ms']:.1f}/{snap['p99_ms']:.1f}, "
+                     f"baza {db_share:.0%}{error_text}")
+    if not handlers:
+        lines.append("— hali ma'lumot yo'q")
+
+    lines.append("\n🗃 **Baza so'rovlari** (eng ko'p vaqt olganlari):")
+    queries = [(name, hist) for name, hist in metrics.histograms("db").items() if hist.count]
+    queries.sort(key=lambda item: item[1].total, reverse=True)
+    for name, hist in queries[:10]:
+        snap = hist.snapshot()
+        lines.append(f"• `{name}` — {snap['count']}, {snap['p50_ms']:.1f}/{snap['p99_ms']:.1f} ms, "
+                     f"jami {hist.total * 1000:.0f} ms")
+
+    users = user_directory.stats()
+    lines.append("\n⚡️ **Keshlar:**")
+    lines.append(f"• Foydalanuvchilar: {_hit_rate(users['hits'], users['misses'])}, {users['size']} ta")
+    lines.append(f"• FSM holatlari: {_hit_rate(fsm_cache.hits, fsm_cache.misses)}")
+    lines.append(f"• Ishlatilgan tokenlar: {len(used_tokens)} ta")
+    if qr_pool is not None:
+        lines.append(f"• QR zaxirasi: {_hit_rate(qr_pool.hits, qr_pool.misses)}")
+    reports = report_cache.stats()
+    lines.append(f"• Hisobotlar: {_hit_rate(reports['hits'], reports['misses'])}, {reports['entries']} ta, "
+                 f"{reports['bytes'] / 1e6:.1f} MB")
+
+    if write_coalescer.batches:
+        lines.append(f"• Guruhli commit: {write_coalescer.batches} partiya, "
+                     f"o'rtacha {write_coalescer.operations / write_coalescer.batches:.1f} amal")
+
+    notify = notifier.stats()
+    lines.append(f"\n✉️ **Xabarnomalar:** navbatda {notify['queue_depth']}, yuborildi {notify['delivered']}, "
+                 f"xato {notify['failed']}, p50/p99 {notify['p50_ms']:.0f}/{notify['p99_ms']:.0f} ms")
+
+    lag = metrics.histogram("loop_lag").snapshot()
+    lines.append(f"\n⏱ **Event loop kechikishi:** p50 {lag['p50_ms']:.1f} ms, p99 {lag['p99_ms']:.1f} ms")
+    await answer_long(message, lines, parse_mode="Markdown")
+
+
+@router.message(F.text == "🗄 Arxivlash", lambda msg: is_super_admin(msg))
+async def archive_closed_months(message: Message):
+    await message.answer("⏳ Yopilgan oylar arxivga ko'chirilmoqda...")
+    try:
+        rotated = await rotate_archives()
+    except Exception as e:
+        await message.answer(f"❌ Arxivlashda xatolik yuz berdi: {e}")
+        return
+
+    lines = [f"🗄 {month}: {moved} ta yozuv" for month, moved in rotated.items()]
+    if not lines:
+        lines = ["Arxivlanadigan yopilgan oy yo'q."]
+    archives = archived_months()
+    if archives:
+        lines.append(f"\n📚 Arxivdagi oylar: {', '.join(archives)}")
+    lines.append("Arxivlangan oylar hisobot va /maosh da avvalgidek ko'rinadi.")
+    await message.answer("\n".join(lines))
 
 
 @router.message(F.text == "🧹 Bazani Tozalash", lambda msg: is_super_admin(msg))
@@ -135,7 +443,8 @@ async def confirm_clear_db(message: Message):
         ], resize_keyboard=True, one_time_keyboard=True
     )
     await message.answer(
-        "⚠️ **DIQQAT!** Bu amal barcha davomat va QR tarixini o'chiradi.\nDavom ettirishga ishonchingiz komilmi?",
+        "⚠️ **DIQQAT!** Bu amal barcha davomat va QR tarixini o'chiradi (arxivlangan oylar saqlanadi).\n"
+        "Davom ettirishga ishonchingiz komilmi?",
         reply_markup=confirm_kb, parse_mode="Markdown")
 
 
@@ -143,7 +452,8 @@ async def confirm_clear_db(message: Message):
 async def execute_clear_db(message: Message):
     try:
         await clear_all_attendance_data()
-        await message.answer("✅ **Baza muvaffaqiyatli tozalandi!** Barcha davomat va QR yozuvlari o'chirildi.",
+        await message.answer("✅ **Baza muvaffaqiyatli tozalandi!** Barcha davomat va QR yozuvlari o'chirildi.\n"
+                             "Arxivlangan oylar hisobot va /maosh da saqlanib qoldi.",
                              reply_markup=admin_kb, parse_mode="Markdown")
     except Exception as e:
         await message.answer(f"❌ Xatolik yuz berdi: {e}", reply_markup=admin_kb)
@@ -151,4 +461,140 @@ async def execute_clear_db(message: Message):
 
 @router.message(F.text == "❌ BEKOR QILISH", lambda msg: is_super_admin(msg))
 async def cancel_clear_db(message: Message):
-    await message.answer("❌ Baza tozalash bekor qilindi.", reply_markup=admin_kb)
\ No newline at end of file
+    await message.answer("❌ Baza tozalash bekor qilindi.", reply_markup=admin_kb)
+
+
+@router.message(F.text == "📊 Excel Hisobot", lambda msg: is_super_admin(msg))
+async def send_report(message: Message, state: FSMContext):
+    await state.clear()
+    await message.answer("📊 Hisobot qaysi davr uchun kerak?", reply_markup=report_period_kb)
+
+
+@router.callback_query(ReportPeriod.filter(), lambda query: is_super_admin(query))
+async def choose_report_period(query: CallbackQuery, callback_data: ReportPeriod, state: FSMContext):
+    await query.answer()
+
+    if callback_data.kind == "custom":
+        await state.set_state(ReportStates.waiting_for_range)
+        await query.message.answer("Sana oralig'ini kiriting (YYYY-MM-DD YYYY-MM-DD).\nMasalan: `2026-09-01 2026-09-15`",
+                                   parse_mode="Markdown")
+        return
+
+    date_from, date_to = month_period(0 if callback_data.kind == "current" else -1)
+    await _ask_report_worker(query.message, state, date_from, date_to)
+
+
+@router.message(ReportStates.waiting_for_range)
+async def get_report_range(message: Message, state: FSMContext):
+    period = parse_date_range(message.text or "")
+    if not period:
+        await message.answer("Xato format. Misol: `2026-09-01 2026-09-15`", parse_mode="Markdown")
+        return
+
+    await _ask_report_worker(message, state, *period)
+
+
+async def _ask_report_worker(message: Message, state: FSMContext, date_from, date_to):
+    await state.update_data(date_from=date_from, date_to=date_to)
+    await state.set_state(ReportStates.waiting_for_worker)
+    await message.answer(f"🗓 Davr: **{date_from} — {date_to}**\n"
+                         "Bitta ishchi uchun uning **Telegram ID** sini yuboring yoki barchasini tanlang:",
+                         reply_markup=report_worker_kb, parse_mode="Markdown")
+
+
+@router.callback_query(ReportWorker.filter(), ReportStates.waiting_for_worker, lambda query: is_super_admin(query))
+async def report_all_workers(query: CallbackQuery, callback_data: ReportWorker, state: FSMContext):
+    await query.answer()
+    data = await state.get_data()
+    await state.clear()
+    if callback_data.scope == "all":
+        await _send_report(query.message, data['date_from'], data['date_to'])
+    elif callback_data.scope == "month":
+        await _send_partitioned_report(query.message, data['date_from'], data['date_to'], "month")
+    else:
+        await _send_partitioned_report(query.message, data['date_from'], data['date_to'], "worker",
+                                       zip_output=callback_data.scope == "zip")
+
+
+@router.message(ReportStates.waiting_for_worker)
+async def report_single_worker(message: Message, state: FSMContext):
+    if not message.text or not message.text.isdigit():
+        await message.answer("Iltimos, faqat Telegram ID raqamini kiriting yoki \"👥 Barcha ishchilar\" ni bosing.")
+        return
+
+    user = await get_user(int(message.text))
+    if not user:
+        await message.answer("❌ Bu ID bilan ishchi topilmadi. Qaytadan kiriting:")
+        return
+
+    data = await state.get_data()
+    await state.clear()
+    await _send_report(message, data['date_from'], data['date_to'], user)
+
+
+async def _send_report(message: Message, date_from, date_to, user=None):
+    user_db_id = user[0] if user else None
+
+    async def build(directory):
+        # Workbook alohida oqimda yig'iladi, bot esa shu vaqtda skanlarni qabul qilishda davom etadi
+        reports = await load_module("reports")
+        return await reports.export_attendance_report(iter_attendance_data(date_from, date_to, user_db_id),
+                                                      date_from, date_to, directory)
+
+    caption = f"📅 Davomat bo'yicha Excel hisoboti: {date_from} — {date_to}"
+    if user:
+        caption += f"\n👤 {user[1]}"
+    await _deliver_report(message, ("all", date_from, date_to, user_db_id, False), build, caption,
+                          "⏳ **Excel Hisobot** tayyorlanmoqda. Iltimos, kuting...")
+
+
+async def _send_partitioned_report(message: Message, date_from, date_to, split, zip_output=False):
+    async def build(directory):
+        # Varaqlar alohida jarayonlarda (har bir CPU yadrosida) yig'iladi
+        partitions = await plan_report_partitions(date_from, date_to, split)
+        reports = await load_module("reports")
+        return await reports.export_partitioned_report(partitions, get_manager().path, date_from, date_to,
+                                                       zip_output, directory)
+
+    split_label = "oylar" if split == "month" else "ishchilar"
+    await _deliver_report(message, (split, date_from, date_to, None, zip_output), build,
+                          f"📅 Davomat bo'yicha Excel hisoboti: {date_from} — {date_to}\n"
+                          f"🗂 {split_label} bo'yicha varaqlar + umumiy maosh varag'i",
+                          f"⏳ **Excel Hisobot** ({split_label} bo'yicha varaqlar) tayyorlanmoqda. Iltimos, kuting...")
+
+
+async def _deliver_report(message: Message, params, build, caption, waiting_text):
+    """Hisobotni keshdan yoki build() bilan yig'ib yuboradi. params: (turi, date_from, date_to, user_db_id, zip).
+
+    Ma'lumotlar versiyasi o'zgarmagan bo'lsa, hisobot qayta yig'ilmaydi, Telegram'ga
+    avval yuklangan bo'lsa — file_id bilan, faylni qayta yuklamasdan yuboriladi.
+    """
+    _, date_from, date_to, user_db_id, _ = params
+    version = await get_data_version()
+    if report_cache.get(params, version) is None:
+        if not await has_attendance_data(date_from, date_to, user_db_id):
+            await message.answer("Tanlangan davr uchun ma'lumotlar bazasida yozuvlar yo'q.")
+            return
+        await message.answer(waiting_text)
+
+    try:
+        report = await report_cache.get_or_build(params, version, build)
+        if report.file_id:
+            try:
+                await message.answer_document(report.file_id, caption=caption)
+                return
+            except TelegramBadRequest:
+                # file_id yaroqsiz: fayl keshda bo'lsa u yuklanadi, bo'lmasa hisobot qayta yig'iladi
+                report_cache.forget_file_id(params, version)
+                report = await report_cache.get_or_build(params, version, build)
+        try:
+            sent = await message.answer_document(FSInputFile(report.path, filename=report.filename), caption=caption)
+        except Exception:
+            if os.path.exists(report.path):
+                raise
+            # Fayl yuborish paytida keshdan chiqarildi (hajm chegarasi): hisobot qayta yig'iladi
+            report = await report_cache.get_or_build(params, version, build)
+            sent = await message.answer_document(FSInputFile(report.path, filename=report.filename), caption=caption)
+        report_cache.remember_file_id(params, version, sent.document.file_id)
+    except Exception as e:
+        await message.answer(f"❌ Hisobotni yaratishda xatolik yuz berdi: {e}")
@@ -1,9 +1,10 @@
-from aiogram import Router, F, Bot
+from aiogram import Router, F
 from aiogram.filters import CommandStart, CommandObject
 from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton
-from database import get_user, mark_attendance, check_token_used, mark_token_used
-from utils import verify_token
+from database import get_user, record_scan, SCAN_OK, SCAN_NOT_REGISTERED, SCAN_TOKEN_USED
+from tokens import verify_token
 from config import SUPER_ADMIN_ID, NOTIFICATION_ADMIN_IDS
+from notifications import NotificationDispatcher
 
 router = Router()
 
@@ -15,7 +16,7 @@ worker_kb = ReplyKeyboardMarkup(
 
 
 @router.message(CommandStart())
-async def bot_start(message: Message, command: CommandObject, bot: Bot):
+async def bot_start(message: Message, command: CommandObject, notifier: NotificationDispatcher):
     user_id = message.from_user.id
     args = command.args  # QR token
 
@@ -25,7 +26,17 @@ async def bot_start(message: Message, command: CommandObject, bot: Bot):
                              reply_markup=worker_kb)
         return
 
-    # 2. Oddiy Adminlar va Ishchilar uchun davomat mantiqi
+    # 2. QR token imzosi va muddati xotirada tekshiriladi: soxta yoki eskirgan
+    # havolalar bazaga (hatto foydalanuvchi keshidan tashqariga) yetib bormaydi
+    action_type = None
+    if args:
+        is_valid, action_type = verify_token(args)
+
+        if not is_valid:
+            await message.answer(f"❌ Xatolik! QR kod noto'g'ri yoki muddati o'tgan.")
+            return
+
+    # 3. Oddiy Adminlar va Ishchilar uchun davomat mantiqi
     user = await get_user(user_id)
     if not user:
         await message.answer(
@@ -35,14 +46,10 @@ async def bot_start(message: Message, command: CommandObject, bot: Bot):
     full_name = user[1]
 
     if args:
-        is_valid, action_type = verify_token(args)
+        # 4. Bir martalik QR token + Davomat bitta tranzaksiyada yoziladi
+        result = await record_scan(args, user_id, action_type)
 
-        if not is_valid:
-            await message.answer(f"❌ Xatolik! QR kod noto'g'ri yoki muddati o'tgan.")
-            return
-
-        # Bir martalik QR KOD TEKSHIRUVI
-        if await check_token_used(args):
+        if result.status == SCAN_TOKEN_USED:
             await message.answer(
                 "❌ Bu QR kod allaqachon **ishlatilgan**!\n"
                 "Iltimos, Davomatni qayd etish uchun **Adminda yangi QR kod** so'rang.",
@@ -50,25 +57,16 @@ async def bot_start(message: Message, command: CommandObject, bot: Bot):
             )
             return
 
-        # 3. Davomatni yozish
-        status_text, admin_report_text = await mark_attendance(user_id, action_type)
-
-        if status_text.startswith("✅"):
-            # Muvaffaqiyatli bo'lsa, tokenni ishlatilgan deb belgilash
-            await mark_token_used(args, action_type, user_id, full_name)
-            await message.answer(f"👋 Hurmatli **{full_name}**,\n{status_text}", parse_mode="Markdown")
-
-            # 🚨 Barcha Administratorlarga xabar yuborish
-            if admin_report_text:
-                for admin_chat_id in NOTIFICATION_ADMIN_IDS:
-                    await bot.send_message(
-                        chat_id=admin_chat_id,
-                        text=admin_report_text,
-                        parse_mode="Markdown"
-                    )
-        else:
-            # Xato xabari
-            await message.answer(f"👋 Hurmatli **{full_name}**,\n{status_text}", parse_mode="Markdown")
+        if result.status == SCAN_NOT_REGISTERED:
+            await message.answer(
+                f"❌ Kechirasiz, siz tizimda ro'yxatdan o'tmagansiz.\nSizning ID: `{user_id}`\nAdmin bilan bog'laning.")
+            return
+
+        await message.answer(f"👋 Hurmatli **{full_name}**,\n{result.status_text}", parse_mode="Markdown")
+
+        # 🚨 Muvaffaqiyatli bo'lsa, barcha Administratorlarga xabar (navbatga qo'yiladi, kutilmaydi)
+        if result.status == SCAN_OK and result.admin_report_text:
+            notifier.notify(NOTIFICATION_ADMIN_IDS, result.admin_report_text)
 
     else:
         await message.answer(f"Salom, **{full_name}**. Davomat qilish uchun ofisdagi QR kodni skanerlang.",
@@ -1,31 +1,142 @@
 import asyncio
 import logging
+import sys
 from aiogram import Bot, Dispatcher
-from config import BOT_TOKEN
-from database import create_tables
+import metrics
+from config import BOT_TOKEN, QR_POOL_SIZE, BOT_MODE, LOOP_LAG_INTERVAL, WARMUP_MODULES, WARMUP_DELAY
+from database import (init_db, close_db, create_tables, load_user_directory, load_used_tokens,
+                      load_presence, user_directory, used_tokens, write_coalescer)
 from handlers import admin, user
+from notifications import NotificationDispatcher
+from qr_pool import QRPool
+from maintenance import maintenance_loop
+from webhook import run_webhook, start_metrics_server
+from fsm_storage import SQLiteStorage
+from report_cache import report_cache
+from middlewares import TimingMiddleware
+from utils import load_module
 
 # Logging sozlamalari
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(name)s - %(message)s')
 
 
+async def warm_up_modules(delay=WARMUP_DELAY):
+    """Bot updatelarni qabul qila boshlagach, og'ir modullarni fonda oldindan yuklaydi."""
+    await asyncio.sleep(delay)
+    for name in WARMUP_MODULES:
+        try:
+            await load_module(name)
+        except Exception:
+            logging.exception(f"{name} modulini oldindan yuklab bo'lmadi")
+
+
 async def main():
-    # Baza jadvallarini yaratish (yoki mavjud bo'lsa tekshirish)
-    await create_tables()
+    # Doimiy baza ulanishlarini ochish (WAL, PRAGMA sozlamalari bir marta o'rnatiladi)
+    await init_db()
+    notifier = None
+    qr_pool = None
+    maintenance_task = None
+    lag_task = None
+    warmup_task = None
+    metrics_runner = None
+
+    try:
+        # Baza jadvallarini yaratish (yoki mavjud bo'lsa tekshirish)
+        await create_tables()
+
+        # Foydalanuvchilar keshini yuklash (skan paytida faqat meta.users_version tekshiriladi)
+        users_loaded = await load_user_directory()
+        logging.info(f"👥 Foydalanuvchilar keshga yuklandi: {users_loaded} ta")
+
+        # Muddati o'tmagan ishlatilgan QR tokenlar (takroriy skan bazaga yetmasdan rad etiladi)
+        tokens_loaded = await load_used_tokens()
+        logging.info(f"🔑 Ishlatilgan tokenlar keshga yuklandi: {tokens_loaded} ta")
+
+        # Bugungi davomat holati (/now buyrug'i bazasiz javob beradi)
+        present_rows = await load_presence()
+        logging.info(f"🟢 Bugungi davomat holati yuklandi: {present_rows} ta yozuv")
+
+        # Hisobot keshi kalitlari xotirada: oldingi ishga tushirishdan qolgan fayllar o'chiriladi
+        report_cache.reset()
+
+        # Parallel skanlar bitta tranzaksiyaga yig'iladi (guruhli commit)
+        write_coalescer.start()
+
+        # Eski qr_history yozuvlarini davriy tozalash
+        maintenance_task = asyncio.create_task(maintenance_loop())
+        # Event loop bloklanishini o'lchash (/stats va /metrics da ko'rinadi)
+        lag_task = asyncio.create_task(metrics.monitor_loop_lag(LOOP_LAG_INTERVAL))
+
+        bot = Bot(token=BOT_TOKEN)
+        # FSM holatlari bazada saqlanadi: qayta ishga tushirish va bir nechta jarayonda ham saqlanib qoladi
+        storage = SQLiteStorage()
+        dp = Dispatcher(storage=storage)
+        dp["fsm_cache"] = storage
+
+        # Har bir handler vaqti va undagi baza ulushi (barcha routerlarga tarqaladi)
+        dp.message.middleware(TimingMiddleware())
+        dp.callback_query.middleware(TimingMiddleware())
+
+        # Adminlarga xabarnomalar fon navbati orqali yuboriladi (handlerlar kutmaydi)
+        notifier = NotificationDispatcher(bot)
+        notifier.start()
+        dp["notifier"] = notifier
+
+        # Routerni ulash
+        dp.include_router(user.router)
+        dp.include_router(admin.router)
+
+        # Bot username bir marta olinadi va QR havolalari uchun handlerlarga uzatiladi
+        bot_info = await bot.get_me()
+        dp["bot_username"] = bot_info.username
+        logging.info(f"🤖 Bot ishga tushdi: @{bot_info.username}")
 
-    bot = Bot(token=BOT_TOKEN)
-    dp = Dispatcher()
+        # Oldindan chizilgan QR kodlar zaxirasi (ixtiyoriy)
+        if QR_POOL_SIZE > 0:
+            qr_pool = QRPool(bot_info.username)
+            qr_pool.start()
+        dp["qr_pool"] = qr_pool
 
-    # Routerni ulash
-    dp.include_router(user.router)
-    dp.include_router(admin.router)
+        # So'ralganda hisoblanadigan metrikalar (Prometheus)
+        metrics.gauge("notify_queue_depth", lambda: notifier.queue_depth)
+        metrics.gauge("user_cache_size", lambda: len(user_directory))
+        metrics.gauge("used_tokens", lambda: len(used_tokens))
+        metrics.gauge("fsm_cache_hits", lambda: storage.hits)
+        metrics.gauge("fsm_cache_misses", lambda: storage.misses)
+        metrics.gauge("user_cache_hits", lambda: user_directory.hits)
+        metrics.gauge("user_cache_misses", lambda: user_directory.misses)
+        if qr_pool is not None:
+            metrics.gauge("qr_pool_hits", lambda: qr_pool.hits)
+            metrics.gauge("qr_pool_misses", lambda: qr_pool.misses)
 
-    bot_info = await bot.get_me()
-    logging.info(f"🤖 Bot ishga tushdi: @{bot_info.username}")
+        if WARMUP_MODULES:
+            warmup_task = asyncio.create_task(warm_up_modules())
 
-    # Botni ishga tushirish
-    await dp.start_polling(bot)
+        # Botni ishga tushirish: webhook (aiohttp server) yoki long polling
+        if BOT_MODE == "webhook":
+            await run_webhook(dp, bot)
+        else:
+            metrics_runner = await start_metrics_server(dp)
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
+    finally:
+        # Navbatdagi xabarnomalarni yuborib bo'lish, so'ng ulanishlarni yopish
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        for task in (maintenance_task, lag_task, warmup_task):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        if qr_pool is not None:
+            await qr_pool.stop()
+        # Hisobot jarayonlari (birinchi bo'laklangan hisobotda ochilgan bo'lsa) yopiladi
+        if "reports" in sys.modules:
+            await asyncio.to_thread(sys.modules["reports"].report_pool.stop)
+        if notifier is not None:
+            await notifier.stop()
+        await write_coalescer.stop()
+        await close_db()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,34 @@
+"""Bazani davriy parvarish qilish: eski qr_history yozuvlarini o'chirish, yopilgan
+oylarni arxivga ko'chirish va bo'shagan joyni qaytarish.
+
+main.py da fon vazifasi sifatida ishga tushadi. Barcha ishlar kichik
+tranzaksiyalarda bajariladi, shuning uchun skanlar sezilarli kutmaydi.
+"""
+import asyncio
+import logging
+
+from config import MAINTENANCE_INTERVAL
+from database import prune_qr_history, prune_fsm, reclaim_free_pages, rotate_archives
+
+logger = logging.getLogger(__name__)
+
+
+async def run_maintenance():
+    await prune_fsm()
+    deleted = await prune_qr_history()
+    if deleted:
+        await reclaim_free_pages()
+        logger.info("🧹 qr_history: %d ta eski yozuv o'chirildi", deleted)
+
+    for month, moved in (await rotate_archives()).items():
+        logger.info("🗄 %s oyi arxivlandi: %d ta davomat yozuvi", month, moved)
+    return deleted
+
+
+async def maintenance_loop(interval=MAINTENANCE_INTERVAL):
+    while True:
+        try:
+            await run_maintenance()
+        except Exception:
+            logger.exception("Baza parvarishida xato")
+        await asyncio.sleep(interval)
@@ -0,0 +1,182 @@
+"""Jarayon ichidagi oddiy metrikalar: hisoblagichlar, kechikish histogrammalari va gauge'lar.
+
+Histogramma va hisoblagich nomi "oila:nom" ko'rinishida bo'lishi mumkin (masalan "handler:bot_start",
+"db:record_scan"); Prometheus formatida oila metrika nomiga, nom esa name yorlig'iga aylanadi.
+"""
+import asyncio
+import bisect
+import functools
+import time
+from collections import deque
+from contextvars import ContextVar
+
+# Histogramma chegaralari (millisekund), Prometheus uslubida kumulyativ
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+PROMETHEUS_PREFIX = "davomat"
+
+STARTED_AT = time.time()
+
+
+class LatencyHistogram:
+    """Qat'iy chegarali histogramma + percentil uchun oxirgi namunalar (cheklangan)."""
+
+    def __init__(self, recent=2048):
+        self.count = 0
+        self.total = 0.0  # soniyalarda
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)  # oxirgisi: +Inf
+        self._recent = deque(maxlen=recent)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.buckets[bisect.bisect_left(BUCKETS_MS, seconds * 1000)] += 1
+        self._recent.append(seconds)
+
+    def percentile(self, q):
+        """Oxirgi namunalar bo'yicha percentil (soniyalarda). Namuna bo'lmasa 0."""
+        if not self._recent:
+            return 0.0
+        ordered = sorted(self._recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "avg_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(0.50) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+        }
+
+
+_histograms = {}
+_counters = {}
+_gauges = {}
+
+
+def histogram(name):
+    """Nom bo'yicha histogrammani qaytaradi (yo'q bo'lsa yaratadi)."""
+    hist = _histograms.get(name)
+    if hist is None:
+        hist = _histograms[name] = LatencyHistogram()
+    return hist
+
+
+def histograms(family):
+    """Oiladagi barcha histogrammalar: {nom: histogramma}."""
+    prefix = f"{family}:"
+    return {name[len(prefix):]: hist for name, hist in _histograms.items() if name.startswith(prefix)}
+
+
+def increment(name, value=1):
+    _counters[name] = _counters.get(name, 0) + value
+
+
+def counter(name):
+    return _counters.get(name, 0)
+
+
+def gauge(name, func):
+    """Joriy qiymatni so'ralganda hisoblaydigan metrika (masalan, navbat uzunligi)."""
+    _gauges[name] = func
+
+
+# --- BAZA VAQTI ---
+# Har bir update uchun bazada o'tgan vaqt ContextVar da yig'iladi (middleware o'rnatadi).
+# Ichma-ich chaqiruvlar (record_scan -> get_user) ikki marta hisoblanmaydi.
+
+_db_time = ContextVar("db_time", default=None)
+_db_depth = ContextVar("db_depth", default=0)
+
+
+def db_timed(func):
+    """database.py dagi async funksiyalar uchun: chaqiruvlar soni va kechikishi "db:<nom>" ga yoziladi."""
+    hist = histogram(f"db:{func.__name__}")
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        depth = _db_depth.get()
+        depth_token = _db_depth.set(depth + 1)
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            _db_depth.reset(depth_token)
+            hist.observe(elapsed)
+            accumulator = _db_time.get()
+            if accumulator is not None and depth == 0:
+                accumulator[0] += elapsed
+
+    return wrapper
+
+
+def start_db_timer():
+    """Joriy kontekst (update) uchun baza vaqti hisoblagichini boshlaydi: (token, accumulator)."""
+    accumulator = [0.0]
+    return _db_time.set(accumulator), accumulator
+
+
+def stop_db_timer(token):
+    _db_time.reset(token)
+
+
+# --- EVENT LOOP KECHIKISHI ---
+
+async def monitor_loop_lag(interval=0.5):
+    """Har interval soniyada uyg'onib, kutilganidan qancha kech uyg'onganini "loop_lag" ga yozadi."""
+    hist = histogram("loop_lag")
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        hist.observe(max(0.0, loop.time() - expected))
+
+
+# --- PROMETHEUS FORMATI ---
+
+def _metric_name(name):
+    return f"{PROMETHEUS_PREFIX}_" + "".join(ch if ch.isalnum() else "_" for ch in name)
+
+
+def render_prometheus():
+    """Barcha metrikalarni Prometheus text exposition formatida qaytaradi."""
+    lines = [f"# TYPE {PROMETHEUS_PREFIX}_uptime_seconds gauge",
+             f"{PROMETHEUS_PREFIX}_uptime_seconds {time.time() - STARTED_AT:.0f}"]
+
+    families = {}
+    for name, hist in sorted(_histograms.items()):
+        family, _, label = name.partition(":")
+        families.setdefault(family, []).append((label, hist))
+    for family, members in families.items():
+        metric = _metric_name(f"{family}_seconds")
+        lines.append(f"# TYPE {metric} histogram")
+        for label, hist in members:
+            labels = f'name="{label}",' if label else ""
+            cumulative = 0
+            for bound, count in zip(BUCKETS_MS + (None,), hist.buckets):
+                cumulative += count
+                le = "+Inf" if bound is None else f"{bound / 1000:g}"
+                lines.append(f'{metric}_bucket{{{labels}le="{le}"}} {cumulative}')
+            suffix = f"{{{labels.rstrip(',')}}}" if label else ""
+            lines.append(f"{metric}_sum{suffix} {hist.total:.6f}")
+            lines.append(f"{metric}_count{suffix} {hist.count}")
+
+    declared = set()
+    for name, value in sorted(_counters.items()):
+        family, _, label = name.partition(":")
+        metric = _metric_name(f"{family}_total")
+        if metric not in declared:
+            declared.add(metric)
+            lines.append(f"# TYPE {metric} counter")
+        lines.append(f'{metric}{{name="{label}"}} {value}' if label else f"{metric} {value}")
+
+    for name, func in sorted(_gauges.items()):
+        try:
+            value = func()
+        except Exception:
+            continue
+        metric = _metric_name(name)
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
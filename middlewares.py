@@ -0,0 +1,33 @@
+"""aiogram middleware'lari."""
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+import metrics
+
+
+class TimingMiddleware(BaseMiddleware):
+    """Har bir handlerning bajarilish vaqtini "handler:<nom>" histogrammasiga yozadi.
+
+    Dispatcher'ning ichki (inner) middleware'i sifatida ulanadi, shuning uchun
+    barcha routerlardagi handlerlarga tegishli va faqat mos handler topilganda
+    ishlaydi. Shu update davomida bazada o'tgan vaqt ham alohida yig'iladi.
+    """
+
+    async def __call__(self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject, data: Dict[str, Any]) -> Any:
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        db_token, db_time = metrics.start_db_timer()
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            metrics.increment(f"handler_errors:{name}")
+            raise
+        finally:
+            metrics.histogram(f"handler:{name}").observe(time.perf_counter() - started)
+            metrics.increment(f"handler_db_seconds:{name}", db_time[0])
+            metrics.stop_db_timer(db_token)
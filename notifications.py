@@ -0,0 +1,141 @@
+"""Adminlarga xabarnomalarni fon navbati orqali yetkazish.
+
+Handler faqat notify() ni chaqiradi va darhol qaytadi. Yuborishni bir nechta
+fon vazifasi (worker) parallel bajaradi, Telegram cheklovlariga rioya qilgan
+holda: umumiy tezlik (xabar/soniya) va har bir chat uchun minimal oraliq.
+429 (TelegramRetryAfter) kelsa retry_after kutiladi, tarmoq/server xatolarida
+eksponensial kechikish bilan qayta uriniladi.
+"""
+import asyncio
+import logging
+import time
+from typing import NamedTuple
+
+from aiogram import Bot
+from aiogram.exceptions import (TelegramRetryAfter, TelegramNetworkError, TelegramServerError,
+                                TelegramForbiddenError, TelegramBadRequest)
+
+import metrics
+from config import (NOTIFY_WORKERS, NOTIFY_GLOBAL_RATE, NOTIFY_PER_CHAT_INTERVAL, NOTIFY_MAX_RETRIES,
+                    NOTIFY_QUEUE_SIZE, NOTIFY_DRAIN_TIMEOUT)
+
+logger = logging.getLogger(__name__)
+
+
+class _Notification(NamedTuple):
+    chat_id: int
+    text: str
+    parse_mode: str
+    enqueued_at: float
+
+
+class NotificationDispatcher:
+    def __init__(self, bot: Bot, workers=NOTIFY_WORKERS, global_rate=NOTIFY_GLOBAL_RATE,
+                 per_chat_interval=NOTIFY_PER_CHAT_INTERVAL, max_retries=NOTIFY_MAX_RETRIES,
+                 queue_size=NOTIFY_QUEUE_SIZE):
+        self.bot = bot
+        self.worker_count = max(1, workers)
+        self.global_interval = 1.0 / global_rate if global_rate > 0 else 0.0
+        self.per_chat_interval = per_chat_interval
+        self.max_retries = max_retries
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._workers = []
+        # Keyingi bo'sh "slot" vaqtlari (time.monotonic): umumiy va har bir chat uchun
+        self._next_global = 0.0
+        self._next_per_chat = {}
+        self.latency = metrics.histogram("notify_delivery")
+        self.delivered = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+
+    def start(self):
+        for i in range(self.worker_count):
+            self._workers.append(asyncio.create_task(self._worker(), name=f"notify-worker-{i}"))
+
+    async def stop(self, timeout=NOTIFY_DRAIN_TIMEOUT):
+        """Navbatdagi xabarlarni yuborib bo'lishga (timeout gacha) harakat qiladi, so'ng to'xtaydi."""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Xabarnoma navbati to'liq bo'shamadi: %d ta qoldi", self._queue.qsize())
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    def notify(self, chat_ids, text, parse_mode="Markdown"):
+        """Xabarni navbatga qo'yadi va darhol qaytadi (await kerak emas)."""
+        now = time.monotonic()
+        for chat_id in chat_ids:
+            try:
+                self._queue.put_nowait(_Notification(chat_id, text, parse_mode, now))
+            except asyncio.QueueFull:
+                self.dropped += 1
+                logger.error("Xabarnoma navbati to'lgan, xabar tashlab yuborildi (chat %s)", chat_id)
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue_depth,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            **self.latency.snapshot(),
+        }
+
+    async def _wait_for_slot(self, chat_id):
+        # Slot oldindan band qilinadi, shuning uchun bir nechta worker bir-birini kutmasdan
+        # navbat bilan tezlik chegarasiga tushadi.
+        now = time.monotonic()
+        chat_slot = max(now, self._next_per_chat.get(chat_id, 0.0))
+        self._next_per_chat[chat_id] = chat_slot + self.per_chat_interval
+        global_slot = max(chat_slot, self._next_global)
+        self._next_global = global_slot + self.global_interval
+        if global_slot > now:
+            await asyncio.sleep(global_slot - now)
+
+    async def _worker(self):
+        while True:
+            item = await self._queue.get()
+            try:
+                await self._deliver(item)
+            except Exception:
+                self.failed += 1
+                logger.exception("Xabarnoma yuborishda kutilmagan xato (chat %s)", item.chat_id)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, item: _Notification):
+        backoff = 1.0
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_slot(item.chat_id)
+            try:
+                await self.bot.send_message(chat_id=item.chat_id, text=item.text, parse_mode=item.parse_mode)
+            except TelegramRetryAfter as e:
+                # Shu chatga retry_after o'tmaguncha yubormaslik
+                self._next_per_chat[item.chat_id] = time.monotonic() + e.retry_after
+                error = e
+            except (TelegramNetworkError, TelegramServerError) as e:
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                error = e
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                # Bot bloklangan yoki chat topilmadi: qayta urinishdan foyda yo'q
+                self.failed += 1
+                logger.warning("Xabarnoma yetkazilmadi (chat %s): %s", item.chat_id, e)
+                return
+            else:
+                self.delivered += 1
+                self.latency.observe(time.monotonic() - item.enqueued_at)
+                return
+
+            if attempt < self.max_retries:
+                self.retried += 1
+        self.failed += 1
+        logger.warning("Xabarnoma %d urinishdan keyin yetkazilmadi (chat %s): %s",
+                       self.max_retries + 1, item.chat_id, error)
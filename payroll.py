@@ -0,0 +1,197 @@
+"""Ish vaqti va maosh hisoblash yadrosi.
+
+Vaqtlar yarim tundan beri o'tgan butun soniyalarda, sanalar esa kun raqamida
+(1970-01-01 dan beri kunlar, bazadagi attendance.day) yoki hafta kuni
+raqamida (0=Dushanba, 6=Yakshanba) ishlatiladi. Chegaralar (LATE_TIME_LIMIT,
+LUNCH_START, LUNCH_END) modul yuklanganda bir marta soniyaga aylantiriladi.
+
+Ikki yo'l bor va ular bir xil natija beradi:
+- work_day() / day_salary() — bitta qator uchun (utils dagi eski funksiyalar shularga tayanadi);
+- compute_batch() / compute_rows() — ustunlar (NumPy massivlari) uchun, hisobotlarda ishlatiladi.
+
+NumPy faqat ustunli funksiyalar ichida import qilinadi: skan yo'li (work_day,
+date_to_day) uni umuman yuklamaydi.
+"""
+from datetime import date, datetime
+from typing import NamedTuple
+
+from config import HOURLY_RATE, LATE_TIME_LIMIT, LUNCH_START, LUNCH_END
+
+NO_TIME = -1  # Keldi/Ketdi qayd etilmagan
+DAY_SECONDS = 24 * 3600
+MAX_PAID_HOURS = 9.0  # Maksimal to'lanadigan soatlar (9:00 dan 19:00 gacha - 1 soat tushlik)
+SUNDAY = 6
+
+
+def time_to_seconds(time_str):
+    """'HH:MM:SS' -> yarim tundan beri soniyalar. Bo'sh qiymat uchun NO_TIME."""
+    if not time_str:
+        return NO_TIME
+    hours, minutes, seconds = time_str.split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+def weekday(date_str):
+    """'YYYY-MM-DD' -> hafta kuni (0=Dushanba). Noto'g'ri sana uchun -1."""
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").weekday()
+    except (TypeError, ValueError):
+        return -1
+
+
+# --- KUN RAQAMLARI (attendance.day) ---
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def date_to_day(value):
+    """date yoki 'YYYY-MM-DD' -> 1970-01-01 dan beri kunlar soni."""
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return value.toordinal() - EPOCH_ORDINAL
+
+
+def day_to_date(day):
+    return date.fromordinal(day + EPOCH_ORDINAL)
+
+
+def day_weekday(day):
+    """Kun raqamidan hafta kuni (1970-01-01 payshanba edi). NumPy massivi ham qabul qilinadi."""
+    return (day + 3) % 7
+
+
+def day_month(day):
+    """Kun raqamidan 'YYYY-MM' (monthly_payroll kaliti)."""
+    return day_to_date(day).strftime("%Y-%m")
+
+
+def month_day_range(month):
+    """'YYYY-MM' -> (birinchi kun raqami, oxirgi kun raqami)."""
+    year, month_num = (int(part) for part in month.split("-"))
+    first = date(year, month_num, 1)
+    following = date(year + month_num // 12, month_num % 12 + 1, 1)
+    return date_to_day(first), date_to_day(following) - 1
+
+
+def seconds_to_time(seconds):
+    """Soniyalar -> 'HH:MM:SS'. None qaytsa, vaqt qayd etilmagan."""
+    if seconds is None:
+        return None
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+LATE_LIMIT_SECONDS = time_to_seconds(LATE_TIME_LIMIT)
+LUNCH_START_SECONDS = time_to_seconds(LUNCH_START)
+LUNCH_END_SECONDS = time_to_seconds(LUNCH_END)
+
+
+# --- BITTA QATOR UCHUN ---
+
+def work_day(check_in, check_out, late_limit=LATE_LIMIT_SECONDS):
+    """(is_late, net_seconds) qaytaradi. Vaqtlar soniyalarda, NO_TIME = qayd etilmagan."""
+    if check_in == NO_TIME:
+        return False, 0
+    is_late = check_in > late_limit
+    if check_out == NO_TIME:
+        return is_late, 0
+
+    end = check_out + DAY_SECONDS if check_out < check_in else check_out  # Yarim tundan keyin chiqsa
+    lunch = min(end, LUNCH_END_SECONDS) - max(check_in, LUNCH_START_SECONDS)
+    return is_late, (end - check_in) - max(lunch, 0)
+
+
+def day_salary(worked_seconds, is_sunday):
+    """(kunlik maosh, minutlik maosh) qaytaradi."""
+    if is_sunday or worked_seconds == 0:
+        return 0.0, 0.0
+
+    paid_hours = min(worked_seconds / 3600, MAX_PAID_HOURS)
+    salary_per_day = paid_hours * HOURLY_RATE
+    paid_minutes = paid_hours * 60
+    salary_per_minute = salary_per_day / paid_minutes if paid_minutes > 0 else 0.0
+
+    return round(salary_per_day, 0), round(salary_per_minute, 2)
+
+
+def format_duration(worked_seconds):
+    hours = int(worked_seconds // 3600)
+    minutes = int((worked_seconds % 3600) // 60)
+    return f"{hours}s {minutes}m"
+
+
+# --- USTUNLAR (BATCH) UCHUN ---
+
+class PayrollBatch(NamedTuple):
+    worked_seconds: "np.ndarray"  # float64, sof ishlangan soniyalar
+    is_late: "np.ndarray"  # bool
+    is_sunday: "np.ndarray"  # bool
+    salary_per_day: "np.ndarray"  # float64, yaxlitlangan
+    salary_per_minute: "np.ndarray"  # float64, 2 xonagacha yaxlitlangan
+
+
+def compute_batch(check_in, check_out, weekdays, late_limit=LATE_LIMIT_SECONDS):
+    """Soniya va hafta kuni massivlari bo'yicha butun ustunni bir yo'la hisoblaydi."""
+    import numpy as np
+
+    check_in = np.asarray(check_in, dtype=np.int64)
+    check_out = np.asarray(check_out, dtype=np.int64)
+    weekdays = np.asarray(weekdays, dtype=np.int64)
+
+    has_in = check_in != NO_TIME
+    complete = has_in & (check_out != NO_TIME)
+
+    end = np.where(check_out < check_in, check_out + DAY_SECONDS, check_out)
+    lunch = np.minimum(end, LUNCH_END_SECONDS) - np.maximum(check_in, LUNCH_START_SECONDS)
+    net = (end - check_in) - np.maximum(lunch, 0)
+    worked = np.where(complete, net, 0).astype(np.float64)
+
+    is_late = has_in & (check_in > late_limit)
+    is_sunday = weekdays == SUNDAY
+
+    paid_hours = np.minimum(worked / 3600, MAX_PAID_HOURS)
+    salary = paid_hours * HOURLY_RATE
+    paid_minutes = paid_hours * 60
+    per_minute = np.divide(salary, paid_minutes, out=np.zeros_like(salary), where=paid_minutes > 0)
+
+    unpaid = is_sunday | (worked == 0)
+    salary = np.where(unpaid, 0.0, np.round(salary))
+    per_minute = np.where(unpaid, 0.0, _round_like_python(per_minute, 2))
+
+    return PayrollBatch(worked, is_late, is_sunday, salary, per_minute)
+
+
+def _round_like_python(values, ndigits):
+    # np.round(x, 2) x*100 orqali yaxlitlaydi va chegaraviy holatlarda Python round()
+    # dan farq qilishi mumkin. Qiymatlar juda kam xil bo'lgani uchun noyoblari
+    # Python round() bilan yaxlitlanadi.
+    import numpy as np
+
+    unique, inverse = np.unique(values, return_inverse=True)
+    rounded = np.array([round(float(v), ndigits) for v in unique], dtype=np.float64)
+    return rounded[inverse].reshape(values.shape)
+
+
+def compute_rows(check_ins, check_outs, dates, late_limit=LATE_LIMIT_SECONDS):
+    """Satr ko'rinishidagi ustunlarni bir marta soniya/hafta kuniga aylantirib, compute_batch ni chaqiradi."""
+    import numpy as np
+
+    weekday_of = {d: weekday(d) for d in set(dates)}
+    return compute_batch(
+        np.fromiter((time_to_seconds(t) for t in check_ins), dtype=np.int64, count=len(check_ins)),
+        np.fromiter((time_to_seconds(t) for t in check_outs), dtype=np.int64, count=len(check_outs)),
+        np.fromiter((weekday_of[d] for d in dates), dtype=np.int64, count=len(dates)),
+        late_limit,
+    )
+
+
+def compute_days(check_ins, check_outs, days, late_limit=LATE_LIMIT_SECONDS):
+    """Bazadagi butun sonli ustunlar (soniyalar, None = qayd etilmagan; kun raqami) uchun.
+
+    Satrlarni parse qilish umuman kerak emas: hafta kuni kun raqamidan arifmetik olinadi.
+    """
+    import numpy as np
+
+    check_in = np.array([NO_TIME if t is None else t for t in check_ins], dtype=np.int64)
+    check_out = np.array([NO_TIME if t is None else t for t in check_outs], dtype=np.int64)
+    weekdays = day_weekday(np.asarray(days, dtype=np.int64))
+    return compute_batch(check_in, check_out, weekdays, late_limit)
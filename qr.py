@@ -0,0 +1,35 @@
+"""QR kod rasmini chizish (qrcode + PIL).
+
+Og'ir modul: faqat Bosh admin QR so'raganda yoki QR zaxirasi to'ldirilayotganda
+birinchi marta import qilinadi (main.py uni polling boshlangach fonda oldindan yuklaydi).
+"""
+import asyncio
+import io
+
+import qrcode
+
+from tokens import get_daily_token
+
+
+def render_qr_png(qr_data):
+    """QR kodni diskka yozmasdan, xotirada PNG baytlariga chizadi (CPU ish, event loop'dan tashqarida chaqiring)."""
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(qr_data)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill='black', back_color='white')
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def generate_qr_image(bot_username, action_type):
+    """Yangi bir martalik token va uning QR rasmi: (token, PNG baytlari)."""
+    token = get_daily_token(action_type)
+    return token, render_qr_png(f"https://t.me/{bot_username}?start={token}")
+
+
+async def render_qr_image(bot_username, action_type):
+    """generate_qr_image ni alohida oqimda bajaradi."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, generate_qr_image, bot_username, action_type)
@@ -0,0 +1,63 @@
+"""Oldindan chizilgan bir martalik QR kodlar zaxirasi.
+
+Har bir amal (in/out) uchun fon vazifasi navbatni QR_POOL_SIZE tagacha
+to'ldirib turadi. Admin "Keldi/Ketdi QR" ni bosganda tayyor rasm darhol
+olinadi; zaxira bo'sh qolsa (ketma-ket ko'p bosilsa) rasm o'sha zahoti
+chiziladi. Har bir rasm faqat bir marta beriladi.
+"""
+import asyncio
+import logging
+import time
+
+from config import QR_POOL_SIZE, QR_TOKEN_TTL
+from tokens import token_expires_at
+from utils import load_module
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ("in", "out")
+
+
+class QRPool:
+    def __init__(self, bot_username, size=QR_POOL_SIZE):
+        self.bot_username = bot_username
+        self.size = size
+        self._queues = {action: asyncio.Queue(maxsize=size) for action in ACTIONS}
+        self._tasks = []
+        self.hits = 0
+        self.misses = 0
+
+    def start(self):
+        for action in ACTIONS:
+            self._tasks.append(asyncio.create_task(self._refill(action), name=f"qr-pool-{action}"))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def get(self, action):
+        """(token, PNG baytlari). Zaxirada bo'lsa darhol, bo'lmasa joyida chiziladi."""
+        queue = self._queues[action]
+        while not queue.empty():
+            token, png = queue.get_nowait()
+            # Zaxirada uzoq yotib, muddatining yarmidan ko'pi o'tgan tokenlar berilmaydi
+            if token_expires_at(token) - time.time() >= QR_TOKEN_TTL / 2:
+                self.hits += 1
+                return token, png
+        self.misses += 1
+        qr = await load_module("qr")
+        return await qr.render_qr_image(self.bot_username, action)
+
+    async def _refill(self, action):
+        queue = self._queues[action]
+        while True:
+            try:
+                qr = await load_module("qr")
+                item = await qr.render_qr_image(self.bot_username, action)
+            except Exception:
+                logger.exception("QR zaxirasini to'ldirishda xato (%s)", action)
+                await asyncio.sleep(5)
+                continue
+            await queue.put(item)  # Navbat to'la bo'lsa, bo'shaguncha kutadi
@@ -0,0 +1,177 @@
+"""Tayyor hisobotlar keshi: bir xil hisobot qayta yig'ilmaydi va qayta yuklanmaydi.
+
+Kalit — hisobot parametrlari (davr, ishchi, varaqlarga bo'lish turi); har bir yozuv
+qaysi ma'lumotlar versiyasida (database.get_data_version) yig'ilganini eslaydi. Versiya
+o'zgarmagan bo'lsa, hisobot ham o'zgarmagan: takroriy so'rov Telegram file_id si bilan
+faylni qayta yuklamasdan yuboriladi. Fayllar REPORT_CACHE_DIR/<pid> da saqlanadi (bir
+bazada bir nechta bot jarayoni ishlasa, ular bir-birining fayllariga tegmaydi); umumiy
+hajmi REPORT_CACHE_MAX_BYTES dan oshsa eng uzoq ishlatilmaganlari o'chiriladi (file_id qoladi).
+Bir vaqtda kelgan bir xil so'rovlar bitta yig'ishni kutadi.
+"""
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from config import REPORT_CACHE_DIR, REPORT_CACHE_MAX_BYTES
+
+# Fayli o'chirilib, faqat file_id si qolgan yozuvlar soni chegarasi
+FILE_ID_ONLY_LIMIT = 256
+
+
+class CachedReport(NamedTuple):
+    version: int
+    filename: str  # Telegram'da ko'rinadigan nom
+    path: Optional[str]  # keshdagi fayl (hajm chegarasi tufayli o'chirilgan bo'lsa None)
+    size: int
+    file_id: Optional[str] = None
+
+
+class ReportCache:
+    def __init__(self, directory=REPORT_CACHE_DIR, max_bytes=REPORT_CACHE_MAX_BYTES):
+        self.root = directory
+        self.directory = os.path.join(directory, str(os.getpid()))
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # parametrlar -> CachedReport, eng uzoq ishlatilmagani boshida
+        self._building = {}  # (parametrlar, versiya) -> yig'ilayotgan hisobot vazifasi
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def reset(self):
+        """Shu jarayon papkasini va to'xtagan jarayonlardan qolganlarini tozalaydi (kalitlar faqat xotirada)."""
+        self.directory = os.path.join(self.root, str(os.getpid()))
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if not os.path.isdir(path):
+                os.remove(path)  # papkalarga bo'linishdan oldingi fayllar
+            elif name.isdigit() and not _process_alive(int(name)):
+                shutil.rmtree(path, ignore_errors=True)
+        self._entries.clear()
+        self.bytes = 0
+
+    def get(self, params, version) -> Optional[CachedReport]:
+        """Shu versiyada yig'ilgan yozuv (fayli yoki file_id si bor) yoki None."""
+        entry = self._entries.get(params)
+        if entry is None or entry.version != version:
+            return None
+        if entry.path is not None and not os.path.exists(entry.path):
+            # Fayl tashqaridan o'chirilgan: file_id bo'lsa yozuv qoladi, bo'lmasa qayta yig'iladi
+            self._remove_file(entry)
+            if entry.file_id is None:
+                del self._entries[params]
+                return None
+            entry = self._entries[params] = entry._replace(path=None, size=0)
+        self._entries.move_to_end(params)
+        return entry
+
+    async def get_or_build(self, params, version, build) -> CachedReport:
+        """Keshdagi yozuvni qaytaradi, yo'q bo'lsa build(papka) bilan yig'adi.
+
+        build — hisobotni berilgan (shu yig'ish uchun alohida) papkaga yozib, fayl yo'lini
+        qaytaruvchi korutina. Fayl nomi Telegram'da ko'rinadigan nom sifatida saqlanadi.
+        """
+        entry = self.get(params, version)
+        if entry is not None and (entry.path is not None or entry.file_id is not None):
+            self.hits += 1
+            return entry
+
+        key = (params, version)
+        task = self._building.get(key)
+        if task is None:
+            self.misses += 1
+            task = self._building[key] = asyncio.ensure_future(self._build(params, version, build))
+            task.add_done_callback(lambda _: self._building.pop(key, None))
+        else:
+            self.hits += 1
+        # Kutayotgan so'rov bekor qilinsa ham, boshqalar uchun yig'ish davom etadi
+        return await asyncio.shield(task)
+
+    async def _build(self, params, version, build):
+        # Turli hisobotlar bir davr uchun bir xil nomli fayl yozadi: har bir yig'ish o'z papkasida
+        os.makedirs(self.directory, exist_ok=True)
+        workdir = tempfile.mkdtemp(prefix="build_", dir=self.directory)
+        try:
+            source = await build(workdir)
+            digest = hashlib.sha1(repr((params, version)).encode()).hexdigest()[:16]
+            path = os.path.join(self.directory, digest + os.path.splitext(source)[1])
+            os.replace(source, path)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        entry = CachedReport(version, os.path.basename(source), path, os.path.getsize(path))
+        self._store(params, entry)
+        return entry
+
+    def remember_file_id(self, params, version, file_id):
+        entry = self._entries.get(params)
+        if entry is not None and entry.version == version:
+            self._entries[params] = entry._replace(file_id=file_id)
+
+    def forget_file_id(self, params, version):
+        """Telegram file_id ni rad etganda chaqiriladi: keyingi safar fayl qayta yuklanadi."""
+        entry = self._entries.get(params)
+        if entry is None or entry.version != version:
+            return
+        if entry.path is None:
+            del self._entries[params]
+        else:
+            self._entries[params] = entry._replace(file_id=None)
+
+    def _store(self, params, entry):
+        previous = self._entries.pop(params, None)
+        if previous is not None:
+            self._remove_file(previous)
+        self._entries[params] = entry
+        self.bytes += entry.size
+        self._evict(keep=params)
+
+    def _remove_file(self, entry):
+        if entry.path is not None:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+            self.bytes -= entry.size
+
+    def _evict(self, keep):
+        file_id_only = 0
+        for params, entry in list(self._entries.items()):
+            if self.bytes > self.max_bytes and entry.path is not None and params != keep:
+                self._remove_file(entry)
+                entry = entry._replace(path=None, size=0)
+                if entry.file_id is None:
+                    del self._entries[params]
+                    continue
+                self._entries[params] = entry
+            if entry.path is None:
+                file_id_only += 1
+
+        # Eng eski file_id-yozuvlar: ro'yxat cheksiz o'smasin
+        for params in [params for params, entry in self._entries.items() if entry.path is None]:
+            if file_id_only <= FILE_ID_ONLY_LIMIT:
+                break
+            del self._entries[params]
+            file_id_only -= 1
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self.bytes, "hits": self.hits, "misses": self.misses}
+
+
+def _process_alive(pid):
+    if os.name != "posix":
+        return True  # Windows da os.kill(pid, 0) jarayonni to'xtatadi: papka qoldiriladi
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+report_cache = ReportCache()
@@ -0,0 +1,649 @@
+"""Excel hisobot (openpyxl write-only yoki bo'laklangan, process pool) va ishchilarni CSV/XLSX fayldan o'qish.
+
+Og'ir modul: faqat Bosh admin hisobot yoki import so'raganda birinchi marta
+import qilinadi (main.py uni polling boshlangach fonda oldindan yuklaydi).
+"""
+import asyncio
+import csv
+import io
+import multiprocessing
+import os
+import re
+import shutil
+import sqlite3
+import struct
+import tempfile
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple, Optional
+from xml.sax.saxutils import quoteattr
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter
+
+import payroll
+from config import (IMPORT_MAX_ROWS, IMPORT_NAME_MAX, REPORT_CHUNK_SIZE, REPORT_PROCESSES, REPORT_PROCESSES_MAX,
+                    REPORT_MAX_BYTES)
+
+
+# --- EXCEL EXPORT FUNKSIYASI (Write-only, oqimli) ---
+
+REPORT_HEADERS = ["F.I.SH", "Sana", "Kelgan Vaqt", "Ketgan Vaqt", "Ishlagan Soat (Net)", "Kechikish",
+                  "Kunlik Maosh (so'm)", "Minutlik Maosh (so'm)"]
+
+# Nomlangan uslublar: har bir katak uchun yangi Font/Border yaratilmaydi
+STYLE_HEADER = "davomat_header"
+STYLE_CELL = "davomat_cell"
+STYLE_LATE = "davomat_late"
+STYLE_ON_TIME = "davomat_on_time"
+STYLE_ZERO_SALARY = "davomat_zero_salary"
+STYLE_TOTAL = "davomat_total"
+
+
+def _register_report_styles(wb):
+    thin = Side(style='thin')
+    thin_border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    styles = [
+        NamedStyle(name=STYLE_HEADER, font=Font(bold=True), border=thin_border,
+                   alignment=Alignment(horizontal='center', vertical='center')),
+        NamedStyle(name=STYLE_CELL, border=thin_border),
+        NamedStyle(name=STYLE_LATE, font=Font(bold=True, color="FF0000"), border=thin_border),
+        NamedStyle(name=STYLE_ON_TIME, font=Font(color="008000"), border=thin_border),
+        NamedStyle(name=STYLE_ZERO_SALARY, font=Font(color="808080"), border=thin_border),
+        NamedStyle(name=STYLE_TOTAL, font=Font(bold=True)),
+    ]
+    for style in styles:
+        wb.add_named_style(style)
+
+
+def _styled(ws, value, style):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
+
+
+def _detail_rows(chunks, totals):
+    """Hisobot qatorlari: har biri [(qiymat, uslub), ...]. Bo'lak bo'yicha vektorlashgan hisob.
+
+    totals ga har bir ishchi uchun [ishlagan kunlar, soniyalar, kechikishlar, maosh] yig'iladi.
+    """
+    date_labels = {}  # kun raqami -> 'YYYY-MM-DD' (hisobotda kunlar soni kam)
+
+    for chunk in chunks:
+        names, days, check_ins, check_outs = zip(*chunk)
+        # Butun bo'lak uchun vaqt/maosh bir yo'la (vektorlashgan) hisoblanadi
+        batch = payroll.compute_days(check_ins, check_outs, days)
+
+        for name, day, check_in, check_out, worked_seconds, is_late, sunday, salary_per_day, salary_per_minute \
+                in zip(names, days, check_ins, check_outs, batch.worked_seconds.tolist(), batch.is_late.tolist(),
+                       batch.is_sunday.tolist(), batch.salary_per_day.tolist(), batch.salary_per_minute.tolist()):
+            total = totals.get(name)
+            if total is None:
+                total = totals[name] = [0, 0.0, 0, 0.0]
+            total[0] += worked_seconds > 0
+            total[1] += worked_seconds
+            total[2] += is_late
+            total[3] += salary_per_day
+
+            date_str = date_labels.get(day)
+            if date_str is None:
+                date_str = date_labels[day] = payroll.day_to_date(day).isoformat()
+
+            yield [
+                (name, STYLE_CELL),
+                (date_str, STYLE_CELL),
+                (payroll.seconds_to_time(check_in) or "Yo'q", STYLE_CELL),
+                (payroll.seconds_to_time(check_out) or "Yo'q", STYLE_CELL),
+                (f"{worked_seconds / 3600:.2f}" if worked_seconds > 0 else "0.00", STYLE_CELL),
+                ("✅ Ha" if is_late else "❌ Yo'q", STYLE_LATE if is_late else STYLE_ON_TIME),
+                (f"{salary_per_day:,.0f}", STYLE_ZERO_SALARY if salary_per_day == 0 and not sunday else STYLE_CELL),
+                (f"{salary_per_minute:.2f}", STYLE_CELL),
+            ]
+
+
+def _write_report(chunks, filename, period_label=None):
+    """Qatorlar bo'laklarini (chunk) write-only varaqqa yozadi.
+
+    Har bir bo'lak yozilgach xotiradan chiqadi, shuning uchun xotira sarfi
+    hisobot hajmiga emas, bo'lak hajmiga bog'liq.
+    """
+    wb = Workbook(write_only=True)
+    _register_report_styles(wb)
+    ws = wb.create_sheet("Davomat Hisoboti")
+
+    for col_num in range(1, len(REPORT_HEADERS) + 1):
+        ws.column_dimensions[get_column_letter(col_num)].width = 15
+
+    ws.append([_styled(ws, header, STYLE_HEADER) for header in REPORT_HEADERS])
+
+    totals = {}
+    for row in _detail_rows(chunks, totals):
+        ws.append([_styled(ws, value, style) for value, style in row])
+
+    # --- Oylik umumiy hisobotni qo'shish (Eng pastda) ---
+    ws.append([])
+    title = f"UMUMIY MAOSH HISOBOTI ({period_label}):" if period_label else "UMUMIY OYLIK MAOSH HISOBOTI:"
+    ws.append([title, "", "", "", "", "", "", ""])
+
+    for name, (_, _, _, salary) in totals.items():
+        ws.append([_styled(ws, name, STYLE_TOTAL), None, None, None, None, None,
+                   _styled(ws, f"Jami Maosh: {salary:,.0f} so'm", STYLE_TOTAL)])
+
+    wb.save(filename)
+    return filename
+
+
+def _report_filename(date_from=None, date_to=None):
+    if date_from and date_to:
+        return f"Davomat_Hisoboti_{date_from}_{date_to}.xlsx"
+    return f"Davomat_Hisoboti_{datetime.now().strftime('%Y-%m-%d')}.xlsx"
+
+
+def export_to_excel(data):
+    """get_attendance_data() qatorlaridan hisobot yaratadi (sinxron)."""
+    return _write_report([data], _report_filename())
+
+
+async def _next_chunk(chunks):
+    try:
+        return await chunks.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+def _pull_chunks(chunks, loop):
+    """Ishchi oqim (thread) ichidan async generatordan bo'laklarni birma-bir tortadi."""
+    while True:
+        chunk = asyncio.run_coroutine_threadsafe(_next_chunk(chunks), loop).result()
+        if chunk is None:
+            return
+        yield chunk
+
+
+async def export_attendance_report(chunks, date_from=None, date_to=None, directory="."):
+    """Async kursordan keladigan bo'laklar asosida hisobotni alohida oqimda yaratadi.
+
+    Workbook yig'ish event loop'dan tashqarida bajariladi, shu sababli hisobot
+    tayyorlanayotganda ham QR skanlar qayta ishlanadi. Fayl nomi faqat davrga bog'liq,
+    shuning uchun parallel yig'ishlar har biri o'z papkasiga (directory) yozishi kerak.
+    """
+    loop = asyncio.get_running_loop()
+    period_label = f"{date_from} — {date_to}" if date_from and date_to else None
+    try:
+        return await loop.run_in_executor(None, _write_report, _pull_chunks(chunks, loop),
+                                          os.path.join(directory, _report_filename(date_from, date_to)),
+                                          period_label)
+    finally:
+        await chunks.aclose()
+
+
+# --- BO'LAKLANGAN HISOBOT (PROCESS POOL) ---
+# Katta hisobot oy yoki ishchi bo'yicha varaqlarga bo'linadi va har bir varaq alohida
+# jarayonda yig'iladi: jarayon bazani o'zi (faqat o'qish rejimida) o'qiydi, maoshni
+# hisoblaydi va varaq XML ini siqilgan holda vaqtinchalik faylga yozadi. Asosiy jarayon
+# tayyor siqilgan oqimlarni qayta siqmasdan bitta .xlsx (yoki .xlsx lar zip i) ga yig'adi.
+# openpyxl bu yerda ishlatilmaydi: umumiy satrlar jadvali (sharedStrings) varaqlarni
+# birlashtirishga to'sqinlik qiladi, shuning uchun satrlar inlineStr bo'lib yoziladi.
+# Natija openpyxl hisobotiga (_write_report) mosligi scripts/report_equivalence bilan tekshiriladi.
+
+SUMMARY_SHEET = "Maosh"
+SUMMARY_HEADERS = ["F.I.SH", "Ishlagan kunlar", "Ishlagan soat", "Kechikishlar", "Jami maosh (so'm)"]
+
+# styles.xml dagi cellXfs tartibi (0 — standart)
+_XF = {STYLE_HEADER: 1, STYLE_CELL: 2, STYLE_LATE: 3, STYLE_ON_TIME: 4, STYLE_ZERO_SALARY: 5, STYLE_TOTAL: 6}
+
+_XML_HEAD = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+_CT_PREFIX = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+
+_THIN = '<left style="thin"><color auto="1"/></left><right style="thin"><color auto="1"/></right>' \
+        '<top style="thin"><color auto="1"/></top><bottom style="thin"><color auto="1"/></bottom><diagonal/>'
+_STYLES_XML = (
+    f'{_XML_HEAD}<styleSheet xmlns="{_NS_MAIN}">'
+    '<fonts count="5">'
+    '<font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><color rgb="FFFF0000"/><name val="Calibri"/></font>'
+    '<font><sz val="11"/><color rgb="FF008000"/><name val="Calibri"/></font>'
+    '<font><sz val="11"/><color rgb="FF808080"/><name val="Calibri"/></font>'
+    '</fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    f'<borders count="2"><border><left/><right/><top/><bottom/><diagonal/></border><border>{_THIN}</border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="7">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1" applyAlignment="1">'
+    '<alignment horizontal="center" vertical="center"/></xf>'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="1" xfId="0" applyBorder="1"/>'
+    '<xf numFmtId="0" fontId="2" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1"/>'
+    '<xf numFmtId="0" fontId="3" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1"/>'
+    '<xf numFmtId="0" fontId="4" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+_COLUMN_LETTERS = [get_column_letter(col_num) for col_num in range(1, len(REPORT_HEADERS) + 1)]
+_ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_SHEET_TITLE_CHARS = re.compile(r"[\[\]:*?/\\]")
+_ZIP_LIMIT = 0xFFFFFFFF  # ZIP64 yozilmaydi: bitta a'zo va butun fayl 4 GB dan kichik bo'lishi kerak
+
+
+class _ZipMember(NamedTuple):
+    """Zip ichidagi fayl: tayyor (siqilgan yoki siqilmagan) baytlar diskda yoki xotirada."""
+    name: str
+    crc: int
+    size: int
+    compressed_size: int
+    method: int  # 0 = siqilmagan, 8 = deflate
+    path: Optional[str] = None
+    data: bytes = b""
+
+
+def _xml_member(name, text):
+    data = text.encode("utf-8")
+    return _ZipMember(name, zlib.crc32(data), len(data), len(data), 0, data=data)
+
+
+def _xml_text(value):
+    text = _ILLEGAL_XML_CHARS.sub("", str(value)).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    if text != text.strip():
+        return f'<t xml:space="preserve">{text}</t>'
+    return f"<t>{text}</t>"
+
+
+class _SheetWriter:
+    """Varaq XML ini (sheetN.xml) raw deflate bilan oqimli siqib faylga yozadi.
+
+    crc32 va hajmlar yozish davomida hisoblanadi, shuning uchun keyin zip ga
+    qayta o'qimasdan (va qayta siqmasdan) ko'chiriladi. Siqilgan hajm max_bytes dan
+    oshsa yozish to'xtatiladi: bunday faylni Telegram baribir qabul qilmaydi.
+    """
+
+    def __init__(self, path, max_bytes=REPORT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rows = 0
+        self._file = open(path, "wb")
+        self._deflate = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        self._crc = 0
+        self._size = 0
+        self._compressed_size = 0
+        self._pending = []
+        self._emit(f'{_XML_HEAD}<worksheet xmlns="{_NS_MAIN}"><cols>'
+                   f'<col min="1" max="{len(_COLUMN_LETTERS)}" width="15" customWidth="1"/></cols><sheetData>')
+
+    def _emit(self, text):
+        data = text.encode("utf-8")
+        self._crc = zlib.crc32(data, self._crc)
+        self._size += len(data)
+        self._write(self._deflate.compress(data))
+
+    def _write(self, data):
+        if data:
+            self._file.write(data)
+            self._compressed_size += len(data)
+            if self._compressed_size > self.max_bytes:
+                self._file.close()
+                _too_large(self.max_bytes)
+
+    def append(self, cells):
+        """cells: [(qiymat, uslub)]; None qiymatli katak yozilmaydi, son esa son bo'lib yoziladi."""
+        self.rows += 1
+        row = self.rows
+        parts = [f'<row r="{row}">']
+        for letter, (value, style) in zip(_COLUMN_LETTERS, cells):
+            if value is None:
+                continue
+            if isinstance(value, (int, float)):
+                parts.append(f'<c r="{letter}{row}" s="{_XF[style]}"><v>{value}</v></c>')
+            else:
+                parts.append(f'<c r="{letter}{row}" s="{_XF[style]}" t="inlineStr"><is>{_xml_text(value)}</is></c>')
+        parts.append("</row>")
+        self._pending.append("".join(parts))
+        if len(self._pending) >= 512:
+            self._emit("".join(self._pending))
+            self._pending.clear()
+
+    def close(self):
+        self._pending.append("</sheetData></worksheet>")
+        self._emit("".join(self._pending))
+        self._write(self._deflate.flush())
+        self._file.close()
+        return _ZipMember("", self._crc, self._size, self._compressed_size, 8, path=self.path)
+
+
+def _too_large(max_bytes):
+    raise ValueError(f"Hisobot hajmi {max_bytes / (1024 * 1024):.3g} MB dan oshdi, davrni qisqartiring")
+
+
+def _fetch_chunks(cursor, chunk_size):
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield rows
+
+
+def _build_partition(task):
+    """Process pool ishchisi: bitta bo'lak varag'ini yig'adi -> (varaq a'zosi, ishchilar bo'yicha jami).
+
+    Baza alohida sqlite3 ulanishida faqat o'qish rejimida ochiladi (aiosqlite va
+    event loop bu jarayonda yo'q), arxiv oylari navbat bilan ATTACH qilinadi.
+    """
+    db_path, sources, sheet_path, chunk_size, max_bytes = task
+    totals = {}
+    sheet = _SheetWriter(sheet_path, max_bytes)
+    sheet.append([(header, STYLE_HEADER) for header in REPORT_HEADERS])
+
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        for archive, sql, params in sources:
+            if archive:
+                conn.execute("ATTACH DATABASE ? AS archive", (f"{Path(archive).resolve().as_uri()}?mode=ro",))
+            try:
+                for row in _detail_rows(_fetch_chunks(conn.execute(sql, params), chunk_size), totals):
+                    sheet.append(row)
+            finally:
+                if archive:
+                    conn.execute("DETACH DATABASE archive")
+    finally:
+        conn.close()
+    return sheet.close(), totals
+
+
+def _summary_sheet(totals, period_label, path):
+    """Ishchilar bo'yicha maosh varag'i (avvalgi "UMUMIY MAOSH HISOBOTI" bloki o'rniga)."""
+    sheet = _SheetWriter(path)
+    title = f"UMUMIY MAOSH HISOBOTI ({period_label})" if period_label else "UMUMIY OYLIK MAOSH HISOBOTI"
+    sheet.append([(title, STYLE_TOTAL)])
+    sheet.append([])
+    sheet.append([(header, STYLE_HEADER) for header in SUMMARY_HEADERS])
+    for name, (days_worked, worked_seconds, late_days, salary) in sorted(totals.items()):
+        sheet.append([(name, STYLE_CELL), (int(days_worked), STYLE_CELL), (round(worked_seconds / 3600, 2), STYLE_CELL),
+                      (int(late_days), STYLE_CELL), (round(salary), STYLE_CELL)])
+    return sheet.close()
+
+
+def _sheet_titles(titles):
+    """Excel varaq nomlari: taqiqlangan belgilarsiz, 31 belgigacha va takrorlanmas (katta-kichik harfdan qat'i nazar)."""
+    result, seen = [], set()
+    for title in titles:
+        base = _SHEET_TITLE_CHARS.sub("_", _ILLEGAL_XML_CHARS.sub("", title)).strip("' ")[:31] or "Varaq"
+        candidate, number = base, 1
+        while candidate.lower() in seen:
+            number += 1
+            suffix = f" ({number})"
+            candidate = base[:31 - len(suffix)] + suffix
+        seen.add(candidate.lower())
+        result.append(candidate)
+    return result
+
+
+def _dos_datetime(moment):
+    return ((moment.hour << 11) | (moment.minute << 5) | (moment.second // 2),
+            ((moment.year - 1980) << 9) | (moment.month << 5) | moment.day)
+
+
+def _write_zip(filename, members):
+    """Zip faylini yozadi; a'zolarning siqilgan baytlari o'zgarishsiz ko'chiriladi."""
+    dos_time, dos_date = _dos_datetime(datetime.now())
+    central, offset = [], 0
+    with open(filename, "wb") as out:
+        for member in members:
+            if max(member.size, member.compressed_size, offset) >= _ZIP_LIMIT:
+                raise ValueError("Hisobot hajmi 4 GB dan oshdi, davrni qisqartiring")
+            name = member.name.encode("utf-8")
+            header = struct.pack("<4s5H3I2H", b"PK\x03\x04", 20, 0x0800, member.method, dos_time, dos_date,
+                                 member.crc, member.compressed_size, member.size, len(name), 0)
+            out.write(header + name)
+            if member.path:
+                with open(member.path, "rb") as source:
+                    shutil.copyfileobj(source, out, 1024 * 1024)
+            else:
+                out.write(member.data)
+            central.append(struct.pack("<4s6H3I5H2I", b"PK\x01\x02", 20, 20, 0x0800, member.method, dos_time,
+                                       dos_date, member.crc, member.compressed_size, member.size, len(name),
+                                       0, 0, 0, 0, 0, offset) + name)
+            offset += len(header) + len(name) + member.compressed_size
+
+        directory = b"".join(central)
+        if offset + len(directory) >= _ZIP_LIMIT:
+            raise ValueError("Hisobot hajmi 4 GB dan oshdi, davrni qisqartiring")
+        out.write(directory)
+        out.write(struct.pack("<4s4H2IH", b"PK\x05\x06", 0, 0, len(members), len(members), len(directory),
+                              offset, 0))
+    return filename
+
+
+def _write_workbook(filename, sheets):
+    """sheets: [(varaq nomi, siqilgan sheet XML a'zosi)] -> .xlsx fayl."""
+    count = len(sheets)
+    overrides = "".join(f'<Override PartName="/xl/worksheets/sheet{n}.xml" ContentType="{_CT_PREFIX}.worksheet+xml"/>'
+                        for n in range(1, count + 1))
+    sheet_entries = "".join(f'<sheet name={quoteattr(title)} sheetId="{n}" r:id="rId{n}"/>'
+                            for n, (title, _) in enumerate(sheets, 1))
+    sheet_rels = "".join(f'<Relationship Id="rId{n}" Type="{_NS_REL}/worksheet" Target="worksheets/sheet{n}.xml"/>'
+                         for n in range(1, count + 1))
+    members = [
+        _xml_member("[Content_Types].xml",
+                    f'{_XML_HEAD}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                    f'<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                    f'<Default Extension="xml" ContentType="application/xml"/>'
+                    f'<Override PartName="/xl/workbook.xml" ContentType="{_CT_PREFIX}.sheet.main+xml"/>'
+                    f'<Override PartName="/xl/styles.xml" ContentType="{_CT_PREFIX}.styles+xml"/>{overrides}</Types>'),
+        _xml_member("_rels/.rels",
+                    f'{_XML_HEAD}<Relationships xmlns="{_NS_PKG_REL}"><Relationship Id="rId1" '
+                    f'Type="{_NS_REL}/officeDocument" Target="xl/workbook.xml"/></Relationships>'),
+        _xml_member("xl/workbook.xml",
+                    f'{_XML_HEAD}<workbook xmlns="{_NS_MAIN}" xmlns:r="{_NS_REL}"><sheets>{sheet_entries}</sheets>'
+                    f'</workbook>'),
+        _xml_member("xl/_rels/workbook.xml.rels",
+                    f'{_XML_HEAD}<Relationships xmlns="{_NS_PKG_REL}">{sheet_rels}<Relationship Id="rId{count + 1}" '
+                    f'Type="{_NS_REL}/styles" Target="styles.xml"/></Relationships>'),
+        _xml_member("xl/styles.xml", _STYLES_XML),
+    ]
+    members.extend(member._replace(name=f"xl/worksheets/sheet{n}.xml") for n, (_, member) in enumerate(sheets, 1))
+    return _write_zip(filename, members)
+
+
+def _pool_context():
+    # fork ishlatilmaydi: hisobot asyncio.to_thread ichidan so'raladi, ota jarayonda esa aiosqlite,
+    # guruhli commit va executor oqimlari ishlayapti — ularning qulflari bola jarayonga band holda
+    # o'tib, sqlite3.connect da osilib qolishi mumkin. forkserver serveri bitta oqimli toza jarayon;
+    # __main__ va shu modul unda bir marta import qilinadi, ishchilar esa undan tayyor holda ajraladi.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["__main__", "reports"])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+class ReportPool:
+    """Bo'laklangan hisobot uchun doimiy jarayonlar puli: birinchi shunday hisobotda bir marta ochiladi.
+
+    Ishchilar hisobotlar orasida qayta ishlatiladi, shuning uchun har bir so'rovda
+    jarayon yaratilmaydi. processes <= 1 bo'lsa bo'laklar chaqiruvchi oqimda yig'iladi.
+    """
+
+    def __init__(self):
+        self.processes = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def start(self, processes=REPORT_PROCESSES):
+        """Pulni ochadi va ishchilarni oldindan ishga tushiradi (bloklaydi). Ochiq bo'lsa hech narsa qilmaydi."""
+        processes = processes or min(REPORT_PROCESSES_MAX, os.cpu_count() or 1)
+        with self._lock:
+            if self.processes is not None:
+                return
+            self.processes = processes
+            if processes > 1:
+                self._executor = ProcessPoolExecutor(max_workers=processes, mp_context=_pool_context())
+            executor = self._executor
+        if executor is not None:
+            # Ishchilar talab bo'yicha yaratiladi: birinchi hisobot ularni kutmasin
+            for future in [executor.submit(os.getpid) for _ in range(processes)]:
+                future.result()
+
+    def stop(self):
+        with self._lock:
+            executor, self._executor, self.processes = self._executor, None, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    def map(self, fn, tasks):
+        self.start()
+        executor = self._executor
+        if executor is None or len(tasks) <= 1:
+            return [fn(task) for task in tasks]
+        try:
+            return list(executor.map(fn, tasks))
+        except BrokenProcessPool:
+            # Ishchi jarayon o'ldi (masalan, xotira yetmadi): keyingi hisobot uchun pul qayta ochiladi
+            self.stop()
+            raise
+
+
+report_pool = ReportPool()
+
+
+def write_partitioned_report(partitions, db_path, filename, period_label=None, zip_output=False,
+                             chunk_size=REPORT_CHUNK_SIZE, max_bytes=REPORT_MAX_BYTES):
+    """Bo'laklar (database.plan_report_partitions) bo'yicha hisobotni report_pool da yig'adi (sinxron).
+
+    Natija: birinchi varag'i "Maosh" bo'lgan bitta .xlsx, yoki zip_output=True da
+    har bir bo'lak alohida .xlsx bo'lgan zip arxiv. Siqilgan varaqlar jami max_bytes
+    dan oshsa ValueError (ZIP64 yozilmaydi, 4 GB ga yetmasdan to'xtatiladi).
+    """
+    workdir = tempfile.mkdtemp(prefix="davomat_report_")
+    try:
+        tasks = [(db_path, partition.sources, os.path.join(workdir, f"sheet{n}.xml.deflate"), chunk_size, max_bytes)
+                 for n, partition in enumerate(partitions, 1)]
+        results = report_pool.map(_build_partition, tasks)
+        if sum(member.compressed_size for member, _ in results) > max_bytes:
+            _too_large(max_bytes)
+
+        totals = {}
+        for _, part_totals in results:
+            for name, values in part_totals.items():
+                total = totals.setdefault(name, [0, 0.0, 0, 0.0])
+                for index, value in enumerate(values):
+                    total[index] += value
+
+        summary = _summary_sheet(totals, period_label, os.path.join(workdir, "summary.xml.deflate"))
+        titles = _sheet_titles([SUMMARY_SHEET] + [partition.title for partition in partitions])
+        sheets = list(zip(titles, [summary] + [member for member, _ in results]))
+
+        if not zip_output:
+            return _write_workbook(filename, sheets)
+
+        with zipfile.ZipFile(filename, "w", zipfile.ZIP_STORED) as archive:
+            for n, (title, member) in enumerate(sheets):
+                book = _write_workbook(os.path.join(workdir, f"book{n}.xlsx"), [(title, member)])
+                archive.write(book, f"{title}.xlsx")
+                os.remove(book)
+        return filename
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+async def export_partitioned_report(partitions, db_path, date_from, date_to, zip_output=False, directory="."):
+    """write_partitioned_report ni ishchi oqimda ishga tushiradi (event loop bloklanmaydi)."""
+    filename = os.path.join(directory, _report_filename(date_from, date_to))
+    if zip_output:
+        filename = filename[:-len(".xlsx")] + ".zip"
+    return await asyncio.to_thread(write_partitioned_report, partitions, db_path, filename,
+                                   f"{date_from} — {date_to}", zip_output)
+
+
+# --- ISHCHILARNI FAYLDAN YUKLASH (CSV / XLSX) ---
+
+def _csv_rows(buffer):
+    text = io.TextIOWrapper(buffer, encoding="utf-8-sig", newline="")
+    sample = text.read(4096)
+    text.seek(0)
+    # Excel mintaqa sozlamasiga qarab ";" yoki "," ishlatadi: namunada eng ko'p uchraganini olamiz
+    delimiter = max(",;\t", key=sample.count)
+    yield from csv.reader(text, delimiter=delimiter)
+
+
+def _xlsx_rows(buffer):
+    # read_only: varaq to'liq xotiraga yuklanmaydi, qatorlar oqim sifatida o'qiladi
+    wb = load_workbook(buffer, read_only=True, data_only=True)
+    try:
+        yield from wb.active.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+# SQLite INTEGER chegarasi: kattaroq "ID" executemany da OverflowError beradi
+_TELEGRAM_ID_LIMIT = 2 ** 63
+
+
+def _cell_text(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # Excel raqamlarni 12345.0 ko'rinishida qaytarishi mumkin
+    return "" if value is None else str(value).strip()
+
+
+def parse_worker_file(buffer, filename, max_rows=IMPORT_MAX_ROWS):
+    """Fayldan (ism, telegram_id) qatorlarini o'qiydi (sinxron, ishchi oqimda chaqiriladi).
+
+    Ustunlar tartibi ixtiyoriy: raqamli katak Telegram ID, qolganlari (ism, familiya) ism
+    sifatida birlashtiriladi. Sarlavha qatori o'tkazib yuboriladi. Fayl ichida takrorlangan
+    ID bir marta olinadi. (qatorlar, fayldagi takroriylar soni, [(qator raqami, sabab), ...]) qaytaradi.
+    """
+    reader = _xlsx_rows if filename.lower().endswith(".xlsx") else _csv_rows
+    rows, invalid, seen, duplicates = [], [], set(), 0
+    for line_no, cells in enumerate(reader(buffer), 1):
+        cells = [text for text in map(_cell_text, cells) if text]
+        if not cells:
+            continue
+        ids = [text for text in cells if text.isdigit()]
+        name = " ".join(text for text in cells if not text.isdigit())
+        if not ids:
+            if line_no > 1:  # Birinchi qator — sarlavha
+                invalid.append((line_no, "Telegram ID yo'q"))
+            continue
+        if len(ids) > 1:
+            invalid.append((line_no, "bir nechta raqamli ustun"))
+            continue
+        if not name:
+            invalid.append((line_no, "ism yo'q"))
+            continue
+        if len(name) > IMPORT_NAME_MAX:
+            invalid.append((line_no, "ism juda uzun"))
+            continue
+        # isdigit() boshqa yozuvlardagi raqamlarni ham (masalan, arab-hind) qabul qiladi
+        if not ids[0].isascii() or not 0 < int(ids[0]) < _TELEGRAM_ID_LIMIT:
+            invalid.append((line_no, "Telegram ID noto'g'ri"))
+            continue
+        if len(rows) + duplicates >= max_rows:
+            invalid.append((line_no, f"{max_rows} qatordan ortig'i o'qilmadi"))
+            break
+
+        telegram_id = int(ids[0])
+        if telegram_id in seen:
+            duplicates += 1
+            continue
+        seen.add(telegram_id)
+        rows.append((name, telegram_id))
+    return rows, duplicates, invalid
+
+
+async def parse_worker_import(buffer, filename):
+    """parse_worker_file ni event loop'dan tashqarida bajaradi."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, parse_worker_file, buffer, filename)
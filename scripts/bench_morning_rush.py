@@ -0,0 +1,371 @@
+"""Ertalabki "tig'iz" yuklama: ko'p ishchi bir vaqtda QR skanerlaganda bot qanday ishlaydi.
+
+Vaqtinchalik papkada bo'sh attendance.db yaratiladi, unga --workers ta ishchi
+qo'shiladi va har biri uchun sintetik "/start <token>" update dp.feed_update
+orqali uzatiladi (to'liq yo'l: bot_start -> verify_token -> record_scan ->
+token yondirish -> davomat -> adminlarga xabarnoma). Telegram API soxta sessiya
+bilan almashtirilgan (tarmoq yo'q), --api-latency bilan uning kechikishini
+taqlid qilish mumkin.
+
+Ssenariylar:
+    scan    — Keldi, so'ng Ketdi to'lqini (+ --replay ulushida takroriy tokenlar)
+    mark    — mark_attendance() ni to'g'ridan-to'g'ri chaqirish (tokensiz yo'l)
+    excel   — --excel-rows dagi har bir hajm uchun Excel hisobot yaratish
+
+Natijalar: o'tkazuvchanlik, handler kechikishi p50/p95/p99, yozuvchi qulfini
+kutish (SQLite yozish navbati), guruhli commit partiyalari va xabarnomalar yetkazilishi.
+--write-batch 0 guruhli commitni o'chiradi (har bir skan o'z tranzaksiyasida). --json faylga
+yozilgan natijalarni --compare bilan boshqa commit natijasiga solishtirish mumkin.
+
+Ishga tushirish (repo ildizidan):
+    python -m scripts.bench_morning_rush --workers 500 --concurrency 50 --json rush.json
+    python -m scripts.bench_morning_rush --scenarios excel --excel-rows 10000,100000,1000000
+    python -m scripts.bench_morning_rush --compare old.json --json new.json
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import os
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import SendMessage, SendDocument, SendPhoto
+from aiogram.types import Chat, Message, Update, User
+
+import database
+import payroll
+from config import WRITE_BATCH_SIZE, WRITE_BATCH_DELAY
+from fsm_storage import SQLiteStorage
+from handlers import user as user_handlers
+from notifications import NotificationDispatcher
+from reports import export_attendance_report
+from tokens import get_daily_token
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIRST_TELEGRAM_ID = 100000
+ADMIN_IDS = [1, 2, 3]
+
+
+class FakeSession(BaseSession):
+    """Telegram API o'rniga: so'rovni yozib oladi va soxta javob qaytaradi."""
+
+    def __init__(self, latency=0.0):
+        super().__init__()
+        self.latency = latency
+        self.requests = 0
+        self._ids = itertools.count(1)
+
+    async def close(self):
+        pass
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+    async def make_request(self, bot, method, timeout=None):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if isinstance(method, (SendMessage, SendDocument, SendPhoto)):
+            return Message(message_id=next(self._ids), date=datetime.datetime.now(),
+                           chat=Chat(id=method.chat_id, type="private"))
+        return True
+
+
+class TimedLock(asyncio.Lock):
+    """Yozuvchi qulfini kutish vaqtini o'lchaydigan asyncio.Lock."""
+
+    def __init__(self):
+        super().__init__()
+        self.waits = []
+
+    async def acquire(self):
+        started = time.perf_counter()
+        result = await super().acquire()
+        self.waits.append(time.perf_counter() - started)
+        return result
+
+
+_update_ids = itertools.count(1)
+
+
+def start_update(telegram_id, token):
+    now = datetime.datetime.now()
+    user = User(id=telegram_id, is_bot=False, first_name="Ishchi")
+    return Update(update_id=next(_update_ids), message=Message(
+        message_id=next(_update_ids), date=now, chat=Chat(id=telegram_id, type="private"),
+        from_user=user, text=f"/start {token}"))
+
+
+def percentiles(samples):
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return {"count": len(ordered), "mean_ms": statistics.fmean(ordered) * 1000,
+            "p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": ordered[-1] * 1000}
+
+
+async def seed_workers(workers):
+    async with database.get_manager().transaction() as db:
+        await db.executemany("INSERT INTO users (full_name, telegram_id) VALUES (?, ?)",
+                             ((f"Ishchi {i:05d}", FIRST_TELEGRAM_ID + i) for i in range(workers)))
+    await database.load_user_directory()
+
+
+async def drive(dp, bot, updates, concurrency, duration):
+    """Updatelarni concurrency chegarasida uzatadi; duration > 0 bo'lsa kelishlar shu oraliqqa yoyiladi."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    offsets = sorted(random.uniform(0, duration) for _ in updates) if duration > 0 else [0.0] * len(updates)
+
+    async def one(update, offset):
+        nonlocal errors
+        delay = started + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        async with semaphore:
+            t0 = time.perf_counter()
+            try:
+                await dp.feed_update(bot, update)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - t0)
+
+    await asyncio.gather(*(one(update, offset) for update, offset in zip(updates, offsets)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def scenario_scan(args):
+    lock = TimedLock()
+    database.get_manager()._write_lock = lock
+    session = FakeSession(args.api_latency / 1000)
+    bot = Bot("123456:BENCH", session=session)
+    notifier = NotificationDispatcher(bot, global_rate=args.notify_rate, per_chat_interval=args.notify_interval)
+    notifier.start()
+    user_handlers.NOTIFICATION_ADMIN_IDS = ADMIN_IDS
+    dp = Dispatcher(storage=SQLiteStorage())
+    dp.include_router(user_handlers.router)
+    dp["notifier"] = notifier
+
+    results = {}
+    for wave in ("in", "out"):
+        updates = []
+        for i in range(args.workers):
+            token = get_daily_token(wave)
+            updates.append(start_update(FIRST_TELEGRAM_ID + i, token))
+            if random.random() < args.replay:
+                updates.append(start_update(FIRST_TELEGRAM_ID + i, token))  # Takroriy (yondirilgan) token
+        random.shuffle(updates)
+        lock.waits.clear()
+        latencies, errors, wall = await drive(dp, bot, updates, args.concurrency, args.duration)
+        results[wave] = {"updates": len(updates), "errors": errors, "wall_s": wall,
+                         "throughput_per_s": len(updates) / wall, "handler": percentiles(latencies),
+                         "write_lock_wait": percentiles(lock.waits)}
+
+    drain_started = time.perf_counter()
+    await notifier.stop(timeout=args.notify_drain)
+    results["notifications"] = {**notifier.stats(), "drain_s": time.perf_counter() - drain_started}
+    results["api_requests"] = session.requests
+    return results
+
+
+async def scenario_mark(args):
+    lock = TimedLock()
+    database.get_manager()._write_lock = lock
+    async with database.get_manager().transaction() as db:
+        for table in ("attendance", "daily_payroll", "monthly_payroll"):
+            await db.execute(f"DELETE FROM {table}")
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def one(telegram_id, action):
+        async with semaphore:
+            t0 = time.perf_counter()
+            await database.mark_attendance(telegram_id, action)
+            latencies.append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    for action in ("in", "out"):
+        await asyncio.gather(*(one(FIRST_TELEGRAM_ID + i, action) for i in range(args.workers)))
+    wall = time.perf_counter() - started
+    return {"calls": len(latencies), "wall_s": wall, "throughput_per_s": len(latencies) / wall,
+            "latency": percentiles(latencies), "write_lock_wait": percentiles(lock.waits)}
+
+
+def build_attendance(path, rows, workers=500):
+    """rows ta davomat qatori (oxirgi kunlar, har kuni workers ta ishchi) bilan baza fayli."""
+    conn = sqlite3.connect(path)
+    today = payroll.date_to_day(datetime.date.today())
+    days = -(-rows // workers)
+
+    def gen():
+        produced = 0
+        for back in range(days):
+            for uid in range(1, workers + 1):
+                if produced == rows:
+                    return
+                produced += 1
+                yield uid, today - back, 30000 + uid * 7 % 3600, 64000 + uid * 11 % 3600
+
+    conn.executemany("INSERT INTO attendance (user_id, day, check_in, check_out) VALUES (?, ?, ?, ?)", gen())
+    conn.commit()
+    conn.close()
+
+
+async def scenario_excel(args, tmp):
+    results = {}
+    for rows in args.excel_rows:
+        path = os.path.join(tmp, f"excel_{rows}.db")
+        await database.init_db(path)
+        try:
+            await database.create_tables()
+            await seed_workers(min(500, args.workers))
+            build_attendance(path, rows, min(500, args.workers))
+            t0 = time.perf_counter()
+            filename = await export_attendance_report(database.iter_attendance_data())
+            elapsed = time.perf_counter() - t0
+            results[str(rows)] = {"seconds": elapsed, "rows_per_s": rows / elapsed,
+                                  "file_mb": os.path.getsize(filename) / 1e6}
+            os.remove(filename)
+            print(f"  excel {rows:>9} qator: {elapsed:7.2f}s  {rows / elapsed:9.0f} qator/s")
+        finally:
+            await database.close_db()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _flatten(prefix, value, out):
+    if isinstance(value, dict):
+        for key, inner in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else key, inner, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = value
+    return out
+
+
+def compare(old, new):
+    """Ikki natija faylidagi kechikish/o'tkazuvchanlik ko'rsatkichlarini yonma-yon chiqaradi."""
+    old_flat, new_flat = _flatten("", old["results"], {}), _flatten("", new["results"], {})
+    print(f"\n{'ko`rsatkich':<48} {old.get('revision') or '?':>12} {new.get('revision') or '?':>12}  farq")
+    for key in sorted(old_flat.keys() & new_flat.keys()):
+        if not key.endswith(("_ms", "_per_s", "seconds", "wall_s")):
+            continue
+        before, after = old_flat[key], new_flat[key]
+        change = f"{(after - before) / before * 100:+.1f}%" if before else ""
+        print(f"{key:<48} {before:12.2f} {after:12.2f}  {change}")
+
+
+async def run(args, tmp):
+    results = {}
+    if {"scan", "mark"} & set(args.scenarios):
+        await database.init_db(os.path.join(tmp, "attendance.db"))
+        try:
+            await database.create_tables()
+            await seed_workers(args.workers)
+            coalescer = database.write_coalescer
+            if args.write_batch > 0:
+                coalescer.max_batch = args.write_batch
+                coalescer.max_delay = args.write_delay / 1000
+                coalescer.start()
+            if "scan" in args.scenarios:
+                results["scan"] = await scenario_scan(args)
+            if "mark" in args.scenarios:
+                results["mark"] = await scenario_mark(args)
+            if coalescer.batches:
+                results["write_batches"] = {"batches": coalescer.batches, "operations": coalescer.operations,
+                                            "avg_size": coalescer.operations / coalescer.batches}
+        finally:
+            await database.write_coalescer.stop()
+            await database.close_db()
+    if "excel" in args.scenarios:
+        results["excel"] = await scenario_excel(args, tmp)
+    return results
+
+
+def print_results(results):
+    for wave in ("in", "out"):
+        data = results.get("scan", {}).get(wave)
+        if data:
+            h, w = data["handler"], data["write_lock_wait"]
+            print(f"scan/{wave:<3} {data['updates']:>6} update  {data['throughput_per_s']:8.1f}/s  "
+                  f"p50={h['p50_ms']:7.2f}ms p95={h['p95_ms']:7.2f}ms p99={h['p99_ms']:7.2f}ms  "
+                  f"qulf kutish p95={w.get('p95_ms', 0):7.2f}ms  xato={data['errors']}")
+    if "scan" in results:
+        n = results["scan"]["notifications"]
+        print(f"xabarnomalar: yetkazildi={n['delivered']} xato={n['failed']} navbatda={n['queue_depth']} "
+              f"p50={n['p50_ms']:.1f}ms p99={n['p99_ms']:.1f}ms")
+    if "write_batches" in results:
+        b = results["write_batches"]
+        print(f"guruhli commit: {b['batches']} partiya, {b['operations']} amal, o'rtacha {b['avg_size']:.1f}")
+    if "mark" in results:
+        m = results["mark"]
+        print(f"mark_attendance {m['calls']:>6} chaqiruv {m['throughput_per_s']:8.1f}/s  "
+              f"p50={m['latency']['p50_ms']:7.2f}ms p99={m['latency']['p99_ms']:7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="scan,mark", help="scan,mark,excel dan vergul bilan")
+    parser.add_argument("--workers", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=0.0, help="Kelishlarni shu soniyaga yoyish (0 = darhol)")
+    parser.add_argument("--replay", type=float, default=0.05, help="Takroriy token yuboriladigan ishchilar ulushi")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="Soxta Telegram API kechikishi (ms)")
+    parser.add_argument("--notify-rate", type=float, default=1000.0,
+                        help="Xabarnomalar umumiy tezligi (xabar/s). Haqiqiy Telegram chegarasi uchun 25")
+    parser.add_argument("--notify-interval", type=float, default=0.0,
+                        help="Bitta admin chatiga xabarlar oralig'i (s). Haqiqiy Telegram chegarasi uchun 1.0")
+    parser.add_argument("--notify-drain", type=float, default=60.0, help="Xabarnomalarni kutish chegarasi (s)")
+    parser.add_argument("--write-batch", type=int, default=WRITE_BATCH_SIZE,
+                        help="Guruhli commit partiyasi hajmi (0 = o'chiq, har bir skan alohida commit)")
+    parser.add_argument("--write-delay", type=float, default=WRITE_BATCH_DELAY * 1000,
+                        help="Partiyaga qo'shimcha amallarni kutish (ms)")
+    parser.add_argument("--excel-rows", default="10000", help="Masalan 10000,100000,1000000")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Natijalarni shu faylga yozish")
+    parser.add_argument("--compare", help="Avvalgi --json natijasi bilan solishtirish")
+    args = parser.parse_args()
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    args.excel_rows = [int(n) for n in args.excel_rows.split(",") if n.strip()]
+    random.seed(args.seed)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Hisobot fayllari va arxiv papkasi vaqtinchalik papkada yaratilsin
+        os.chdir(tmp)
+        try:
+            results = asyncio.run(run(args, tmp))
+        finally:
+            os.chdir(cwd)
+
+    print_results(results)
+    report = {"revision": git_revision(), "created": datetime.datetime.now().isoformat(timespec="seconds"),
+              "python": sys.version.split()[0], "params": {k: v for k, v in vars(args).items()
+                                                            if k not in ("json", "compare")},
+              "results": results}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
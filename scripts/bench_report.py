@@ -0,0 +1,165 @@
+"""Katta hisobot: bitta varaqli openpyxl hisobot va bo'laklangan (process pool) hisobot solishtirmasi.
+
+Vaqtinchalik papkada --rows ta davomat qatori bo'lgan baza yaratiladi (--workers ta
+ishchi, har kuni hammasi keladi, shuning uchun davr bir necha yilga cho'ziladi) va
+butun davr uchun hisobot yig'iladi:
+    baseline        — export_attendance_report (openpyxl write-only, bitta varaq, bitta yadro)
+    month/worker    — export_partitioned_report, oy yoki ishchi bo'yicha varaqlar,
+                      --processes dagi har bir jarayonlar soni uchun (0 = CPU yadrolari soni)
+
+Natijalar: vaqt, qator/s, 1 jarayonga nisbatan tezlanish va fayl hajmi. Tezlanish
+faqat bir nechta yadroli mashinada ko'rinadi (os.cpu_count() natijada yoziladi).
+report_pool har bir jarayonlar soni uchun bir marta ochiladi (botdagi kabi); uning
+ishga tushish vaqti alohida ko'rsatiladi va hisobot vaqtiga kirmaydi.
+--min-speedup berilsa, ko'p yadroli mashinada eng yaxshi tezlanish undan kichik bo'lsa
+kod 1 bilan tugaydi (bitta yadroda tekshiruv o'tkazib yuboriladi va kod 2 qaytadi).
+
+Ishga tushirish (repo ildizidan):
+    python -m scripts.bench_report --rows 1000000 --json report.json
+    python -m scripts.bench_report --rows 200000 --splits worker --processes 1,2,4,8 --no-baseline
+    python -m scripts.bench_report --compare old.json --json new.json
+    python -m scripts.bench_report --rows 1000000 --processes 1,4 --no-baseline --min-speedup 1.5
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+
+import database
+from config import REPORT_PROCESSES_MAX
+from reports import export_attendance_report, export_partitioned_report, report_pool
+from scripts.bench_morning_rush import build_attendance, compare, git_revision, seed_workers
+
+
+def _measure(label, rows, elapsed, filename):
+    result = {"seconds": elapsed, "rows_per_s": rows / elapsed, "file_mb": os.path.getsize(filename) / 1e6}
+    os.remove(filename)
+    print(f"  {label:<22} {elapsed:8.2f}s  {rows / elapsed:10.0f} qator/s  {result['file_mb']:7.1f} MB")
+    return result
+
+
+async def run(args, tmp):
+    path = os.path.join(tmp, "attendance.db")
+    await database.init_db(path)
+    try:
+        await database.create_tables()
+        await seed_workers(args.workers)
+        t0 = time.perf_counter()
+        build_attendance(path, args.rows, args.workers)
+        print(f"baza: {args.rows} qator, {args.workers} ishchi ({time.perf_counter() - t0:.1f}s)")
+
+        date_to = datetime.date.today()
+        date_from = date_to - datetime.timedelta(days=-(-args.rows // args.workers))
+        date_from, date_to = date_from.isoformat(), date_to.isoformat()
+        results = {}
+
+        if args.baseline:
+            t0 = time.perf_counter()
+            filename = await export_attendance_report(database.iter_attendance_data(date_from, date_to),
+                                                      date_from, date_to)
+            results["baseline"] = _measure("baseline (openpyxl)", args.rows, time.perf_counter() - t0, filename)
+
+        for split in args.splits:
+            t0 = time.perf_counter()
+            partitions = await database.plan_report_partitions(date_from, date_to, split)
+            split_results = {"partitions": len(partitions), "plan_seconds": time.perf_counter() - t0}
+            for processes in args.processes:
+                t0 = time.perf_counter()
+                await asyncio.to_thread(report_pool.start, processes)
+                pool_seconds = time.perf_counter() - t0
+                try:
+                    t0 = time.perf_counter()
+                    filename = await export_partitioned_report(partitions, path, date_from, date_to)
+                    elapsed = time.perf_counter() - t0
+                finally:
+                    await asyncio.to_thread(report_pool.stop)
+                label = f"{split} x{len(partitions)} p={processes or report_pool_size()}"
+                measured = split_results[f"p{processes}"] = _measure(label, args.rows, elapsed, filename)
+                measured["pool_start_seconds"] = pool_seconds
+
+            single = split_results.get("p1")
+            if single:
+                for processes in args.processes:
+                    measured = split_results[f"p{processes}"]
+                    measured["speedup"] = single["seconds"] / measured["seconds"]
+            results[split] = split_results
+        return results
+    finally:
+        await database.close_db()
+
+
+def report_pool_size():
+    """processes=0 da report_pool ochadigan jarayonlar soni."""
+    return min(REPORT_PROCESSES_MAX, os.cpu_count() or 1)
+
+
+def best_speedup(results):
+    speedups = [value["speedup"] for split, data in results.items() if split != "baseline"
+                for key, value in data.items() if isinstance(value, dict) and key != "p1" and "speedup" in value]
+    return max(speedups, default=None)
+
+
+def print_speedups(results):
+    for split, data in results.items():
+        if split == "baseline":
+            continue
+        speedups = [f"p={key[1:]}: x{value['speedup']:.2f}" for key, value in data.items()
+                    if isinstance(value, dict) and "speedup" in value]
+        if speedups:
+            print(f"{split}: {', '.join(speedups)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=500)
+    parser.add_argument("--splits", default="month,worker", help="month,worker dan vergul bilan")
+    parser.add_argument("--processes", default="1,2,4,0", help="Jarayonlar soni ro'yxati (0 = CPU yadrolari soni)")
+    parser.add_argument("--no-baseline", dest="baseline", action="store_false",
+                        help="Bitta varaqli openpyxl hisobotni o'lchamaslik")
+    parser.add_argument("--json", help="Natijalarni shu faylga yozish")
+    parser.add_argument("--compare", help="Avvalgi --json natijasi bilan solishtirish")
+    parser.add_argument("--min-speedup", type=float,
+                        help="1 jarayonga nisbatan kutilgan eng kichik tezlanish (ko'p yadroli mashinada)")
+    args = parser.parse_args()
+    args.splits = [s.strip() for s in args.splits.split(",") if s.strip()]
+    args.processes = [int(n) for n in args.processes.split(",") if n.strip()]
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Hisobot fayllari vaqtinchalik papkada yaratilsin
+        os.chdir(tmp)
+        try:
+            results = asyncio.run(run(args, tmp))
+        finally:
+            os.chdir(cwd)
+
+    print_speedups(results)
+    report = {"revision": git_revision(), "created": datetime.datetime.now().isoformat(timespec="seconds"),
+              "python": sys.version.split()[0], "cpu_count": os.cpu_count(),
+              "params": {k: v for k, v in vars(args).items() if k not in ("json", "compare")},
+              "results": results}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+    if args.min_speedup:
+        best = best_speedup(results)
+        if (os.cpu_count() or 1) < 2:
+            print("⚠️ Bitta CPU yadrosi: jarayonlar bo'yicha tezlanishni bu mashinada o'lchab bo'lmaydi")
+            sys.exit(2)
+        if best is None or best < args.min_speedup:
+            print(f"❌ Eng yaxshi tezlanish {best if best is None else round(best, 2)}, kutilgan >= {args.min_speedup}")
+            sys.exit(1)
+        print(f"✅ Tezlanish x{best:.2f} >= x{args.min_speedup}")
+
+
+if __name__ == "__main__":
+    main()
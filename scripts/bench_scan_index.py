@@ -0,0 +1,136 @@
+"""Skan yo'lidagi davomat so'rovining kechikishi: migratsiyadan oldin va keyin.
+
+Eski sxemada (indekssiz) ~1M qatorli vaqtinchalik baza yaratiladi, skan paytida
+bajariladigan (user_id, date) qidiruvi o'lchanadi, so'ng create_tables()
+migratsiyalari o'sha fayl ustida bajariladi va o'lchov takrorlanadi.
+
+Ishga tushirish (repo ildizidan):
+    python -m scripts.bench_scan_index --rows 1000000 --lookups 2000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+import database
+import payroll
+
+LEGACY_SCHEMA = [
+    """CREATE TABLE users (user_id INTEGER PRIMARY KEY, full_name TEXT,
+       telegram_id INTEGER UNIQUE, role TEXT DEFAULT 'worker')""",
+    """CREATE TABLE attendance (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER,
+       full_name TEXT, date TEXT, check_in TEXT, check_out TEXT,
+       FOREIGN KEY(user_id) REFERENCES users(user_id))""",
+    """CREATE TABLE qr_history (token TEXT PRIMARY KEY, action_type TEXT, date TEXT,
+       used_by_id INTEGER, used_by_name TEXT, timestamp TEXT)""",
+]
+
+# Skan paytidagi (user_id, kun) qidiruvi: eski sxemada sana TEXT, ixcham sxemada kun raqami
+LEGACY_LOOKUP_SQL = "SELECT id, check_in, check_out FROM attendance WHERE user_id = ? AND date = ?"
+LOOKUP_SQL = "SELECT id, check_in, check_out FROM attendance WHERE user_id = ? AND day = ?"
+
+
+def build_legacy_db(path, rows, workers):
+    days = max(1, rows // workers)
+    start = date.today() - timedelta(days=days)
+    conn = sqlite3.connect(path)
+    for sql in LEGACY_SCHEMA:
+        conn.execute(sql)
+    conn.executemany("INSERT INTO users (user_id, full_name, telegram_id) VALUES (?, ?, ?)",
+                     ((i, f"Ishchi {i:05d}", 100000 + i) for i in range(1, workers + 1)))
+
+    def gen():
+        for d in range(days):
+            day = (start + timedelta(days=d)).isoformat()
+            for uid in range(1, workers + 1):
+                yield uid, f"Ishchi {uid:05d}", day, "08:5%d:00" % (uid % 10), "18:0%d:00" % (uid % 10)
+
+    conn.executemany("INSERT INTO attendance (user_id, full_name, date, check_in, check_out) "
+                     "VALUES (?, ?, ?, ?, ?)", gen())
+    conn.commit()
+    conn.close()
+    return days * workers, start, days
+
+
+def measure_lookups(path, lookups, workers, start, days, legacy):
+    sql = LEGACY_LOOKUP_SQL if legacy else LOOKUP_SQL
+    conn = sqlite3.connect(path)
+    samples = []
+    for _ in range(lookups):
+        uid = random.randint(1, workers)
+        day = start + timedelta(days=random.randrange(days))
+        key = day.isoformat() if legacy else payroll.date_to_day(day)
+        t0 = time.perf_counter()
+        conn.execute(sql, (uid, key)).fetchone()
+        samples.append((time.perf_counter() - t0) * 1000)
+    plan = conn.execute("EXPLAIN QUERY PLAN " + sql, (1, 1)).fetchall()
+    conn.close()
+    return samples, plan[-1][-1]
+
+
+async def measure_record_scan(path, scans, workers):
+    await database.init_db(path)
+    try:
+        samples = []
+        for i in range(scans):
+            t0 = time.perf_counter()
+            await database.record_scan(f"bench_{i}", 100000 + (i % workers) + 1, "in" if i < workers else "out")
+            samples.append((time.perf_counter() - t0) * 1000)
+        return samples
+    finally:
+        await database.close_db()
+
+
+async def migrate(path):
+    await database.init_db(path)
+    try:
+        t0 = time.perf_counter()
+        await database.create_tables()
+        return time.perf_counter() - t0
+    finally:
+        await database.close_db()
+
+
+def summary(label, samples):
+    samples = sorted(samples)
+    p = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+    print(f"{label:<28} p50={p(0.50):8.3f}ms  p95={p(0.95):8.3f}ms  p99={p(0.99):8.3f}ms  "
+          f"mean={statistics.fmean(samples):8.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=2000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench_attendance.db")
+        t0 = time.perf_counter()
+        total, start, days = build_legacy_db(path, args.rows, args.workers)
+        print(f"{total} ta davomat qatori yaratildi ({time.perf_counter() - t0:.1f}s), "
+              f"fayl hajmi: {os.path.getsize(path) / 1e6:.1f} MB")
+
+        # Indekssiz sxemada to'liq skan juda sekin, shuning uchun kamroq namuna olinadi
+        before, plan = measure_lookups(path, max(20, args.lookups // 50), args.workers, start, days, legacy=True)
+        summary("oldin (indekssiz)", before)
+        print(f"  reja: {plan}")
+
+        elapsed = asyncio.run(migrate(path))
+        print(f"migratsiya: {elapsed:.1f}s, fayl hajmi: {os.path.getsize(path) / 1e6:.1f} MB")
+
+        after, plan = measure_lookups(path, args.lookups, args.workers, start, days, legacy=False)
+        summary("keyin (indeks bilan)", after)
+        print(f"  reja: {plan}")
+
+        summary("record_scan (butun yo'l)", asyncio.run(measure_record_scan(path, args.lookups, args.workers)))
+
+
+if __name__ == "__main__":
+    main()
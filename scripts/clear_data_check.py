@@ -0,0 +1,100 @@
+"""database.clear_all_attendance_data arxivlangan oylarni buzmasligini tekshiradi.
+
+Vaqtinchalik bazaga ishchilar va uch oylik davomat yoziladi, eng eski oy arxivga
+ko'chiriladi, so'ng baza tozalanadi. Kutilgan natija:
+    - asosiy bazadagi davomat, daily_payroll va joriy oylar maoshi o'chgan;
+    - arxivlangan oy hisobotda ham, /maosh (get_monthly_payroll) da ham avvalgidek.
+
+Ishga tushirish (repo ildizidan):
+    python -m scripts.clear_data_check
+Farq topilsa, kod 1 bilan tugaydi.
+"""
+import asyncio
+import datetime
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+import database
+import payroll
+
+
+def build_database(path, workers=5):
+    """Uch oylik davomat; oylar ro'yxatini ('YYYY-MM', o'sish tartibida) qaytaradi."""
+    today = payroll.date_to_day(datetime.date.today())
+    first = payroll.month_day_range(payroll.day_month(today - 62))[0]
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO users (full_name, telegram_id) VALUES (?, ?)",
+                     ((f"Ishchi {n}", 700_000_000 + n) for n in range(workers)))
+    conn.executemany("INSERT INTO attendance (user_id, day, check_in, check_out) VALUES (?, ?, ?, ?)",
+                     ((user_id, day, 9 * 3600, 18 * 3600)
+                      for user_id in range(1, workers + 1) for day in range(first, today + 1)))
+    conn.commit()
+    conn.close()
+    return sorted({payroll.day_month(day) for day in range(first, today + 1)})
+
+
+async def report_months():
+    months = set()
+    async for chunk in database.iter_attendance_data():
+        months.update(payroll.day_month(row[1]) for row in chunk)
+    return months
+
+
+async def run(tmp):
+    path = os.path.join(tmp, "attendance.db")
+    await database.init_db(path)
+    try:
+        await database.create_tables()
+        months = build_database(path)
+        await database.rebuild_payroll()
+        archived = months[0]
+        if not await database.archive_month(archived):
+            return [f"{archived} arxivlanmadi"]
+        before = await database.get_monthly_payroll(archived)
+
+        await database.clear_all_attendance_data()
+
+        errors = []
+        if await database.get_monthly_payroll(archived) != before or not before:
+            errors.append(f"{archived}: /maosh arxivlangan oy uchun o'zgardi yoki bo'sh")
+        for month in months[1:]:
+            if await database.get_monthly_payroll(month):
+                errors.append(f"{month}: tozalangandan keyin maosh qolgan")
+        if await report_months() != {archived}:
+            errors.append(f"hisobotdagi oylar {sorted(await report_months())}, kutilgan [{archived!r}]")
+        async with database.get_manager().reader() as db:
+            for table in ("attendance", "daily_payroll", "qr_history"):
+                async with db.execute(f"SELECT COUNT(*) FROM {table}") as cursor:
+                    (count,) = await cursor.fetchone()
+                if count:
+                    errors.append(f"{table}: tozalangandan keyin {count} qator qolgan")
+        print(f"oylar: {', '.join(months)}; arxiv: {archived}")
+        return errors
+    finally:
+        await database.close_db()
+
+
+def main():
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp(prefix="clear_data_check_")
+    try:
+        # Arxiv papkasi (ARCHIVE_DIR) vaqtinchalik papkada yaratilsin
+        os.chdir(tmp)
+        errors = asyncio.run(run(tmp))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if errors:
+        print(f"❌ {len(errors)} ta xato:")
+        for error in errors:
+            print(f"  {error}")
+        sys.exit(1)
+    print("✅ Tozalashdan keyin arxivlangan oylar hisobot va /maosh da saqlandi")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Vektorlashgan maosh hisobi (payroll.compute_rows) va qatorma-qator funksiyalar
+(utils.calculate_work_duration / calculate_salary_per_day) natijalarining
+aynan bir xilligini katta tasodifiy korpusda tekshiradi va tezlikni solishtiradi.
+
+Ishga tushirish (repo ildizidan):
+    python -m scripts.payroll_equivalence --rows 500000 --seed 1
+Farq topilsa, birinchi nomuvofiq qatorlar chiqariladi va kod 1 bilan tugaydi.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import payroll
+from config import LATE_TIME_LIMIT, LUNCH_START, LUNCH_END
+from utils import calculate_work_duration, calculate_salary_per_day, is_sunday
+
+# Chegaraviy vaqtlar: kechikish chegarasi, tushlik chetlari, yarim tun atrofi
+EDGE_TIMES = [LATE_TIME_LIMIT, LUNCH_START, LUNCH_END, "00:00:00", "23:59:59", "08:59:59", "09:00:01",
+              "12:59:59", "13:00:01", "13:30:00", "13:59:59", "14:00:01", "18:00:00", "22:00:00", "9:5:3"]
+
+
+def _random_time(rng):
+    if rng.random() < 0.2:
+        return rng.choice(EDGE_TIMES)
+    return f"{rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}"
+
+
+def build_corpus(rows, seed):
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    corpus = []
+    for _ in range(rows):
+        roll = rng.random()
+        date_str = (start + timedelta(days=rng.randrange(1200))).isoformat()
+        if roll < 0.01:
+            date_str = rng.choice(["", "2026-02-30", "noto'g'ri"])
+        check_in = None if roll < 0.05 else _random_time(rng)
+        check_out = None if 0.05 <= roll < 0.15 else _random_time(rng)
+        corpus.append((date_str, check_in, check_out))
+    return corpus
+
+
+def per_row(corpus):
+    results = []
+    for date_str, check_in, check_out in corpus:
+        _, is_late, worked = calculate_work_duration(check_in, check_out, date_str)
+        salary, per_minute = calculate_salary_per_day(date_str, worked)
+        results.append((worked, is_late, is_sunday(date_str), salary, per_minute))
+    return results
+
+
+def batched(corpus):
+    dates, check_ins, check_outs = zip(*corpus)
+    batch = payroll.compute_rows(check_ins, check_outs, dates)
+    return list(zip(batch.worked_seconds.tolist(), batch.is_late.tolist(), batch.is_sunday.tolist(),
+                    batch.salary_per_day.tolist(), batch.salary_per_minute.tolist()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.rows, args.seed)
+
+    t0 = time.perf_counter()
+    expected = per_row(corpus)
+    t1 = time.perf_counter()
+    actual = batched(corpus)
+    t2 = time.perf_counter()
+
+    mismatches = [(row, e, a) for row, e, a in zip(corpus, expected, actual) if e != a]
+    print(f"qatorlar: {len(corpus)}  qatorma-qator: {t1 - t0:.2f}s  batch: {t2 - t1:.2f}s  "
+          f"tezlanish: x{(t1 - t0) / max(t2 - t1, 1e-9):.1f}")
+
+    if mismatches:
+        print(f"❌ {len(mismatches)} ta nomuvofiqlik:")
+        for row, e, a in mismatches[:20]:
+            print(f"  {row}: qatorma-qator={e} batch={a}")
+        sys.exit(1)
+    print("✅ Natijalar aynan bir xil")
+
+
+if __name__ == "__main__":
+    main()
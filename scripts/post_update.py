@@ -0,0 +1,98 @@
+"""Webhook rejimini lokal tekshirish: yozib olingan Update JSON larni serverga POST qiladi.
+
+Bot BOT_MODE=webhook bilan ishga tushirilgan bo'lishi kerak (WEBHOOK_BASE_URL
+bo'sh qoldirilsa setWebhook chaqirilmaydi va faqat lokal server ko'tariladi).
+Server WEBHOOK_SECRET siz ishga tushmaydi; skript ham shu kalitni yuboradi
+(--secret bilan boshqasini berish mumkin, noto'g'ri kalitga server 401 qaytaradi).
+
+    python -m scripts.post_update updates/*.json
+    python -m scripts.post_update --user-id 123 --text "/start in_..." --repeat 50 --concurrency 10
+
+Fayl bitta Update obyekti yoki ularning ro'yxati bo'lishi mumkin. Fayl
+berilmasa, --user-id va --text dan oddiy xabar updatesi yasaladi.
+Har bir so'rov uchun HTTP status va javob vaqti chiqariladi, oxirida p50/p95.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+
+import aiohttp
+
+from config import WEBHOOK_PATH, WEBHOOK_PORT, WEBHOOK_SECRET
+
+_update_ids = itertools.count(int(time.time()))
+
+
+def make_message_update(user_id, text):
+    now = int(time.time())
+    return {
+        "update_id": next(_update_ids),
+        "message": {
+            "message_id": next(_update_ids),
+            "date": now,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Test"},
+            "text": text,
+        },
+    }
+
+
+def load_updates(paths):
+    updates = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        updates.extend(data if isinstance(data, list) else [data])
+    return updates
+
+
+async def post_all(url, secret, updates, concurrency):
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret}
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+
+    async def post(session, update):
+        async with semaphore:
+            started = time.perf_counter()
+            async with session.post(url, json=update, headers=headers) as response:
+                await response.read()
+                elapsed = time.perf_counter() - started
+            timings.append(elapsed)
+            print(f"update {update.get('update_id')}: HTTP {response.status}  {elapsed * 1000:.1f} ms")
+
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(post(session, update) for update in updates))
+    return sorted(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="Update JSON fayllari")
+    parser.add_argument("--url", default=f"http://127.0.0.1:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    parser.add_argument("--secret", default=WEBHOOK_SECRET)
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--text", default="/start")
+    parser.add_argument("--repeat", type=int, default=1, help="Har bir updateni necha marta yuborish")
+    parser.add_argument("--concurrency", type=int, default=1)
+    args = parser.parse_args()
+    if not args.secret:
+        parser.error("WEBHOOK_SECRET o'rnatilmagan: server kalitsiz so'rovlarni qabul qilmaydi (--secret bering)")
+
+    updates = load_updates(args.files) if args.files else [make_message_update(args.user_id, args.text)]
+    batch = []
+    for _ in range(args.repeat):
+        for update in updates:
+            # Har bir nusxaga yangi update_id (Telegram ham har doim yangisini beradi)
+            batch.append({**update, "update_id": next(_update_ids)})
+
+    timings = asyncio.run(post_all(args.url, args.secret, batch, args.concurrency))
+    if timings:
+        p50 = timings[len(timings) // 2] * 1000
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000
+        print(f"\nso'rovlar: {len(timings)}  p50: {p50:.1f} ms  p95: {p95:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""daily_payroll / monthly_payroll jadvallarini davomatdan qaytadan hisoblaydi.
+
+HOURLY_RATE, LATE_TIME_LIMIT yoki tushlik vaqti o'zgartirilgandan keyin, yoki
+tarixiy ma'lumot qo'lda yuklanganda (backfill) ishlatiladi. Bot ishlab turgan
+paytda ham xavfsiz: har bir oy alohida qisqa tranzaksiyada yoziladi.
+
+Ishga tushirish (repo ildizidan):
+    python -m scripts.rebuild_payroll              # barcha oylar
+    python -m scripts.rebuild_payroll 2026-09 2026-10
+"""
+import argparse
+import asyncio
+
+import database
+from config import DB_NAME
+
+
+async def run(db_path, months):
+    await database.init_db(db_path)
+    try:
+        await database.create_tables()
+        return await database.rebuild_payroll(months or None)
+    finally:
+        await database.close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("months", nargs="*", help="YYYY-MM (berilmasa barcha oylar)")
+    parser.add_argument("--db", default=DB_NAME)
+    args = parser.parse_args()
+
+    rows = asyncio.run(run(args.db, args.months))
+    print(f"✅ {rows} ta davomat yozuvi qayta hisoblandi")
+
+
+if __name__ == "__main__":
+    main()
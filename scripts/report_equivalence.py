@@ -0,0 +1,226 @@
+"""Bo'laklangan hisobot (reports.write_partitioned_report, qo'lda yozilgan XLSX/ZIP) va
+openpyxl dagi bitta varaqli hisobot (reports._write_report) natijalarining bir xilligini tekshiradi.
+
+Vaqtinchalik bazaga chegaraviy ismli ishchilar (&, <, qo'shtirnoq, chetidagi bo'shliq,
+kirill, emoji, varaq nomida taqiqlangan belgilar) va tasodifiy davomat (Keldi/Ketdi yo'q
+kunlar, yakshanbalar, arxivlangan oylar) yoziladi. So'ng oy va ishchi bo'yicha, .xlsx va
+.zip ko'rinishlarida hisobot yig'iladi va quyidagilar solishtiriladi:
+    - zip butunligi (CRC, testzip) — tashqi arxiv va ichidagi har bir .xlsx;
+    - batafsil qatorlar: qiymat, qalin shrift, rang, chegara — openpyxl hisobotidagi bilan;
+    - "Maosh" varag'i: maosh openpyxl hisobotidagi "Jami Maosh" bilan, kunlar/soat/kechikishlar
+      batafsil qatorlardan qayta hisoblangani bilan;
+    - .zip ichidagi kitoblar .xlsx dagi mos varaqlar bilan.
+
+Ishga tushirish (repo ildizidan):
+    python -m scripts.report_equivalence --workers 40 --days 150 --processes 2 --seed 1
+Farq topilsa, birinchi nomuvofiqliklar chiqariladi va kod 1 bilan tugaydi.
+"""
+import argparse
+import asyncio
+import datetime
+import io
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import zipfile
+from collections import Counter
+
+from openpyxl import load_workbook
+
+import database
+import payroll
+import reports
+
+EDGE_NAMES = ["Ali & Vali", "<b>Qalin</b> ism", "  Bo'shliq bilan  ", "O'g'iloy \"Qo'shtirnoq\"",
+              "Юлдуз Ҳасанова", "Emoji 🙂 ishchi", "A/B: [test]*?", "A_B_ _test__", "Uzun " + "ism " * 20]
+
+
+def build_database(path, workers, days, seed):
+    """Ishchilar va tasodifiy davomat; (birinchi kun, oxirgi kun) 'YYYY-MM-DD' qaytaradi."""
+    rng = random.Random(seed)
+    names = EDGE_NAMES + [f"Ishchi {i:04d}" for i in range(max(0, workers - len(EDGE_NAMES)))]
+    today = payroll.date_to_day(datetime.date.today())
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO users (full_name, telegram_id) VALUES (?, ?)",
+                     ((name, 700_000_000 + n) for n, name in enumerate(names)))
+    rows = []
+    for user_id in range(1, len(names) + 1):
+        for back in range(days):
+            if rng.random() < 0.15:
+                continue  # kelmagan kun
+            roll = rng.random()
+            check_in = None if roll < 0.05 else rng.randrange(6 * 3600, 12 * 3600)
+            check_out = None if 0.05 <= roll < 0.15 else rng.randrange(13 * 3600, 23 * 3600)
+            rows.append((user_id, today - back, check_in, check_out))
+    conn.executemany("INSERT INTO attendance (user_id, day, check_in, check_out) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return payroll.day_to_date(today - days + 1).isoformat(), payroll.day_to_date(today).isoformat()
+
+
+def _cell(cell):
+    """Katakni solishtirish uchun: (qiymat, qalin, rang, chegara). ARGB dagi alfa e'tiborga olinmaydi."""
+    font = getattr(cell, "font", None)
+    side = getattr(getattr(cell, "border", None), "left", None)
+    color = font.color.rgb[-6:] if font is not None and font.color is not None and font.color.type == "rgb" else None
+    return cell.value, bool(font is not None and font.b), color, side.style if side is not None else None
+
+
+def _rows(ws):
+    return [tuple(_cell(cell) for cell in row if cell.value is not None) for row in ws.iter_rows()]
+
+
+def read_baseline(filename):
+    """openpyxl hisobotidan: (sarlavha, batafsil qatorlar, {ism: 'Jami Maosh: ...'})."""
+    rows = _rows(load_workbook(filename, read_only=True).active)
+    end = next(n for n, row in enumerate(rows) if row and str(row[0][0]).startswith("UMUMIY"))
+    salaries = {row[0][0]: row[1][0] for row in rows[end + 1:] if row}
+    return rows[0], [row for row in rows[1:end] if row], salaries
+
+
+def read_workbook(source):
+    """{varaq nomi: qatorlar} — fayl yo'li yoki baytlar."""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    book = load_workbook(source, read_only=True)
+    return {ws.title: _rows(ws) for ws in book.worksheets}
+
+
+def check_zip(source, label, errors):
+    """{a'zo nomi: baytlar} yoki arxiv buzuq bo'lsa None."""
+    try:
+        with zipfile.ZipFile(io.BytesIO(source) if isinstance(source, bytes) else source) as archive:
+            bad = archive.testzip()
+            if bad is None:
+                return {info.filename: archive.read(info) for info in archive.infolist()}
+            errors.append(f"{label}: {bad} a'zosining CRC si noto'g'ri")
+    except zipfile.BadZipFile as e:
+        errors.append(f"{label}: zip o'qilmadi: {e}")
+    return None
+
+
+def compare_partitioned(label, sheets, header, detail, salaries, errors):
+    titles = list(sheets)
+    if titles[0] != reports.SUMMARY_SHEET:
+        errors.append(f"{label}: birinchi varaq {titles[0]!r}, kutilgan {reports.SUMMARY_SHEET!r}")
+    if len({title.lower() for title in titles}) != len(titles):
+        errors.append(f"{label}: varaq nomlari takrorlanadi: {titles}")
+
+    actual = []
+    for title in titles[1:]:
+        rows = sheets[title]
+        if rows[0] != header:
+            errors.append(f"{label}/{title}: sarlavha {rows[0]} != {header}")
+        actual.extend(row for row in rows[1:] if row)
+    missing, extra = Counter(detail) - Counter(actual), Counter(actual) - Counter(detail)
+    for row in list(missing)[:5]:
+        errors.append(f"{label}: openpyxl hisobotidagi qator yo'q: {row}")
+    for row in list(extra)[:5]:
+        errors.append(f"{label}: ortiqcha qator: {row}")
+
+    # Maosh varag'i batafsil qatorlardan qayta hisoblanadi
+    expected = {}
+    for row in detail:
+        name, hours, late = row[0][0], float(row[4][0]), row[5][0] == "✅ Ha"
+        days_worked, worked, late_days = expected.get(name, (0, 0.0, 0))
+        expected[name] = (days_worked + (hours > 0), worked + hours, late_days + late)
+    summary = {row[0][0]: [value for value, *_ in row] for row in sheets[titles[0]][3:] if row}
+    if set(summary) != set(expected):
+        errors.append(f"{label}: Maosh varag'idagi ismlar farq qiladi: {set(summary) ^ set(expected)}")
+    for name in set(summary) & set(expected):
+        _, days_worked, hours, late_days, salary = summary[name]
+        want_days, want_hours, want_late = expected[name]
+        if (days_worked, late_days) != (want_days, want_late) or abs(hours - want_hours) > 0.01 * want_days + 0.01:
+            errors.append(f"{label}: {name}: (kunlar, soat, kechikish) {(days_worked, hours, late_days)} != "
+                          f"{(want_days, round(want_hours, 2), want_late)}")
+        if f"Jami Maosh: {salary:,.0f} so'm" != salaries.get(name):
+            errors.append(f"{label}: {name}: maosh {salary} != {salaries.get(name)!r}")
+
+
+async def run(args, tmp):
+    path = os.path.join(tmp, "attendance.db")
+    await database.init_db(path)
+    try:
+        await database.create_tables()
+        date_from, date_to = build_database(path, args.workers, args.days, args.seed)
+        # Eski oylar arxivga o'tkaziladi: hisobot ularni ATTACH orqali o'qishi ham tekshiriladi
+        archived = []
+        for month in sorted({date_from[:7], (datetime.date.fromisoformat(date_from) + datetime.timedelta(days=40))
+                             .isoformat()[:7]}):
+            try:
+                if await database.archive_month(month):
+                    archived.append(month)
+            except Exception as e:
+                print(f"  {month} arxivlanmadi: {e}")
+        archived_label = ", ".join(archived) or "yo'q"
+        print(f"baza: {args.workers} ishchi, {args.days} kun, arxiv: {archived_label}")
+
+        baseline = await reports.export_attendance_report(database.iter_attendance_data(date_from, date_to),
+                                                          date_from, date_to)
+        header, detail, salaries = read_baseline(baseline)
+        os.remove(baseline)
+
+        errors = []
+        await asyncio.to_thread(reports.report_pool.start, args.processes)
+        try:
+            for split in ("month", "worker"):
+                partitions = await database.plan_report_partitions(date_from, date_to, split)
+                book = await reports.export_partitioned_report(partitions, path, date_from, date_to)
+                if check_zip(book, f"{split}.xlsx", errors) is None:
+                    continue
+                sheets = read_workbook(book)
+                os.remove(book)
+                compare_partitioned(f"{split}.xlsx", sheets, header, detail, salaries, errors)
+
+                bundle = await reports.export_partitioned_report(partitions, path, date_from, date_to,
+                                                                 zip_output=True)
+                members = check_zip(bundle, f"{split}.zip", errors)
+                os.remove(bundle)
+                if members is None:
+                    continue
+                if list(members) != [f"{title}.xlsx" for title in sheets]:
+                    errors.append(f"{split}.zip: a'zolar {list(members)} varaqlarga mos emas")
+                for (title, rows), data in zip(sheets.items(), members.values()):
+                    if check_zip(data, f"{split}.zip/{title}.xlsx", errors) is None:
+                        continue
+                    if read_workbook(data) != {title: rows}:
+                        errors.append(f"{split}.zip/{title}.xlsx: .xlsx dagi varaqdan farq qiladi")
+                print(f"  {split}: {len(partitions)} bo'lak, {len(detail)} qator tekshirildi")
+        finally:
+            await asyncio.to_thread(reports.report_pool.stop)
+        return errors
+    finally:
+        await database.close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=40)
+    parser.add_argument("--days", type=int, default=150)
+    parser.add_argument("--processes", type=int, default=2, help="report_pool jarayonlari (1 = pulsiz)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp(prefix="report_equivalence_")
+    try:
+        # Hisobot fayllari vaqtinchalik papkada yaratilsin
+        os.chdir(tmp)
+        errors = asyncio.run(run(args, tmp))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if errors:
+        print(f"❌ {len(errors)} ta nomuvofiqlik:")
+        for error in errors[:30]:
+            print(f"  {error}")
+        sys.exit(1)
+    print("✅ Bo'laklangan hisobot openpyxl hisobotiga mos")
+
+
+if __name__ == "__main__":
+    main()
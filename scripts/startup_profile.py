@@ -0,0 +1,127 @@
+"""Botning sovuq ishga tushishi: main.py ni import qilish vaqti va xotira (RSS).
+
+Har bir o'lchov yangi Python jarayonida `python -X importtime` bilan bajariladi
+(diskdagi .pyc keshi bilan, lekin sys.modules bo'sh). Natijada: umumiy import
+vaqti, eng og'ir paketlar (o'z vaqti bo'yicha, top-level paketga yig'ilgan),
+jarayonning maksimal RSS i va og'ir kutubxonalardan (numpy, openpyxl, qrcode,
+PIL) qaysilari ishga tushishda yuklangani.
+
+Ishga tushirish (repo ildizidan):
+    python -m scripts.startup_profile
+    python -m scripts.startup_profile --runs 5 --top 15 --json startup.json
+    python -m scripts.startup_profile --compare old.json
+"""
+import argparse
+import datetime
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Skan yo'li uchun kerak bo'lmagan, faqat admin funksiyalarida ishlatiladigan kutubxonalar
+HEAVY_MODULES = ("numpy", "openpyxl", "qrcode", "PIL")
+
+_PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"import_s": elapsed, "rss_mb": rss_kb / 1024, "modules": len(sys.modules),
+                  "heavy": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def parse_importtime(stderr):
+    """-X importtime chiqishidan {top-level paket: o'z vaqti (soniya)} yig'indisi."""
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|", 2)
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1e6
+    return packages
+
+
+def measure(module):
+    probe = _PROBE.format(module=module, heavy=HEAVY_MODULES)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", probe], cwd=REPO_DIR,
+                          capture_output=True, text=True, check=True)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["packages"] = parse_importtime(proc.stderr)
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(runs):
+    packages = {}
+    for run in runs:
+        for name, seconds in run["packages"].items():
+            packages.setdefault(name, []).append(seconds)
+    return {
+        "import_s": statistics.median(run["import_s"] for run in runs),
+        "rss_mb": statistics.median(run["rss_mb"] for run in runs),
+        "modules": runs[-1]["modules"],
+        "heavy": runs[-1]["heavy"],
+        "packages": {name: statistics.median(values) for name, values in packages.items()},
+    }
+
+
+def print_summary(summary, top):
+    print(f"import: {summary['import_s'] * 1000:.0f} ms   RSS: {summary['rss_mb']:.1f} MB   "
+          f"modullar: {summary['modules']}")
+    print(f"ishga tushishda yuklangan og'ir kutubxonalar: {', '.join(summary['heavy']) or 'yo`q'}")
+    print(f"\n{'paket':<28} {'o`z vaqti, ms':>14}")
+    ranked = sorted(summary["packages"].items(), key=lambda item: item[1], reverse=True)
+    for name, seconds in ranked[:top]:
+        print(f"{name:<28} {seconds * 1000:14.1f}")
+
+
+def compare(old, new):
+    print(f"\n{'ko`rsatkich':<28} {old.get('revision') or '?':>12} {new.get('revision') or '?':>12}  farq")
+    rows = [("import_ms", old["summary"]["import_s"] * 1000, new["summary"]["import_s"] * 1000),
+            ("rss_mb", old["summary"]["rss_mb"], new["summary"]["rss_mb"])]
+    for name in sorted(set(old["summary"]["heavy"]) | set(new["summary"]["heavy"])):
+        rows.append((f"yuklangan:{name}", float(name in old["summary"]["heavy"]),
+                     float(name in new["summary"]["heavy"])))
+    for key, before, after in rows:
+        change = f"{(after - before) / before * 100:+.1f}%" if before else ""
+        print(f"{key:<28} {before:12.2f} {after:12.2f}  {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="Import qilinadigan modul")
+    parser.add_argument("--runs", type=int, default=3, help="Necha marta o'lchash (mediana olinadi)")
+    parser.add_argument("--top", type=int, default=20, help="Eng og'ir paketlardan nechtasini ko'rsatish")
+    parser.add_argument("--json", help="Natijalarni shu faylga yozish")
+    parser.add_argument("--compare", help="Avvalgi --json natijasi bilan solishtirish")
+    args = parser.parse_args()
+
+    # Birinchi ishga tushirish .pyc fayllarni yozadi; u o'lchovga kirmaydi
+    measure(args.module)
+    summary = summarize([measure(args.module) for _ in range(max(1, args.runs))])
+    print_summary(summary, args.top)
+
+    report = {"revision": git_revision(), "created": datetime.datetime.now().isoformat(timespec="seconds"),
+              "python": sys.version.split()[0], "module": args.module, "summary": summary}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
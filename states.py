@@ -2,4 +2,12 @@ from aiogram.fsm.state import State, StatesGroup
 
 class AdminStates(StatesGroup):
     waiting_for_name = State()
-    waiting_for_id = State()
\ No newline at end of file
+    waiting_for_id = State()
+    waiting_for_import_file = State()
+
+class ReportStates(StatesGroup):
+    waiting_for_range = State()
+    waiting_for_worker = State()
+
+class RosterStates(StatesGroup):
+    waiting_for_prefix = State()
@@ -0,0 +1,63 @@
+"""Bir martalik QR tokenlar: yaratish va bazasiz tekshirish (faqat standart kutubxona).
+
+Skan yo'lida (handlers/user.py, database.py) ishlatiladi, shuning uchun bu
+modul og'ir kutubxonalarni (qrcode, openpyxl) yuklamasligi kerak.
+"""
+import hashlib
+import hmac
+import secrets
+import time
+
+from config import SECRET_KEY, QR_TOKEN_TTL
+
+# --- TOKEN FORMATI ---
+# Token: "{amal}_{berilgan vaqt}_{muddat}_{nonce}_{imzo}" (vaqtlar unix soniya, hex).
+# Imzo — SECRET_KEY bilan HMAC-SHA256 (birinchi 16 hex belgi). Token bazaga
+# murojaat qilmasdan tekshiriladi; faqat imzosi to'g'ri va muddati o'tmagan
+# tokenlar ishlatilgan tokenlar ro'yxatiga (qr_history) yetib boradi.
+# Telegram start parametri 64 belgidan oshmasligi kerak: bu format ~47 belgi.
+TOKEN_ACTIONS = ("in", "out")
+TOKEN_SIGNATURE_LENGTH = 16
+_TOKEN_KEY = SECRET_KEY.encode()
+
+
+def _sign_token(payload):
+    return hmac.new(_TOKEN_KEY, payload.encode(), hashlib.sha256).hexdigest()[:TOKEN_SIGNATURE_LENGTH]
+
+
+def get_daily_token(action_type, now=None, ttl=QR_TOKEN_TTL):
+    issued = int(time.time() if now is None else now)
+    payload = f"{action_type}_{issued:x}_{issued + ttl:x}_{secrets.token_hex(4)}"
+    return f"{payload}_{_sign_token(payload)}"
+
+
+def token_expires_at(token_string):
+    """Token muddati (unix soniya). Format noto'g'ri bo'lsa 0."""
+    try:
+        return int(token_string.split('_')[2], 16)
+    except (IndexError, ValueError):
+        return 0
+
+
+def verify_token(token_string, now=None):
+    """(True, amal) yoki (False, sabab). Faqat xotirada, doimiy vaqtli imzo solishtiruvi bilan."""
+    if not token_string or len(token_string) > 64:
+        return False, "Noto'g'ri token"
+    payload, _, signature = token_string.rpartition('_')
+    parts = payload.split('_')
+    if len(parts) != 4:
+        return False, "Noto'g'ri token"
+    if not hmac.compare_digest(signature.encode(), _sign_token(payload).encode()):
+        return False, "Imzo noto'g'ri"
+
+    action_type, issued_hex, expires_hex, _ = parts
+    if action_type not in TOKEN_ACTIONS:
+        return False, "Noto'g'ri amal turi!"
+    try:
+        expires = int(expires_hex, 16)
+    except ValueError:
+        return False, "Noto'g'ri token"
+    if (time.time() if now is None else now) > expires:
+        return False, "Muddati o'tgan"
+
+    return True, action_type
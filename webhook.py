@@ -0,0 +1,108 @@
+"""Webhook rejimi: Telegram updatelarni aiohttp serveriga POST qiladi (getUpdates o'rniga).
+
+Har bir update HTTP so'rov ichida qayta ishlanadi (handle_in_background=False),
+shuning uchun to'xtashda AppRunner.cleanup() bajarilayotgan so'rovlarni
+WEBHOOK_SHUTDOWN_TIMEOUT gacha kutadi va faqat shundan keyin bot sessiyasi yopiladi.
+Parallellik Telegram tomonidagi max_connections bilan boshqariladi.
+
+METRICS_PATH da Prometheus formatidagi metrikalar beriladi; polling rejimida
+xuddi shu endpoint METRICS_PORT dagi alohida kichik serverda ko'tariladi.
+"""
+import asyncio
+import logging
+import signal
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+
+import metrics
+from config import (WEBHOOK_BASE_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_HOST, WEBHOOK_PORT,
+                    WEBHOOK_MAX_CONNECTIONS, WEBHOOK_SHUTDOWN_TIMEOUT, METRICS_PATH, METRICS_PORT)
+from database import get_manager
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PATH = "/healthz"
+
+
+async def healthz(request: web.Request):
+    """Load balancer uchun: baza javob beryaptimi va xabarnoma navbati qanchalik to'lgan."""
+    try:
+        async with get_manager().reader() as db:
+            async with db.execute("SELECT 1"):
+                pass
+    except Exception as e:
+        return web.json_response({"status": "error", "error": str(e)}, status=503)
+
+    body = {"status": "ok"}
+    notifier = request.app["dispatcher"].workflow_data.get("notifier")
+    if notifier is not None:
+        body["notify_queue_depth"] = notifier.queue_depth
+    return web.json_response(body)
+
+
+async def metrics_endpoint(request: web.Request):
+    return web.Response(text=metrics.render_prometheus(), content_type="text/plain", charset="utf-8")
+
+
+def build_app(dp: Dispatcher, bot: Bot):
+    app = web.Application()
+    app["dispatcher"] = dp
+    handler = SimpleRequestHandler(dispatcher=dp, bot=bot, handle_in_background=False,
+                                   secret_token=WEBHOOK_SECRET)
+    # handler.register() ishlatilmaydi: u bot sessiyasini on_shutdown da, ya'ni
+    # bajarilayotgan so'rovlar tugashidan oldin yopib qo'yadi
+    app.router.add_post(WEBHOOK_PATH, handler.handle)
+    app.router.add_get(HEALTH_PATH, healthz)
+    app.router.add_get(METRICS_PATH, metrics_endpoint)
+    return app
+
+
+async def start_metrics_server(dp: Dispatcher):
+    """Polling rejimi uchun: /metrics va /healthz ni METRICS_PORT da ko'taradi. O'chiq bo'lsa None."""
+    if METRICS_PORT <= 0:
+        return None
+    app = web.Application()
+    app["dispatcher"] = dp
+    app.router.add_get(HEALTH_PATH, healthz)
+    app.router.add_get(METRICS_PATH, metrics_endpoint)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, WEBHOOK_HOST, METRICS_PORT).start()
+    logger.info("📈 Metrikalar: http://%s:%s%s", WEBHOOK_HOST, METRICS_PORT, METRICS_PATH)
+    return runner
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot):
+    # Maxfiy kalitsiz server istalgan POST ni Update deb qabul qiladi: soxta admin
+    # xabari bilan masalan barcha davomatni o'chirish mumkin bo'lardi
+    if not WEBHOOK_SECRET:
+        raise RuntimeError("WEBHOOK_SECRET o'rnatilmagan: webhook rejimi maxfiy kalitsiz ishga tushmaydi.")
+    runner = web.AppRunner(build_app(dp, bot), shutdown_timeout=WEBHOOK_SHUTDOWN_TIMEOUT)
+    await runner.setup()
+    site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+    await site.start()
+    logger.info("🌐 Webhook server: http://%s:%s%s", WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH)
+
+    if WEBHOOK_BASE_URL:
+        await bot.set_webhook(f"{WEBHOOK_BASE_URL.rstrip('/')}{WEBHOOK_PATH}",
+                              secret_token=WEBHOOK_SECRET,
+                              allowed_updates=dp.resolve_used_update_types(),
+                              max_connections=WEBHOOK_MAX_CONNECTIONS)
+        logger.info("🔗 Telegram webhook o'rnatildi: %s%s", WEBHOOK_BASE_URL, WEBHOOK_PATH)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    try:
+        await stop.wait()
+    finally:
+        logger.info("⏳ Webhook server to'xtatilmoqda, bajarilayotgan updatelar kutilmoqda...")
+        await runner.cleanup()
+        await bot.session.close()